@@ -1,39 +1,54 @@
 import random
 import math
 import time
-from PushBattle import Game, PLAYER1, PLAYER2, EMPTY, BOARD_SIZE, NUM_PIECES, _torus
+from PushBattle import Game, PLAYER1, PLAYER2, EMPTY, BOARD_SIZE, NUM_PIECES, MOVE_OK, WIN_LINES, _torus
+from bitboard import BitboardGame, adjacent_pairs
+from batch_sim import BatchGames
+from transposition import TranspositionTable, child_key, load_move_stats, save_move_stats, save_tree_stats, tree_move_stats, best_move_hint
+from symmetry import unique_moves
+from mcts_tree import MCTSTree, ROOT, priors_from_scores
+from time_manager import ROLLOUT_SLACK
+from vector_eval import evaluate_boards, winners
+from tactics import ThreatSolver
 import copy
+import numpy as np
+
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+LINE_CELLS = np.array([[r * BOARD_SIZE + c for r, c in line] for line in WIN_LINES])   # WIN_LINES as cell indices
+
+def _step_moves():
+    """STEP_MOVES[source, target]: target is orthogonally adjacent to source on the torus"""
+    steps = np.zeros((NUM_CELLS, NUM_CELLS), dtype=bool)
+    cells = np.arange(NUM_CELLS)
+    rows, cols = np.divmod(cells, BOARD_SIZE)
+    for dr, dc in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+        steps[cells, (rows + dr) % BOARD_SIZE * BOARD_SIZE + (cols + dc) % BOARD_SIZE] = True
+    return steps
+
+STEP_MOVES = _step_moves()
 
 class MCTSAgent:
-    def __init__(self, player=PLAYER1):
+    def __init__(self, player=PLAYER1, use_bitboard=True):
         self.player = player
         self.exploration_weight = 1.0
         self.simulation_time = 1.0
+        self.time_limit = 0.95
+        self.max_iterations = None  # Stop the search after this many iterations (None = time limit only)
+        self.time_manager = None  # TimeManager setting the search time per move (None = time_limit)
+        self.deadline = None  # Time at which a running simulation is cut off and its position evaluated
+        self.use_bitboard = use_bitboard  # Search on a BitboardGame copy of the position
+        self.tt = TranspositionTable()  # Tree node statistics shared by all searches of this game
+        self.tt_min_visits = 8  # Visits a tree node needs to be stored in tt after a search
+        self.search_stats = {}  # Transposition table stats after the last search
+        self.prior_temperature = 50.0  # Softmax temperature turning evaluate_position scores into PUCT priors
+        self.expand_visits = 2  # Simulations through a tree node before it is expanded
+        self.tree = MCTSTree()  # Search tree, kept between turns
+        self.last_child = -1  # Tree node of the move returned by the last search
+        self.solver = ThreatSolver()  # Proves forced wins at the root and at expanded nodes (None = off)
         
     def get_possible_moves(self, game):
         """Returns list of all possible moves in current state"""
-        game_copy = self.clone_game(game)  # Work with a copy
-        moves = []
-        current_pieces = game_copy.p1_pieces if game_copy.current_player == PLAYER1 else game_copy.p2_pieces
-        
-        if current_pieces < NUM_PIECES:
-            # placement moves
-            for r in range(BOARD_SIZE):
-                for c in range(BOARD_SIZE):
-                    if game_copy.board[r][c] == EMPTY:
-                        if game_copy.is_valid_placement(r, c):
-                            moves.append((r, c))
-        else:
-            # movement moves
-            for r0 in range(BOARD_SIZE):
-                for c0 in range(BOARD_SIZE):
-                    if game_copy.board[r0][c0] == game_copy.current_player:
-                        for r1 in range(BOARD_SIZE):
-                            for c1 in range(BOARD_SIZE):
-                                if game_copy.board[r1][c1] == EMPTY:
-                                    if game_copy.is_valid_move(r0, c0, r1, c1):
-                                        moves.append((r0, c0, r1, c1))
-        return moves
+        return list(game.iter_moves())
 
     def clone_game(self, game):
         """Create a deep copy of the game state"""
@@ -45,11 +60,11 @@ class MCTSAgent:
         game_copy = self.clone_game(game)
         try:
             if len(move) == 2:
-                if game_copy.is_valid_placement(*move):
+                if game_copy.placement_status(*move) == MOVE_OK:
                     game_copy.place_checker(*move)
                     return game_copy
             else:
-                if game_copy.is_valid_move(*move):
+                if game_copy.move_status(*move) == MOVE_OK:
                     game_copy.move_checker(*move)
                     return game_copy
         except:
@@ -58,7 +73,12 @@ class MCTSAgent:
 
 
     def get_best_move(self, game):
-        """Returns best move using MCTS with UCB1"""
+        """Returns best move using MCTS with PUCT"""
+        if self.time_manager is not None:
+            self.time_manager.start()
+        if self.use_bitboard:
+            game = BitboardGame.from_game(game)
+        self.player = game.current_player  # Simulation scores are for the player to move at the root
         possible_moves = self.get_possible_moves(game)
         if not possible_moves:
             return None
@@ -66,13 +86,12 @@ class MCTSAgent:
         # Get valid moves
         valid_moves = []
         for move in possible_moves:
-            game_copy = self.clone_game(game)
             try:
                 if len(move) == 2:
-                    if game_copy.is_valid_placement(*move):
+                    if game.placement_status(*move) == MOVE_OK:
                         valid_moves.append(move)
                 else:
-                    if game_copy.is_valid_move(*move):
+                    if game.move_status(*move) == MOVE_OK:
                         valid_moves.append(move)
             except:
                 continue
@@ -80,59 +99,97 @@ class MCTSAgent:
         if not valid_moves:
             return None
 
-        # Run MCTS
-        move_stats = {}  # move -> (total_score, visits)
-        exploration_constant = 1.414  # sqrt(2)
-        end_time = time.time() + 0.95
-        
-        while time.time() < end_time:
-            # Select move using UCB1
-            total_visits = sum(visits for _, visits in move_stats.values()) + 1
-            selected_move = None
-            best_ucb = float('-inf')
-            
-            for move in valid_moves:
-                total_score, visits = move_stats.get(move, (0, 0))
-                
-                if visits == 0:
-                    selected_move = move
-                    break
-                    
-                # UCB1 calculation
-                exploitation = total_score / visits if visits > 0 else 0
-                exploration = exploration_constant * math.sqrt(math.log(total_visits) / visits)
-                ucb = exploitation + exploration
-                
-                if ucb > best_ucb:
-                    best_ucb = ucb
-                    selected_move = move
-            
-            # If all moves tried, pick one with highest UCB
-            if selected_move is None:
-                selected_move = random.choice(valid_moves)
-                
-            # Simulate game
-            score = self.simulate_game(game, selected_move)
-            
-            # Update statistics
-            current_score, visits = move_stats.get(selected_move, (0, 0))
-            move_stats[selected_move] = (current_score + score, visits + 1)
-        
-        # Select best move based on average score
-        best_move = None
-        best_average = float('-inf')
-        
-        for move in valid_moves:
-            total_score, visits = move_stats.get(move, (0, 0))
-            if visits > 0:
-                average = total_score / visits
-                if average > best_average:
-                    best_average = average
-                    best_move = move
-        
-        return best_move if best_move is not None else random.choice(valid_moves)
+        # Symmetric moves lead to equivalent positions, search one of each
+        valid_moves = unique_moves(game, valid_moves)
+        end_time = time.time() + self.time_limit if self.time_manager is None else self.time_manager.end_time
+        self.deadline = end_time + ROLLOUT_SLACK
+
+        # A forced win found by the threat solver is played without a tree search
+        if self.solver is not None:
+            win = self.solver.find_win(game, valid_moves, deadline=self.solver.start(end_time))
+            if win is not None:
+                self.last_child = -1
+                self.search_stats = {"solver_win": True, "solver": dict(self.solver.stats)}
+                return win
+
+        # Continue from the subtree of the last search if it reached this position
+        self.tt.new_search()
+        root_key = game.zobrist_hash
+        reused_visits = self.tree.reuse(root_key, self.last_child)
+        if not self.tree.is_expanded(ROOT):
+            priors, terminal = self.move_priors(game, valid_moves)
+            # The best move of an earlier search of this position gets the highest prior
+            hint = best_move_hint(self.tt, root_key, valid_moves)
+            if hint is not None:
+                priors[valid_moves.index(hint)] = priors.max()
+            self.tree.expand(ROOT, root_key, valid_moves, priors, terminal)
+            # Seed statistics from earlier searches that reached the same positions
+            child_keys = {move: child_key(game, move) for move in valid_moves}
+            self.tree.seed_children(ROOT, load_move_stats(self.tt, child_keys))
+
+        end_time, stop_check = self.plan_search(game, end_time)
 
+        # Run MCTS
+        iterations = self.tree.search(game, end_time, time.time, self.get_possible_moves, self.move_priors,
+                                      self.rollout, c_puct=self.exploration_weight, expand_visits=self.expand_visits,
+                                      max_iterations=self.max_iterations, stop_check=stop_check,
+                                      child_stats=self.tt_move_stats)
+        self.deadline = None
 
+        # Select best move based on visits
+        self.last_child = self.tree.best_child(ROOT)
+        best_move = self.tree.move(self.last_child)
+        move_stats = self.tree.move_stats(ROOT)
+        child_keys = {move: child_key(game, move) for move in move_stats}
+        save_tree_stats(self.tt, self.tree, self.tt_min_visits)
+        save_move_stats(self.tt, root_key, child_keys, move_stats, best_move)
+        self.search_stats = self.tt.stats()
+        self.search_stats.update({
+            "iterations": iterations,
+            "reused_visits": reused_visits,
+            "root_visits": int(self.tree.visits[ROOT]),
+            "nodes": self.tree.size,
+            "depth": self.tree.depth(),
+        })
+        if self.solver is not None:
+            self.search_stats["solver"] = dict(self.solver.stats)
+        return best_move
+
+    def plan_search(self, game, end_time):
+        """End time and early stop check of the search from the time manager, if any; sets the simulation deadline"""
+        stop_check = None
+        if self.time_manager is not None:
+            children = self.tree.children(ROOT)
+            end_time = self.time_manager.plan(game, self.tree.terminal[children.start:children.stop])
+            stop_check = lambda iterations: self.time_manager.can_stop(self.tree, ROOT, iterations)
+        self.deadline = end_time + ROLLOUT_SLACK
+        return end_time, stop_check
+
+    def move_priors(self, game, moves):
+        """PUCT priors of moves from evaluate_position of the positions they lead to, scored as one batch"""
+        boards = []
+        pieces = []
+        for move in moves:
+            record = game.apply_move(move)
+            boards.append(game.board.copy())
+            pieces.append(game.p1_pieces if record.player == PLAYER1 else game.p2_pieces)
+            game.undo(record)
+        boards = np.array(boards)
+        player = game.current_player
+        scores = evaluate_boards(boards, player, player, pieces)
+        winner = winners(boards, player)
+        terminal = np.where(winner == player, 1, np.where(winner == -player, -1, 0))
+        if self.solver is not None:
+            self.solver.mark_wins(game, moves, terminal)
+        return priors_from_scores(scores, self.prior_temperature), terminal
+
+    def tt_move_stats(self, game, moves):
+        """Statistics of earlier searches for the children of a node the tree search expands"""
+        return tree_move_stats(self.tt, game, moves)
+
+    def rollout(self, game, move):
+        """Simulation after move for the tree search: (score, 1)"""
+        return self.simulate_game(game, move), 1
 
     def count_aligned_pieces(self, game, player):
         """Count number of 2-in-a-row configurations"""
@@ -210,35 +267,45 @@ class MCTSAgent:
             max_moves = 50  # Reduced from 100 for faster simulations
             
             while moves_count < max_moves:
+                if self.deadline is not None and time.time() > self.deadline:
+                    break
                 winner = sim_game.check_winner()
                 if winner != EMPTY:
                     return 1.0 if winner == self.player else -1.0
                     
                 possible_moves = self.get_possible_moves(sim_game)
                 valid_moves = []
-                move_scores = []  # Store move evaluations
+                boards = []  # Positions after each valid move, evaluated together below
+                pieces = []
                 
-                # Evaluate each possible move
+                # Play each possible move in place, undoing it afterwards
                 for move in possible_moves:
-                    game_copy = self.clone_game(sim_game)
+                    if self.deadline is not None and valid_moves and time.time() > self.deadline:
+                        break
                     try:
                         if len(move) == 2:
-                            if game_copy.is_valid_placement(*move):
-                                game_copy.place_checker(*move)
+                            if sim_game.placement_status(*move) == MOVE_OK:
+                                record = sim_game.apply_move(move)
                                 valid_moves.append(move)
-                                score = self.evaluate_position(game_copy, sim_game.current_player)
-                                move_scores.append(score)
+                                boards.append(sim_game.board.copy())
+                                pieces.append(sim_game.p1_pieces if record.player == PLAYER1 else sim_game.p2_pieces)
+                                sim_game.undo(record)
                         else:
-                            if game_copy.is_valid_move(*move):
-                                game_copy.move_checker(*move)
+                            if sim_game.move_status(*move) == MOVE_OK:
+                                record = sim_game.apply_move(move)
                                 valid_moves.append(move)
-                                score = self.evaluate_position(game_copy, sim_game.current_player)
-                                move_scores.append(score)
+                                boards.append(sim_game.board.copy())
+                                pieces.append(sim_game.p1_pieces if record.player == PLAYER1 else sim_game.p2_pieces)
+                                sim_game.undo(record)
                     except:
                         continue
                 
                 if not valid_moves:
                     return 0.0
+
+                # Same scores as evaluate_position(sim_game, sim_game.current_player) after each move
+                player = sim_game.current_player
+                move_scores = list(evaluate_boards(np.array(boards), player, player, pieces))
                     
                 # Choose move based on scores with some randomness
                 if random.random() < 0.8:  # 80% choose best move
@@ -377,9 +444,8 @@ class MCTSAgent:
         for r in range(BOARD_SIZE):
             for c in range(BOARD_SIZE):
                 if game.board[r][c] == player:
-                    game_copy = self.clone_game(game)
                     try:
-                        if game_copy.is_valid_move(r, c, target_r, target_c):
+                        if game.move_status(r, c, target_r, target_c) == MOVE_OK:
                             return True
                     except:
                         continue
@@ -487,120 +553,217 @@ import random
 import math
 import time
 import copy
+import numpy as np
 
 class FastMCTSAgent:
-    def __init__(self, player=1):
+    def __init__(self, player=1, use_bitboard=True, batch_size=0):
         self.player = player
         self.exploration_weight = 1.0
         self.time_limit = 0.95  # Slightly less than 1 second to account for overhead
+        self.use_bitboard = use_bitboard  # Search on a BitboardGame copy of the position
+        # Rollouts per iteration run in lockstep by BatchGames (0 = one light_simulation). Off by default: a batch
+        # only beats light_simulation per rollout from about 64 games (benchmark.py rollout group), and spending
+        # them on one leaf leaves the tree ~25x fewer iterations, which lost 30-10 to batch_size 0 at 0.5 s a move
+        self.batch_size = batch_size
+        self.rng = None  # NumPy Generator for BatchGames, None for a fresh unseeded one
+        self.ponder_iterations = 0  # Iterations searched by ponder since the last get_best_move
+        self.max_iterations = None  # Stop the search after this many iterations (None = time limit only)
+        self.time_manager = None  # TimeManager setting the search time per move (None = time_limit)
+        self.deadline = None  # Time at which a running simulation is cut off and its position evaluated
+        self.tt = TranspositionTable()  # Tree node statistics shared by all searches of this game
+        self.tt_min_visits = 8  # Visits a tree node needs to be stored in tt after a search
+        self.search_stats = {}  # Transposition table stats after the last search
+        self.prior_temperature = 5.0  # Softmax temperature turning quick_evaluate scores into PUCT priors
+        self.expand_visits = 8  # Simulations through a tree node before it is expanded
+        self.tree = MCTSTree()  # Search tree, kept between turns
+        self.last_child = -1  # Tree node of the move returned by the last search
+        self.solver = ThreatSolver()  # Proves forced wins at the root and at expanded nodes (None = off)
+        self.prune_moves = True  # Search only the movement moves of prune_movement (False = every legal move)
         
     def get_possible_moves(self, game):
-        """Returns list of all possible moves in current state"""
-        moves = []
-        current_pieces = game.p1_pieces if game.current_player == 1 else game.p2_pieces
-        
-        if current_pieces < 8:  # Using constant instead of NUM_PIECES
-            # Placement moves - only check empty spaces
-            for r in range(8):  # Using constant instead of BOARD_SIZE
-                for c in range(8):
-                    if game.board[r][c] == 0:  # Using 0 instead of EMPTY
-                        moves.append((r, c))
-        else:
-            # Movement moves - only check player's pieces to empty spaces
-            for r0 in range(8):
-                for c0 in range(8):
-                    if game.board[r0][c0] == game.current_player:
-                        # Only check adjacent spaces for movement
-                        for dr, dc in [(0,1), (0,-1), (1,0), (-1,0)]:
-                            r1 = (r0 + dr) % 8
-                            c1 = (c0 + dc) % 8
-                            if game.board[r1][c1] == 0:
-                                moves.append((r0, c0, r1, c1))
-        return moves
+        """Returns the legal moves of game.iter_moves, in the movement phase only those prune_movement keeps"""
+        if not self.prune_moves or game.in_placement_phase():
+            return list(game.iter_moves())
+        codes = game.legal_moves_array().astype(np.intp)
+        sources, targets = np.divmod(codes - NUM_CELLS, NUM_CELLS)
+        keep = self.prune_movement(game, sources, targets)
+        r0, c0 = np.divmod(sources[keep], BOARD_SIZE)
+        r1, c1 = np.divmod(targets[keep], BOARD_SIZE)
+        return list(zip(r0.tolist(), c0.tolist(), r1.tolist(), c1.tolist()))
+
+    def prune_movement(self, game, sources, targets):
+        """
+        Mask of the movement moves (source, target cell indices) the search looks at: steps to an
+        orthogonally adjacent square, and moves to a square that completes a line of the player or
+        blocks a line of the opponent (the empty square of a WIN_LINE whose other two squares hold
+        pieces of one player, pushes not counted). The other moves carry a piece across the board
+        without such a purpose; with them a node has up to 8 * 48 children instead of a few dozen,
+        and the tree stays a few plies deep.
+        """
+        player = game.current_player
+        values = np.asarray(game.board).ravel()[LINE_CELLS]
+        empty = values == EMPTY
+        open_lines = empty.sum(axis=1) == 1
+        squares = LINE_CELLS[np.arange(len(LINE_CELLS)), empty.argmax(axis=1)]
+        totals = values.sum(axis=1)
+        blocks = np.zeros(NUM_CELLS, dtype=bool)
+        blocks[squares[open_lines & (totals == -2 * player)]] = True
+        # completes[source, target]: own lines completed on target that source is not one of the two pieces of
+        own = open_lines & (totals == 2 * player)
+        completes = np.tile(np.bincount(squares[own], minlength=NUM_CELLS), (NUM_CELLS, 1))
+        np.add.at(completes, (LINE_CELLS[own].ravel(), np.repeat(squares[own], 3)), -1)
+        return STEP_MOVES[sources, targets] | blocks[targets] | (completes[sources, targets] > 0)
 
     def clone_game(self, game):
         """Create a lightweight copy of the game state"""
         return copy.deepcopy(game)
 
     def get_best_move(self, game):
-        """Returns best move using optimized MCTS"""
+        """Returns best move using PUCT tree search"""
+        if self.time_manager is not None:
+            self.time_manager.start()
+        if self.use_bitboard:
+            game = BitboardGame.from_game(game)
+        self.player = game.current_player  # Simulation scores are for the player to move at the root
         possible_moves = self.get_possible_moves(game)
         if not possible_moves:
             return None
 
-        # Initialize move statistics
-        move_stats = {}  # move -> (total_score, visits)
-        end_time = time.time() + self.time_limit
-        exploration_constant = math.sqrt(2)
-        
-        # Quick evaluation of all moves
-        move_priorities = {}
+        # Symmetric moves lead to equivalent positions, search one of each
+        possible_moves = unique_moves(game, possible_moves)
+
+        end_time = time.time() + self.time_limit if self.time_manager is None else self.time_manager.end_time
+        self.deadline = end_time + ROLLOUT_SLACK
+        valid_moves = []
         for move in possible_moves:
-            game_copy = self.clone_game(game)
             try:
                 if len(move) == 2:
-                    if game_copy.is_valid_placement(*move):
-                        game_copy.place_checker(*move)
-                        priority = self.quick_evaluate(game_copy, self.player)
-                        move_priorities[move] = priority
+                    if game.placement_status(*move) == MOVE_OK:
+                        valid_moves.append(move)
                 else:
-                    if game_copy.is_valid_move(*move):
-                        game_copy.move_checker(*move)
-                        priority = self.quick_evaluate(game_copy, self.player)
-                        move_priorities[move] = priority
+                    if game.move_status(*move) == MOVE_OK:
+                        valid_moves.append(move)
             except:
                 continue
+        if not valid_moves:
+            return None
+
+        # A forced win found by the threat solver is played without a tree search
+        if self.solver is not None:
+            win = self.solver.find_win(game, valid_moves, deadline=self.solver.start(end_time))
+            if win is not None:
+                self.last_child = -1
+                self.search_stats = {"solver_win": True, "solver": dict(self.solver.stats)}
+                return win
+
+        # Continue from the subtree of the last search if it reached this position
+        self.tt.new_search()
+        root_key = game.zobrist_hash
+        reused_visits = self.tree.reuse(root_key, self.last_child)
+        if not self.tree.is_expanded(ROOT):
+            priors, terminal = self.move_priors(game, valid_moves)
+            # The best move of an earlier search of this position gets the highest prior
+            hint = best_move_hint(self.tt, root_key, valid_moves)
+            if hint is not None:
+                priors[valid_moves.index(hint)] = priors.max()
+            self.tree.expand(ROOT, root_key, valid_moves, priors, terminal)
+            # Initialize move statistics from earlier searches that reached the same positions
+            child_keys = {move: child_key(game, move) for move in valid_moves}
+            self.tree.seed_children(ROOT, load_move_stats(self.tt, child_keys))
+
+        end_time, stop_check = self.plan_search(game, end_time)
+        iterations = self.tree.search(game, end_time, time.time, self.get_possible_moves, self.move_priors,
+                                      self.rollout, c_puct=self.exploration_weight, expand_visits=self.expand_visits,
+                                      max_iterations=self.max_iterations, stop_check=stop_check,
+                                      child_stats=self.tt_move_stats)
+        self.deadline = None
 
-        # Sort moves by priority
-        sorted_moves = sorted(move_priorities.keys(), 
-                            key=lambda m: move_priorities[m], 
-                            reverse=True)[:10]  # Only consider top 10 moves
-        
-        while time.time() < end_time:
-            # Select move using UCB1
-            total_visits = sum(visits for _, visits in move_stats.values()) + 1
-            
-            # Try untried moves first
-            selected_move = None
-            for move in sorted_moves:
-                if move not in move_stats:
-                    selected_move = move
-                    break
-            
-            # If all moves tried, use UCB1
-            if selected_move is None:
-                best_ucb = float('-inf')
-                for move in sorted_moves:
-                    total_score, visits = move_stats.get(move, (0, 0))
-                    if visits > 0:
-                        exploitation = total_score / visits
-                        exploration = exploration_constant * math.sqrt(math.log(total_visits) / visits)
-                        ucb = exploitation + exploration
-                        if ucb > best_ucb:
-                            best_ucb = ucb
-                            selected_move = move
-            
-            if selected_move is None:
-                selected_move = random.choice(sorted_moves)
-                
-            # Simulate game
-            score = self.light_simulation(game, selected_move)
-            
-            # Update statistics
-            current_score, visits = move_stats.get(selected_move, (0, 0))
-            move_stats[selected_move] = (current_score + score, visits + 1)
-        
         # Select best move based on visits
-        best_move = None
-        most_visits = -1
-        
-        for move in sorted_moves:
-            _, visits = move_stats.get(move, (0, 0))
-            if visits > most_visits:
-                most_visits = visits
-                best_move = move
-        
-        return best_move if best_move else random.choice(sorted_moves)
+        self.last_child = self.tree.best_child(ROOT)
+        best_move = self.tree.move(self.last_child)
+        move_stats = self.tree.move_stats(ROOT)
+        child_keys = {move: child_key(game, move) for move in move_stats}
+        save_tree_stats(self.tt, self.tree, self.tt_min_visits)
+        save_move_stats(self.tt, root_key, child_keys, move_stats, best_move)
+        self.search_stats = self.tt.stats()
+        self.search_stats.update({
+            "iterations": iterations,
+            "reused_visits": reused_visits,
+            "root_visits": int(self.tree.visits[ROOT]),
+            "nodes": self.tree.size,
+            "depth": self.tree.depth(),
+            "ponder_iterations": self.ponder_iterations,
+        })
+        if self.solver is not None:
+            self.search_stats["solver"] = dict(self.solver.stats)
+        self.ponder_iterations = 0
+        return best_move
+
+    def plan_search(self, game, end_time):
+        """End time and early stop check of the search from the time manager, if any; sets the simulation deadline"""
+        stop_check = None
+        if self.time_manager is not None:
+            children = self.tree.children(ROOT)
+            end_time = self.time_manager.plan(game, self.tree.terminal[children.start:children.stop])
+            stop_check = lambda iterations: self.time_manager.can_stop(self.tree, ROOT, iterations)
+        self.deadline = end_time + ROLLOUT_SLACK
+        return end_time, stop_check
+
+    def move_priors(self, game, moves):
+        """PUCT priors of moves from quick_evaluate of the positions they lead to"""
+        scores = []
+        for move in moves:
+            record = game.apply_move(move)
+            scores.append(self.quick_evaluate(game, record.player))
+            game.undo(record)
+        # quick_evaluate only reaches +-1000 when the move decides the game
+        terminal = [1 if score >= 1000 else -1 if score <= -1000 else 0 for score in scores]
+        if self.solver is not None:
+            self.solver.mark_wins(game, moves, terminal)
+        return priors_from_scores(scores, self.prior_temperature), terminal
+
+    def tt_move_stats(self, game, moves):
+        """Statistics of earlier searches for the children of a node the tree search expands"""
+        return tree_move_stats(self.tt, game, moves)
+
+    def rollout(self, game, move):
+        """Simulation after move for the tree search: (total score, simulations)"""
+        if self.batch_size:
+            return self.batch_simulation(game, move, self.batch_size)
+        return self.light_simulation(game, move), 1
+
+    def ponder(self, game, move, stop, time_limit):
+        """
+        Searches the position after our move on the opponent's time, until the threading.Event stop is set
+        or time_limit runs out. The next get_best_move keeps the subtree of the reply that was played.
+        """
+        end_time = time.time() + time_limit
+        if self.use_bitboard:
+            game = BitboardGame.from_game(game)
+        record = game.apply_move(move)
+        game.current_player = -record.player
+        if game.check_winner() != EMPTY:
+            return
+        moves = self.get_possible_moves(game)
+        if not moves:
+            return
+
+        # Same search as get_best_move, from the opponent's side
+        self.player = game.current_player
+        self.deadline = end_time + ROLLOUT_SLACK
+        if self.solver is not None:
+            self.solver.start(end_time)
+        key = game.zobrist_hash
+        self.tree.reuse(key, self.last_child)
+        if not self.tree.is_expanded(ROOT):
+            priors, terminal = self.move_priors(game, moves)
+            self.tree.expand(ROOT, key, moves, priors, terminal)
+        iterations = self.tree.search(game, end_time, time.time, self.get_possible_moves, self.move_priors,
+                                      self.rollout, c_puct=self.exploration_weight, expand_visits=self.expand_visits,
+                                      stop=stop, child_stats=self.tt_move_stats)
+        self.deadline = None
+        self.last_child = -1
+        self.ponder_iterations += iterations
 
     def quick_evaluate(self, game, player):
         """Fast position evaluation"""
@@ -612,6 +775,10 @@ class FastMCTSAgent:
             return 1000
         elif winner == -player:
             return -1000
+
+        if isinstance(game, BitboardGame):
+            mask = game.player_mask(player)
+            return bin(mask).count('1') + 5 * adjacent_pairs(mask)
             
         # Count pieces and alignments
         for r in range(8):
@@ -640,31 +807,17 @@ class FastMCTSAgent:
             moves_left = 20  # Reduced simulation length
             
             while moves_left > 0:
+                if self.deadline is not None and time.time() > self.deadline:
+                    break
                 winner = sim_game.check_winner()
                 if winner != 0:
                     return 1.0 if winner == self.player else -1.0
                     
-                moves = self.get_possible_moves(sim_game)
-                if not moves:
+                # Simple random policy: uniform over all legal moves, drawn without listing them
+                move = sim_game.random_move()
+                if move is None:
                     break
                     
-                # Simple random policy with basic pruning
-                valid_moves = []
-                for move in moves[:10]:  # Only consider first 10 moves
-                    try:
-                        if len(move) == 2:
-                            if sim_game.is_valid_placement(*move):
-                                valid_moves.append(move)
-                        else:
-                            if sim_game.is_valid_move(*move):
-                                valid_moves.append(move)
-                    except:
-                        continue
-                
-                if not valid_moves:
-                    break
-                    
-                move = random.choice(valid_moves)
                 if len(move) == 2:
                     sim_game.place_checker(*move)
                 else:
@@ -676,4 +829,22 @@ class FastMCTSAgent:
             return self.quick_evaluate(sim_game, self.player) / 1000.0
             
         except:
-            return 0.0
\ No newline at end of file
+            return 0.0
+
+    def batch_simulation(self, game, first_move, n):
+        """Runs n random light simulations in lockstep. Returns (total score, n)"""
+        record = game.apply_move(first_move)
+        try:
+            winner = game.check_winner()
+            if winner != 0:
+                return (n if winner == self.player else -n), n
+            game.current_player *= -1
+            batch = BatchGames.from_game(game, n, self.rng)
+        finally:
+            game.undo(record)
+
+        winners = batch.rollout(20)  # Same simulation length as light_simulation
+        scores = np.where(winners == self.player, 1.0, np.where(winners == -self.player, -1.0, 0.0))
+        unfinished = winners == 0
+        scores[unfinished] = batch.quick_scores(self.player)[unfinished] / 1000.0
+        return float(scores.sum()), n
@@ -1,4 +1,7 @@
 import numpy as np
+import random
+import struct
+from collections import namedtuple
 
 # GLOBAL VARIABLES
 EMPTY = 0       # Empty space board value
@@ -8,6 +11,21 @@ PLAYER2 = -1    # Second player board value
 BOARD_SIZE = 8  # Size of the board
 NUM_PIECES = 8  # Number of pieces each player is allowed to place of their own color
 
+# Reason codes returned by Game.placement_status and Game.move_status
+MOVE_OK = 0             # Legal move
+OUT_OF_BOUNDS = 1       # A square is off the board
+NO_PIECES_LEFT = 2      # Placement after all pieces have been placed
+NOT_OWN_PIECE = 3       # Movement of a square that does not hold one of the player's pieces
+SQUARE_OCCUPIED = 4     # Destination square is not empty
+
+MOVE_STATUS_MESSAGES = {
+    MOVE_OK: "Valid move",
+    OUT_OF_BOUNDS: "Square is off the board",
+    NO_PIECES_LEFT: "All pieces have been placed. Must move an existing piece",
+    NOT_OWN_PIECE: "You can only move your own pieces!",
+    SQUARE_OCCUPIED: "Destination square must be empty!",
+}
+
 
 ##################
 
@@ -16,6 +34,52 @@ def _torus(r, c):
     ct = (c + BOARD_SIZE) % BOARD_SIZE
     return rt, ct
 
+# Every 3-square line on the torus (rows, columns and both diagonals) as a tuple of (r, c) squares
+WIN_LINES = tuple(
+    tuple(_torus(r + i * dr, c + i * dc) for i in range(3))
+    for r in range(BOARD_SIZE)
+    for c in range(BOARD_SIZE)
+    for dr, dc in [(0, 1), (1, 0), (1, 1), (1, -1)]
+)
+
+# LINES_BY_CELL[(r, c)] holds the 12 lines of WIN_LINES that pass through (r, c)
+LINES_BY_CELL = {
+    (r, c): tuple(line for line in WIN_LINES if (r, c) in line)
+    for r in range(BOARD_SIZE)
+    for c in range(BOARD_SIZE)
+}
+
+# Undo record returned by Game.apply_move: the mover, the move itself, the (from, to) squares of
+# every piece pushed by it and the board hash before the move
+MoveRecord = namedtuple("MoveRecord", ["player", "move", "pushed", "board_hash"])
+
+# Zobrist keys (fixed seed, so every process computes the same hash for the same position)
+_zobrist_random = random.Random(0x50B5)
+ZOBRIST_PIECES = {
+    player: [[_zobrist_random.getrandbits(64) for c in range(BOARD_SIZE)] for r in range(BOARD_SIZE)]
+    for player in (PLAYER1, PLAYER2)
+}
+ZOBRIST_P1_COUNT = [_zobrist_random.getrandbits(64) for n in range(NUM_PIECES + 1)]
+ZOBRIST_P2_COUNT = [_zobrist_random.getrandbits(64) for n in range(NUM_PIECES + 1)]
+ZOBRIST_SIDE = _zobrist_random.getrandbits(64)   # Included when PLAYER2 is to move
+
+# Compact binary layout of a game: Player1 mask, Player2 mask (bit r*8+c set for an occupied square),
+# current player, turn count, Player1 pieces, Player2 pieces. 21 bytes, little endian
+GAME_STRUCT = struct.Struct("<QQbHBB")
+
+def zobrist_board_hash(board, p1_pieces, p2_pieces):
+    """
+    Computes the side-independent part of the Zobrist hash (pieces on the board and piece counts) from scratch.
+    Game keeps this value up to date incrementally in board_hash.
+    """
+    h = ZOBRIST_P1_COUNT[p1_pieces] ^ ZOBRIST_P2_COUNT[p2_pieces]
+    for r in range(BOARD_SIZE):
+        for c in range(BOARD_SIZE):
+            tile = board[r][c]
+            if tile != EMPTY:
+                h ^= ZOBRIST_PIECES[tile][r][c]
+    return h
+
 def array_to_chess_notation(move: list[int]) -> str:
     """
     Convert array coordinates (0-7, 0-7) to chess notation (a1-h8).
@@ -36,6 +100,25 @@ def chess_notation_to_array(notation: str) -> list[int]:
     # Single move (2 characters) or full move (4 characters)
     return to_array(notation[:2]) + (to_array(notation[2:]) if len(notation) == 4 else [])
 
+NUM_MOVE_CODES = BOARD_SIZE ** 2 + BOARD_SIZE ** 4   # Placements first, then every (source, destination) pair
+
+def encode_move(move) -> int:
+    """
+    Pack a move into one integer: r*8+c for a placement, 64 + (r0*8+c0)*64 + r1*8+c1 for a movement.
+    """
+    if len(move) == 2:
+        return move[0] * BOARD_SIZE + move[1]
+    return BOARD_SIZE ** 2 + (move[0] * BOARD_SIZE + move[1]) * BOARD_SIZE ** 2 + move[2] * BOARD_SIZE + move[3]
+
+def decode_move(code: int) -> tuple:
+    """
+    Inverse of encode_move.
+    """
+    if code < BOARD_SIZE ** 2:
+        return divmod(code, BOARD_SIZE)
+    source, target = divmod(code - BOARD_SIZE ** 2, BOARD_SIZE ** 2)
+    return divmod(source, BOARD_SIZE) + divmod(target, BOARD_SIZE)
+
 class Game:
     def __init__(self):
         self.board = np.full((BOARD_SIZE, BOARD_SIZE), 0)   # Board represented as a np array of empty spaces (0s)
@@ -43,6 +126,7 @@ class Game:
         self.turn_count = 0                                 # Number of turns elapsed in the game
         self.p1_pieces = 0                                  # Number of pieces that Player1 has placed on the board
         self.p2_pieces = 0                                  # Number of pieces that Player2 has placed on the board
+        self.board_hash = ZOBRIST_P1_COUNT[0] ^ ZOBRIST_P2_COUNT[0]  # Zobrist hash of the pieces and piece counts, see zobrist_hash
 
     def make_move(self, move):
         if len(move) == 2:
@@ -53,6 +137,46 @@ class Game:
             self.move_checker(r0, c0, r1, c1)
         else:
             raise ValueError("Invalid move format. Must be a tuple of 2 or 4 integers.")
+
+    # 64-bit Zobrist hash of the position: pieces on the board, side to move and piece counts
+    @property
+    def zobrist_hash(self):
+        if self.current_player == PLAYER2:
+            return self.board_hash ^ ZOBRIST_SIDE
+        return self.board_hash
+
+    # Applies a move in place (like make_move) and returns the MoveRecord needed to undo it
+    def apply_move(self, move):
+        player = self.current_player
+        board_hash = self.board_hash
+        if len(move) == 2:
+            pushed = self.place_checker(move[0], move[1])
+        elif len(move) == 4:
+            pushed = self.move_checker(move[0], move[1], move[2], move[3])
+        else:
+            raise ValueError("Invalid move format. Must be a tuple of 2 or 4 integers.")
+        return MoveRecord(player, move, pushed, board_hash)
+
+    # Restores the exact state from before the apply_move call that returned the record.
+    # Also restores current_player, so it does not matter whether the caller swapped players in between
+    def undo(self, record):
+        board = self.board
+        for (r1, c1), (r2, c2) in reversed(record.pushed):
+            board[r1][c1] = board[r2][c2]
+            board[r2][c2] = EMPTY
+        move = record.move
+        if len(move) == 2:
+            board[move[0]][move[1]] = EMPTY
+            if record.player == PLAYER1:
+                self.p1_pieces -= 1
+            else:
+                self.p2_pieces -= 1
+        else:
+            board[move[2]][move[3]] = EMPTY
+            board[move[0]][move[1]] = record.player
+        self.current_player = record.player
+        self.board_hash = record.board_hash
+
     def clone(self):
         return Game.from_dict(self.to_dict())
     # Converts all variables of the game to a dictionary
@@ -63,6 +187,7 @@ class Game:
             "turn_count": self.turn_count,
             "p1_pieces": self.p1_pieces,
             "p2_pieces": self.p2_pieces,
+            "hash": self.board_hash,
         }
     
     # Creates a Game object given a dictionary of variables from the game
@@ -74,6 +199,32 @@ class Game:
         game.turn_count = data["turn_count"]
         game.p1_pieces = data["p1_pieces"]
         game.p2_pieces = data["p2_pieces"]
+        if "hash" in data:
+            game.board_hash = data["hash"]
+        else:
+            game.board_hash = zobrist_board_hash(game.board, game.p1_pieces, game.p2_pieces)
+        return game
+
+    # Packs the game into GAME_STRUCT bytes
+    def to_bytes(self):
+        flat = np.asarray(self.board).reshape(BOARD_SIZE * BOARD_SIZE)
+        p1_mask = int(np.packbits(flat == PLAYER1, bitorder='little').view('<u8')[0])
+        p2_mask = int(np.packbits(flat == PLAYER2, bitorder='little').view('<u8')[0])
+        return GAME_STRUCT.pack(p1_mask, p2_mask, self.current_player, self.turn_count, self.p1_pieces, self.p2_pieces)
+
+    # Creates a Game object from GAME_STRUCT bytes (extra trailing bytes are ignored)
+    @classmethod
+    def from_bytes(cls, data):
+        p1_mask, p2_mask, current_player, turn_count, p1_pieces, p2_pieces = GAME_STRUCT.unpack_from(data)
+        masks = np.array([p1_mask, p2_mask], dtype='<u8').view(np.uint8)
+        p1_cells, p2_cells = np.unpackbits(masks, bitorder='little').reshape(2, BOARD_SIZE * BOARD_SIZE).astype(np.int64)
+        game = cls()
+        game.board = (p1_cells - p2_cells).reshape(BOARD_SIZE, BOARD_SIZE)
+        game.current_player = current_player
+        game.turn_count = turn_count
+        game.p1_pieces = p1_pieces
+        game.p2_pieces = p2_pieces
+        game.board_hash = zobrist_board_hash(game.board, p1_pieces, p2_pieces)
         return game
 
     # Displays the board
@@ -86,52 +237,118 @@ class Game:
         for row in self.board:
             print(' '.join(tile_symbols[tile] for tile in row))
 
-    # Checks if the potential PLACEMENT of the piece is valid
+    # Checks if the potential PLACEMENT of the piece is valid, printing why not
     def is_valid_placement(self, row, col):
-        if self.current_player == PLAYER1 and self.p1_pieces >= NUM_PIECES:
-            print("White has moved all pieces. Must move an existing piece")
-            return False
-        if self.current_player == PLAYER2 and self.p2_pieces >= NUM_PIECES:
-            print("Black has moved all pieces. Must move an existing piece")
-            return False
-        return 0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE and self.board[row][col] == EMPTY
-
-    # Checks if the potential MOVEMENT of the piece is valid
+        status = self.placement_status(row, col)
+        if status == NO_PIECES_LEFT:
+            print(f"{'White' if self.current_player == PLAYER1 else 'Black'} has moved all pieces. Must move an existing piece")
+        return status == MOVE_OK
+
+    # Checks if the potential MOVEMENT of the piece is valid, printing why not
     def is_valid_move(self, r0, c0, r1, c1):
-        # in bounds
-        if not (0 <= r0 < BOARD_SIZE and 0 <= c0 < BOARD_SIZE and 
+        status = self.move_status(r0, c0, r1, c1)
+        if status == NOT_OWN_PIECE or status == SQUARE_OCCUPIED:
+            print(MOVE_STATUS_MESSAGES[status])
+        return status == MOVE_OK
+
+    # Reason code for the potential PLACEMENT of the piece (MOVE_OK if valid), without printing
+    def placement_status(self, row, col):
+        pieces = self.p1_pieces if self.current_player == PLAYER1 else self.p2_pieces
+        if pieces >= NUM_PIECES:
+            return NO_PIECES_LEFT
+        if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
+            return OUT_OF_BOUNDS
+        if self.board[row][col] != EMPTY:
+            return SQUARE_OCCUPIED
+        return MOVE_OK
+
+    # Reason code for the potential MOVEMENT of the piece (MOVE_OK if valid), without printing
+    def move_status(self, r0, c0, r1, c1):
+        if not (0 <= r0 < BOARD_SIZE and 0 <= c0 < BOARD_SIZE and
                 0 <= r1 < BOARD_SIZE and 0 <= c1 < BOARD_SIZE):
-            return False
-        
-        # is your piece
+            return OUT_OF_BOUNDS
         if self.board[r0][c0] != self.current_player:
-            print("You can only move your own pieces!")
-            return False
-            
-        # is an empty spot
+            return NOT_OWN_PIECE
         if self.board[r1][c1] != EMPTY:
-            print("Destination square must be empty!")
-            return False
-            
-        return True
+            return SQUARE_OCCUPIED
+        return MOVE_OK
+
+    # True if the current player still has pieces to place (placement phase), False if they must move
+    def in_placement_phase(self):
+        pieces = self.p1_pieces if self.current_player == PLAYER1 else self.p2_pieces
+        return pieces < NUM_PIECES
+
+    # Lazily yields every legal move of the current player: (r, c) placements or (r0, c0, r1, c1) movements
+    def iter_moves(self):
+        board = self.board
+        if self.in_placement_phase():
+            for r in range(BOARD_SIZE):
+                for c in range(BOARD_SIZE):
+                    if board[r][c] == EMPTY:
+                        yield (r, c)
+        else:
+            empty = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE) if board[r][c] == EMPTY]
+            for r0 in range(BOARD_SIZE):
+                for c0 in range(BOARD_SIZE):
+                    if board[r0][c0] == self.current_player:
+                        for r1, c1 in empty:
+                            yield (r0, c0, r1, c1)
+
+    # Every legal move of the current player packed with encode_move into an int16 array
+    def legal_moves_array(self):
+        flat = np.asarray(self.board).reshape(BOARD_SIZE * BOARD_SIZE)
+        empty = np.flatnonzero(flat == EMPTY)
+        if self.in_placement_phase():
+            return empty.astype(np.int16)
+        own = np.flatnonzero(flat == self.current_player)
+        return (BOARD_SIZE ** 2 + own[:, None] * BOARD_SIZE ** 2 + empty[None, :]).ravel().astype(np.int16)
+
+    # Uniformly random legal move, drawn by sampling squares until one fits instead of building the move list.
+    # Every (own piece, empty square) pair is a legal movement, so source and destination are drawn independently
+    def random_move(self, rng=random):
+        board = self.board
+        num_cells = BOARD_SIZE * BOARD_SIZE
+        for _ in range(4 * num_cells):
+            r1, c1 = divmod(rng.randrange(num_cells), BOARD_SIZE)
+            if board[r1][c1] == EMPTY:
+                break
+        else:
+            return self._random_move_from_list(rng)
+        if self.in_placement_phase():
+            return (r1, c1)
+        for _ in range(4 * num_cells):
+            r0, c0 = divmod(rng.randrange(num_cells), BOARD_SIZE)
+            if board[r0][c0] == self.current_player:
+                return (r0, c0, r1, c1)
+        return self._random_move_from_list(rng)
+
+    def _random_move_from_list(self, rng):
+        moves = list(self.iter_moves())
+        return rng.choice(moves) if moves else None
      
     # Handles the PLACEMENT of the checker
     def place_checker(self, r, c):
         self.board[r][c] = self.current_player
         if self.current_player == PLAYER1:
+            self.board_hash ^= ZOBRIST_P1_COUNT[self.p1_pieces] ^ ZOBRIST_P1_COUNT[self.p1_pieces + 1]
             self.p1_pieces += 1
         else:
+            self.board_hash ^= ZOBRIST_P2_COUNT[self.p2_pieces] ^ ZOBRIST_P2_COUNT[self.p2_pieces + 1]
             self.p2_pieces += 1
-        self.push_neighbors(r, c)
+        self.board_hash ^= ZOBRIST_PIECES[self.current_player][r][c]
+        return self.push_neighbors(r, c)
 
     # Handles the MOVEMENT of the checker
     def move_checker(self, r0, c0, r1, c1):
         self.board[r0][c0] = EMPTY
         self.board[r1][c1] = self.current_player
-        self.push_neighbors(r1, c1)
+        keys = ZOBRIST_PIECES[self.current_player]
+        self.board_hash ^= keys[r0][c0] ^ keys[r1][c1]
+        return self.push_neighbors(r1, c1)
 
-    # Push mechanic - Pushes all pieces away
+    # Push mechanic - Pushes all pieces away. Returns the ((r1, c1), (r2, c2)) squares of every pushed piece
     def push_neighbors(self, r0, c0):
+        pushed = []
         dirs = [(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)]
         for dr, dc in dirs:
             # (r1, c1) is a 1-tile (immediate) neighbor of (r0, c0) in the direction (dr, dc)
@@ -140,91 +357,35 @@ class Game:
                 # (r2, c2) is a 2-tile (secondary) neighbor of (r0, c0) in the direction (dr, dc)
                 r2, c2 = _torus(r1 + dr, c1 + dc)
                 if self.board[r2][c2] == EMPTY:
+                    keys = ZOBRIST_PIECES[self.board[r1][c1]]
+                    self.board_hash ^= keys[r1][c1] ^ keys[r2][c2]
                     self.board[r2][c2], self.board[r1][c1] = self.board[r1][c1], self.board[r2][c2]
+                    pushed.append(((r1, c1), (r2, c2)))
+        return pushed
 
     # checks for a winner - 3 in a row
     def check_winner(self):
+        return self._winner_of(WIN_LINES)
+
+    # check_winner right after apply_move returned record, for a position that had no winner before
+    # the move: only the lines through the squares that gained a piece (the move's destination and
+    # every push destination) can have become complete, so only those are scanned
+    def check_winner_after(self, record):
+        move = record.move
+        cells = [(move[-2], move[-1])] + [target for _, target in record.pushed]
+        return self._winner_of([line for cell in cells for line in LINES_BY_CELL[cell]])
+
+    def _winner_of(self, lines):
         player1_wins = False
         player2_wins = False
-        # check rows
-        for row in range(0, BOARD_SIZE):
-            cnt = 0
-            tile = EMPTY
-            for col in range(-2, BOARD_SIZE+2):
-                r, c = _torus(row, col)
-                curr_tile = self.board[r][c]
-                if curr_tile == EMPTY:
-                    cnt = 0
-                elif curr_tile != tile:
-                    cnt = 1
-                else:
-                    cnt += 1
-                    if (cnt == 3):
-                        if tile == PLAYER1:
-                            player1_wins = True
-                        elif tile == PLAYER2:
-                            player2_wins = True
-                tile = self.board[r][c]
-
-        # check cols
-        for col in range(0, BOARD_SIZE):
-            cnt = 0
-            tile = EMPTY
-            for row in range(-2, BOARD_SIZE+2):
-                r, c = _torus(row, col)
-                curr_tile = self.board[r][c]
-                if curr_tile == EMPTY:
-                    cnt = 0
-                elif curr_tile != tile:
-                    cnt = 1
-                else:
-                    cnt += 1
-                    if (cnt == 3):
-                        if tile == PLAYER1:
-                            player1_wins = True
-                        elif tile == PLAYER2:
-                            player2_wins = True
-                tile = self.board[r][c]
-
-        # check negative diagonals
-        for col_start in range(0, BOARD_SIZE):
-            cnt = 0
-            tile = EMPTY
-            for i in range(-2, BOARD_SIZE+2):
-                r, c = _torus(i, col_start + i)
-                curr_tile = self.board[r][c]
-                if curr_tile == EMPTY:
-                    cnt = 0
-                elif curr_tile != tile:
-                    cnt = 1
-                else:
-                    cnt += 1
-                    if (cnt == 3):
-                        if tile == PLAYER1:
-                            player1_wins = True
-                        elif tile == PLAYER2:
-                            player2_wins = True
-                tile = self.board[r][c]
-
-        # check positive diagonals
-        for col_start in range(0, BOARD_SIZE):
-            cnt = 0
-            tile = EMPTY
-            for i in range(-2, BOARD_SIZE+2):
-                r, c = _torus(i, col_start - i)
-                curr_tile = self.board[r][c]
-                if curr_tile == EMPTY:
-                    cnt = 0
-                elif curr_tile != tile:
-                    cnt = 1
+        board = self.board
+        for a, b, c in lines:
+            tile = board[a]
+            if tile != EMPTY and tile == board[b] and tile == board[c]:
+                if tile == PLAYER1:
+                    player1_wins = True
                 else:
-                    cnt += 1
-                    if (cnt == 3):
-                        if tile == PLAYER1:
-                            player1_wins = True
-                        elif tile == PLAYER2:
-                            player2_wins = True
-                tile = self.board[r][c]
+                    player2_wins = True
 
         if player1_wins and player2_wins:
             return self.current_player
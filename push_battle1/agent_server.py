@@ -0,0 +1,204 @@
+import os
+import random
+import threading
+import time
+from flask import Flask, request, jsonify
+from PushBattle import Game, EMPTY
+from wire import CONTENT_TYPE, SESSION_HEADER, ENGINE_TIME_HEADER, choose_encoding, decode_move_request
+from sessions import AgentSession, SessionStore, ResyncRequired
+from time_manager import TimeManager
+from opening_book import OpeningBook, DEFAULT_PATH
+from mcts_tree import MCTSTree
+from transposition import TranspositionTable
+from MCTSAgent import FastMCTSAgent
+from alphabeta_agent import AlphaBetaAgent
+
+'''
+Agent server for many games at once, run by gunicorn with the settings of gunicorn.conf.py:
+
+    gunicorn --config gunicorn.conf.py agent_server:app
+
+player1.py keeps one agent in a global and runs the Flask development server. This server gives
+every game its own agent, time manager and position in an AgentSession, kept in the SessionStore
+of the worker process. Importing the module loads the opening book; warm_up runs short searches
+so the first game pays no start-up costs. gunicorn.conf.py calls it from the when_ready hook,
+which with preload_app runs in the master before the workers are forked, so they start warm.
+GET /ready answers 200 once warm_up has run, 503 before.
+
+Sessions live in the worker that created them. The judge keeps one connection per player for a
+whole game (transport.py) and gthread workers serve a connection from one process, so a game
+normally stays in its worker. A /move reaching a worker without the session gets 409; the judge
+then resends the full position and that worker continues the game with a fresh agent.
+
+Memory is bounded per session: the MCTS tree stops expanding at SESSION_TREE_NODES nodes and the
+transposition table has 2^SESSION_TT_BITS slots. Each worker holds at most MAX_SESSIONS sessions,
+drops sessions idle for IDLE_TIMEOUT seconds, and releases a session on /end. Games of judges that
+do not offer sessions share one agent per worker, replaced on every such /start.
+'''
+
+AGENT_ENV = "PUSHBATTLE_AGENT"  # "mcts" (default) or "alphabeta", as for player1.py
+BOOK_ENV = "PUSHBATTLE_BOOK"    # Opening book file (opening_book.py)
+MAX_SESSIONS = int(os.environ.get("PUSHBATTLE_MAX_SESSIONS", 32))       # Sessions per worker process
+IDLE_TIMEOUT = float(os.environ.get("PUSHBATTLE_IDLE_TIMEOUT", 300))    # Seconds before an idle session is dropped
+SESSION_TREE_NODES = 1 << 17    # MCTS tree nodes per session, about 6 MB
+SESSION_TT_BITS = 16            # Transposition table slots per session (2^16, about 2 MB)
+WARMUP_TIME = 0.2               # Seconds of each warm-up search
+
+app = Flask(__name__)
+
+store = SessionStore(MAX_SESSIONS, IDLE_TIMEOUT)
+default_latency = None  # max_latency of the last /start, for games without a session
+default_agent = None    # Agent of the games without a session, created by their /start or first /move
+default_lock = threading.Lock()     # Held while a request uses default_agent
+ready = False           # Set once warm_up has run
+book_path = os.environ.get(BOOK_ENV, os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_PATH))
+book = OpeningBook(book_path) if os.path.exists(book_path) else None
+
+
+def new_agent(max_latency=None):
+    """Agent for one game, with tables of the bounded session size and its own time manager"""
+    if os.environ.get(AGENT_ENV, "mcts") == "alphabeta":
+        agent = AlphaBetaAgent(tt_bits=SESSION_TT_BITS)
+    else:
+        agent = FastMCTSAgent()
+        agent.tt = TranspositionTable(SESSION_TT_BITS)
+        agent.tree = MCTSTree(max_nodes=SESSION_TREE_NODES)
+    agent.time_manager = TimeManager(max_latency) if max_latency else TimeManager()
+    return agent
+
+def warm_up():
+    """Short searches of a placement and a movement position, so the first game pays no start-up costs"""
+    global ready
+    rng = random.Random(0)
+    game = Game()
+    positions = [game.clone()]
+    while game.in_placement_phase() or game.turn_count < 20:
+        game.apply_move(game.random_move(rng))
+        if game.check_winner() != EMPTY:
+            game = Game()
+            continue
+        game.current_player *= -1
+        game.turn_count += 1
+    positions.append(game)
+    for position in positions:
+        agent = new_agent()
+        agent.time_manager = None
+        agent.time_limit = WARMUP_TIME
+        agent.get_best_move(position)
+        if book is not None:
+            book.lookup(position)
+    ready = True
+
+
+@app.route('/', methods=['GET'])
+def hello():
+    """Connects to the judge"""
+    return jsonify({
+        "message": "Successfully Connected",
+    })
+
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 once this worker has loaded and warmed up, else 503"""
+    reply = {
+        "ready": ready,
+        "pid": os.getpid(),
+        "sessions": len(store),
+        "max_sessions": store.max_sessions,
+        "evicted": store.evicted,
+    }
+    return jsonify(reply), 200 if ready else 503
+
+@app.route('/start', methods=['POST'])
+def start_game():
+    """Creates the session of a new game when the judge offers sessions (see player1.start_game for the values)"""
+    global default_latency, default_agent
+    data = request.get_json()
+    game = Game.from_dict(data.get('game'))
+    max_latency = data.get('max_latency')
+    store.evict_idle()
+    reply = {
+        "message": "Game started successfully",
+        "encoding": choose_encoding(data.get('encodings')),
+    }
+    if data.get('sessions'):
+        session = store.add(AgentSession(new_agent(max_latency), game))
+        reply["session_id"] = session.session_id
+    else:
+        default_latency = max_latency or default_latency
+        with default_lock:
+            default_agent = new_agent(default_latency)
+    return jsonify(reply)
+
+@app.route('/move', methods=['POST'])
+def make_move():
+    """Searches the game's position with the game's agent (see player1.make_move for the payloads)"""
+    global default_agent
+    request_start = time.time()
+    session_id = request.headers.get(SESSION_HEADER)
+    session = store.get(session_id) if session_id else None
+    if session is None and session_id:
+        # Started in another worker or evicted: 409 unless this request carries the full position
+        if request.content_type == CONTENT_TYPE or 'game' in (request.get_json(silent=True) or {}):
+            session = store.add(AgentSession(new_agent(default_latency), Game(), session_id))
+        else:
+            return jsonify({"resync": True}), 409
+    if session is None:
+        with default_lock:
+            if default_agent is None:
+                default_agent = new_agent(default_latency)
+            return search(request_start, None, default_agent)
+    with session.lock:
+        return search(request_start, session, session.agent)
+
+def search(request_start, session, agent):
+    """Reads the /move request, searches it with agent and replies; session is None without sessions"""
+    if request.content_type == CONTENT_TYPE:
+        data = decode_move_request(request.get_data())
+        game = data['game']
+    else:
+        data = request.get_json()
+        if 'game' in data:
+            game = Game.from_dict(data.get('game'))
+        else:
+            try:
+                if session is None:
+                    raise ResyncRequired()
+                session.sync(data.get('last_move'), data.get('hash'), data.get('turn_count'))
+            except ResyncRequired:
+                return jsonify({"resync": True}), 409
+            game = session.game
+    turn_count = data.get('turn_count')
+    if session is not None and game is not session.game:
+        session.reset(game)
+
+    search_start = time.time()
+    move = book.lookup(game) if book is not None else None
+    if move is None:
+        move = agent.get_best_move(game)
+    search_time = time.time() - search_start
+
+    if session is not None:
+        session.commit_move(move, turn_count)
+    response = jsonify({
+        "move": move
+    })
+    response.headers[ENGINE_TIME_HEADER] = repr(search_time)
+    agent.time_manager.record_overhead(time.time() - request_start - search_time)
+    return response
+
+@app.route('/end', methods=['POST'])
+def end_game():
+    """Handle game end notification: releases the game's session"""
+    session_id = request.headers.get(SESSION_HEADER)
+    if session_id:
+        store.remove(session_id)
+    return jsonify({
+        "message": "Game ended successfully"
+    })
+
+
+if __name__ == '__main__':
+    # Without gunicorn: one process, a thread per request
+    warm_up()
+    app.run(host='0.0.0.0', port=5000, threaded=True)
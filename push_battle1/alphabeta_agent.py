@@ -0,0 +1,269 @@
+import time
+from PushBattle import PLAYER1, PLAYER2, EMPTY, decode_move
+from bitboard import BitboardGame, FULL_MASK, adjacent_pairs, cell_bit
+from bitboard import shift_east, shift_west, shift_south, shift_north
+from transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from symmetry import unique_moves
+
+'''
+Negamax alpha-beta agent.
+
+get_best_move searches the position on a BitboardGame copy with iterative deepening until
+the time budget (time_limit, or the TimeManager if one is set) runs out, and plays the best
+move of the deepest completed iteration. Each iteration after the first starts with an
+aspiration window around the previous score and searches again with the full window when the
+score falls outside it.
+
+Moves are ordered by the transposition table move, then the two killer moves of the ply, then
+the history score of the move. Scores are for the player to move; a win found at ply p scores
+WIN_SCORE - p so the search prefers the quickest win and the slowest loss. Leaves are scored by
+evaluate from open lines, adjacent pairs, center and protected pieces of both players.
+evaluate is computed from scratch at each leaf: shift-and-mask over the bitboards costs less
+than keeping per-line counts up to date through every apply_move and undo of the search.
+'''
+
+WIN_SCORE = 100000
+WIN_BOUND = WIN_SCORE - 1000    # Scores beyond this are wins or losses
+ASPIRATION_WINDOW = 50
+MAX_DEPTH = 64
+TIME_CHECK_INTERVAL = 256       # Nodes between two looks at the clock
+
+CENTER_MASK = cell_bit(3, 3) | cell_bit(3, 4) | cell_bit(4, 3) | cell_bit(4, 4)
+
+
+def _south_east(mask):
+    return shift_east(shift_south(mask))
+
+def _south_west(mask):
+    return shift_west(shift_south(mask))
+
+LINE_SHIFTS = (shift_east, shift_south, _south_east, _south_west)   # One per direction of WIN_LINES
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+def line_counts(own, opponent):
+    """(open ones, open twos): WIN_LINES holding 1 or 2 squares of own and none of opponent"""
+    free = FULL_MASK ^ opponent
+    ones = twos = 0
+    for shift in LINE_SHIFTS:
+        # Bit y of x1 / x2 is the square one / two steps back from y: the three squares of the line ending at y
+        free1 = shift(free)
+        open_line = free & free1 & shift(free1)
+        x0 = own & open_line
+        x1 = shift(own)
+        x2 = shift(x1) & open_line
+        x1 &= open_line
+        all3 = x0 & x1 & x2
+        ones += _popcount((x0 ^ x1 ^ x2) & ~all3)
+        twos += _popcount(((x0 & x1) | (x0 & x2) | (x1 & x2)) & ~all3)
+    return ones, twos
+
+def protected_count(own, opponent):
+    """Pieces of own that is_protected: no opponent piece beside them without an own piece on the opposite side"""
+    unsafe = ((shift_west(opponent) & ~shift_east(own)) | (shift_east(opponent) & ~shift_west(own))
+              | (shift_north(opponent) & ~shift_south(own)) | (shift_south(opponent) & ~shift_north(own)))
+    return _popcount(own & ~unsafe)
+
+def evaluate(game, player):
+    """Score of player from open lines, adjacent pairs, center and protected pieces, minus the opponent's"""
+    def terms(own, opponent):
+        ones, twos = line_counts(own, opponent)
+        return (100 * twos + 2 * ones + 10 * adjacent_pairs(own)
+                + 5 * _popcount(own & CENTER_MASK) + 3 * protected_count(own, opponent))
+    own = game.player_mask(player)
+    opponent = game.player_mask(-player)
+    return terms(own, opponent) - terms(opponent, own)
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class AlphaBetaAgent:
+    def __init__(self, player=PLAYER1, tt_bits=18):
+        self.player = player
+        self.time_limit = 0.95
+        self.max_depth = MAX_DEPTH  # Deepest iteration of iterative deepening
+        self.time_manager = None  # TimeManager setting the search time per move (None = time_limit)
+        self.tt = TranspositionTable(tt_bits)  # Scores and best moves, kept for the whole game
+        self.killers = [[None, None] for _ in range(MAX_DEPTH + 1)]  # Two moves per ply that caused a cutoff
+        self.history = {}  # move -> accumulated depth^2 of the cutoffs it caused
+        self.search_stats = {}
+        self.nodes = 0
+        self.end_time = None
+
+    def get_possible_moves(self, game):
+        """Returns list of all possible moves in current state"""
+        return list(game.iter_moves())
+
+    def get_best_move(self, game):
+        """Returns the best move of the deepest completed alpha-beta iteration"""
+        if self.time_manager is not None:
+            self.time_manager.start()
+        start_time = time.time()
+        game = BitboardGame.from_game(game)
+        self.player = game.current_player
+        moves = unique_moves(game, self.get_possible_moves(game))
+        if not moves:
+            return None
+
+        # Moves that end the game on the spot: win at once, keep losing pushes for last
+        terminal = [self.move_result(game, move) for move in moves]
+        if 1 in terminal:
+            self.search_stats = {"depth": 1, "nodes": len(moves), "nps": 0, "score": WIN_SCORE - 1}
+            return moves[terminal.index(1)]
+        if self.time_manager is not None:
+            self.end_time = self.time_manager.plan(game, terminal)
+        else:
+            self.end_time = start_time + self.time_limit
+        moves = [move for _, move in sorted(zip(terminal, moves), key=lambda item: -item[0])]
+
+        self.tt.new_search()
+        for move in list(self.history):
+            self.history[move] //= 2  # Older cutoffs count less
+        self.killers = [[None, None] for _ in range(MAX_DEPTH + 1)]
+        self.nodes = 0
+        best_move, score, depth = moves[0], 0, 0
+        for iteration in range(1, self.max_depth + 1):
+            try:
+                if iteration == 1:
+                    result = self.search_root(game, moves, iteration, -WIN_SCORE, WIN_SCORE)
+                else:
+                    alpha, beta = score - ASPIRATION_WINDOW, score + ASPIRATION_WINDOW
+                    result = self.search_root(game, moves, iteration, alpha, beta)
+                    if not alpha < result[1] < beta:
+                        result = self.search_root(game, moves, iteration, -WIN_SCORE, WIN_SCORE)
+            except SearchTimeout:
+                break
+            best_move, score = result
+            depth = iteration
+            moves.remove(best_move)
+            moves.insert(0, best_move)  # The next iteration searches the best move first
+            if abs(score) > WIN_BOUND or time.time() >= self.end_time:
+                break
+
+        elapsed = time.time() - start_time
+        self.search_stats = self.tt.stats()
+        self.search_stats.update({
+            "depth": depth,
+            "nodes": self.nodes,
+            "nps": int(self.nodes / elapsed) if elapsed > 0 else 0,
+            "score": score,
+        })
+        return best_move
+
+    def move_result(self, game, move):
+        """+1 if move wins on the spot for the player to move, -1 if it completes an opponent line, else 0"""
+        record = game.apply_move(move)
+        winner = game.check_winner()
+        game.undo(record)
+        if winner == EMPTY:
+            return 0
+        return 1 if winner == record.player else -1
+
+    def search_root(self, game, moves, depth, alpha, beta):
+        """(best move, score) of a full-depth search of the root moves in order; score is a bound outside (alpha, beta)"""
+        best_move, best_score = moves[0], -WIN_SCORE
+        for move in moves:
+            score = self.search_move(game, move, depth, -beta, -max(alpha, best_score), 0)
+            if score > best_score:
+                best_move, best_score = move, score
+                if score >= beta:
+                    break
+        self.tt.store(game.zobrist_hash, 0, best_score, best_move, depth,
+                      LOWER_BOUND if best_score >= beta else UPPER_BOUND if best_score <= alpha else EXACT)
+        return best_move, best_score
+
+    def search_move(self, game, move, depth, alpha, beta, ply):
+        """Score of move for the player playing it; alpha and beta are the window of the opponent's reply"""
+        record = game.apply_move(move)
+        winner = game.check_winner()  # Before the player swap: if both players have a line, the mover wins
+        if winner != EMPTY:
+            score = WIN_SCORE - ply - 1 if winner == record.player else -(WIN_SCORE - ply - 1)
+        else:
+            game.current_player = -record.player
+            score = -self.negamax(game, depth - 1, alpha, beta, ply + 1)
+        game.undo(record)
+        return score
+
+    def negamax(self, game, depth, alpha, beta, ply):
+        """Score of game for the player to move, exact inside (alpha, beta)"""
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0 and time.time() >= self.end_time:
+            raise SearchTimeout()
+        if depth <= 0:
+            return evaluate(game, game.current_player)
+
+        key = game.zobrist_hash
+        tt_move = None
+        slot = self.tt.probe(key)
+        if slot >= 0:
+            code = int(self.tt.best_moves[slot])
+            tt_move = decode_move(code) if code >= 0 else None
+            if self.tt.depths[slot] >= depth:
+                score = from_tt(float(self.tt.value_sums[slot]), ply)
+                bound = self.tt.bounds[slot]
+                if bound == EXACT or (bound == LOWER_BOUND and score >= beta) or (bound == UPPER_BOUND and score <= alpha):
+                    return score
+
+        moves = self.order_moves(game.iter_moves(), tt_move, ply)
+        if not moves:
+            return 0  # No legal moves: draw
+        original_alpha = alpha
+        best_move, best_score = moves[0], -WIN_SCORE
+        for move in moves:
+            score = self.search_move(game, move, depth, -beta, -alpha, ply)
+            if score > best_score:
+                best_move, best_score = move, score
+                if score > alpha:
+                    alpha = score
+                    if score >= beta:
+                        self.record_cutoff(move, depth, ply)
+                        break
+
+        if best_score >= beta:
+            bound = LOWER_BOUND
+        elif best_score <= original_alpha:
+            bound = UPPER_BOUND
+        else:
+            bound = EXACT
+        self.tt.store(key, 0, to_tt(best_score, ply), best_move, depth, bound)
+        return best_score
+
+    def order_moves(self, moves, tt_move, ply):
+        """Transposition table move, then the killers of the ply, then by history score"""
+        history = self.history
+        ordered = sorted(moves, key=lambda move: history.get(move, 0), reverse=True)
+        first = [tt_move] + [move for move in self.killers[ply] if move != tt_move]
+        # Killers and the TT move are only searched early if they are legal here
+        legal_moves = set(ordered)
+        first = [move for move in first if move in legal_moves]
+        if not first:
+            return ordered
+        return first + [move for move in ordered if move not in first]
+
+    def record_cutoff(self, move, depth, ply):
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+
+def to_tt(score, ply):
+    """Win scores are stored relative to the node, not the root"""
+    if score > WIN_BOUND:
+        return score + ply
+    if score < -WIN_BOUND:
+        return score - ply
+    return score
+
+def from_tt(score, ply):
+    if score > WIN_BOUND:
+        return score - ply
+    if score < -WIN_BOUND:
+        return score + ply
+    return score
+
@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PushBattle import Game, PLAYER1, PLAYER2, EMPTY
+from judge_engine import Judge
+from tournament import schedule
+
+'''
+Asyncio judge: one process driving many matches at once.
+
+Every match is played by a Judge, so moves are checked, played and forfeited by the same code
+as judge_engine.main. The blocking transport calls of a match run on a shared thread pool and
+the match coroutine awaits them: the health check, /start and /end go to both players at once,
+/move requests follow the game one at a time.
+
+run_matches plays a list of (p1, p2) pairings (URLs or transports, see transport.py) with at
+most `concurrency` matches in flight. A match running longer than match_timeout seconds is
+scored a draw with reason "timeout"; its players get /end once the request in flight returns.
+max_turns, if set, also ends a match as a draw.
+'''
+
+RANDOM_MOVES = 5        # Random move fallbacks per player, as in judge_engine.main
+CONCURRENCY = 32        # Matches in flight
+MATCH_TIMEOUT = 600     # Seconds a match may run
+
+
+class AsyncMatch:
+    def __init__(self, p1_url, p2_url, executor, match_id=0, max_turns=None, game_cls=Game):
+        self.lines = []                 # What the judge reported, one entry per line
+        self.judge = Judge(p1_url, p2_url, game_cls, log=self.lines.append)
+        self.executor = executor
+        self.match_id = match_id
+        self.max_turns = max_turns
+        self.random_left = {PLAYER1: RANDOM_MOVES, PLAYER2: RANDOM_MOVES}
+        self.running = set()            # Judge calls in flight on the executor
+        self.started = False            # Whether the players were sent /start, and /end
+        self.ended = False
+
+    def call(self, fn, *args):
+        """Runs a blocking Judge method on the executor and returns an awaitable of its result"""
+        future = self.executor.submit(fn, *args)
+        self.running.add(future)
+        future.add_done_callback(self.running.discard)
+        return asyncio.wrap_future(future)
+
+    async def both(self, fn, *args):
+        """Calls fn(PLAYER1, *args) and fn(PLAYER2, *args) at once; True if both succeeded"""
+        results = await asyncio.gather(self.call(fn, PLAYER1, *args), self.call(fn, PLAYER2, *args))
+        return all(results)
+
+    async def play(self):
+        """Plays the match like judge_engine.main and returns (winner, reason)"""
+        judge = self.judge
+        game = judge.game
+        if not await self.both(judge.check_player):
+            return EMPTY, "connect_failed"
+        self.started = True
+        if not await self.both(judge.start_player, judge.starting_data()):
+            return await self.finish(EMPTY, "start_failed")
+        while self.max_turns is None or game.turn_count < self.max_turns:
+            game.turn_count += 1
+            player = game.current_player
+            random_left = (self.random_left[PLAYER1], self.random_left[PLAYER2])
+            result = await self.call(judge.receive_move, 1, *random_left)
+            if result is False:
+                result = await self.call(judge.receive_move, 2, *random_left)
+            if result == "forfeit":
+                judge.game_str += "-q"
+                return await self.finish(-player, "forfeit")
+            if result is False:
+                if self.random_left[player] == 0:
+                    judge.game_str += "-q"
+                    return await self.finish(-player, "no_random_moves")
+                move = game.random_move()
+                if move is None:
+                    return await self.finish(EMPTY, "no_moves")
+                judge.handle_move(game, list(move))
+                judge.game_str += "r"
+                self.random_left[player] -= 1
+            winner = game.check_winner()
+            if winner != EMPTY:
+                return await self.finish(winner, "line")
+            game.current_player *= -1
+        return await self.finish(EMPTY, "max_turns")
+
+    async def finish(self, winner, reason):
+        """Sends /end to both players and returns (winner, reason)"""
+        self.ended = True
+        await self.both(self.judge.end_player, self.judge.end_data(winner))
+        return winner, reason
+
+    async def run(self, match_timeout=MATCH_TIMEOUT):
+        """Plays the match within match_timeout seconds and returns its result dict"""
+        start = time.time()
+        try:
+            winner, reason = await asyncio.wait_for(self.play(), match_timeout)
+        except asyncio.TimeoutError:
+            winner, reason = EMPTY, "timeout"
+            # The call that was cancelled keeps running on its thread; it has to return before the game is read
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in list(self.running)), return_exceptions=True)
+            if self.started and not self.ended:
+                await self.both(self.judge.end_player, self.judge.end_data(EMPTY))
+        finally:
+            self.judge.close()
+        return {
+            "match": self.match_id,
+            "p1": str(self.judge.p1_url),
+            "p2": str(self.judge.p2_url),
+            "winner": int(winner),
+            "reason": reason,
+            "turns": self.judge.game.turn_count,
+            "game_str": self.judge.game_str,
+            "random_moves": {"p1": RANDOM_MOVES - self.random_left[PLAYER1], "p2": RANDOM_MOVES - self.random_left[PLAYER2]},
+            "time": time.time() - start,
+        }
+
+
+async def run_matches(pairings, concurrency=CONCURRENCY, match_timeout=MATCH_TIMEOUT, max_turns=None, log=None):
+    """Plays every (p1, p2) pairing, at most concurrency at once; returns the results in pairing order"""
+    semaphore = asyncio.Semaphore(concurrency)
+    # A match has at most two calls in flight, one per player
+    with ThreadPoolExecutor(max_workers=2 * concurrency) as executor:
+        async def run(match_id, p1, p2):
+            async with semaphore:
+                result = await AsyncMatch(p1, p2, executor, match_id, max_turns).run(match_timeout)
+            if log is not None:
+                log(f"match {match_id}: {result['reason']}, winner {result['winner']}, {result['turns']} turns, {result['time']:.1f}s")
+            return result
+        return await asyncio.gather(*(run(i, p1, p2) for i, (p1, p2) in enumerate(pairings)))
+
+def play_matches(pairings, concurrency=CONCURRENCY, match_timeout=MATCH_TIMEOUT, max_turns=None, log=None):
+    """Blocking run_matches"""
+    return asyncio.run(run_matches(pairings, concurrency, match_timeout, max_turns, log))
+
+def summarize(results):
+    """Wins, losses and draws of every agent URL, and how the matches ended"""
+    totals = {}
+    reasons = {}
+    for result in results:
+        reasons[result["reason"]] = reasons.get(result["reason"], 0) + 1
+        for side, player in (("p1", PLAYER1), ("p2", PLAYER2)):
+            total = totals.setdefault(result[side], {"wins": 0, "losses": 0, "draws": 0})
+            if result["winner"] == player:
+                total["wins"] += 1
+            elif result["winner"] == EMPTY:
+                total["draws"] += 1
+            else:
+                total["losses"] += 1
+    return {"totals": totals, "reasons": reasons}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Plays round-robin matches between agent servers, many at once")
+    parser.add_argument("agents", nargs="*", help="agent URLs (http://host:port or unix:///path)")
+    parser.add_argument("--games", type=int, default=2, help="matches per pair of agents, colours alternating")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="matches in flight")
+    parser.add_argument("--match-timeout", type=float, default=MATCH_TIMEOUT, help="seconds per match")
+    parser.add_argument("--max-turns", type=int, default=None, help="turns before a match is a draw")
+    parser.add_argument("--stubs", type=int, default=0, help="also start this many local random-move stub agents")
+    parser.add_argument("--out", default=None, help="JSON file for the summary and every match")
+    args = parser.parse_args()
+
+    from stub_agent import StubAgentServer
+    stubs = [StubAgentServer().start() for _ in range(args.stubs)]
+    agents = args.agents + [stub.url for stub in stubs]
+    if len(agents) < 2:
+        parser.error("at least two agents are needed (give URLs or --stubs)")
+    pairings = [(p1, p2) for p1, p2, _ in schedule(agents, args.games)]
+    start = time.time()
+    results = play_matches(pairings, args.concurrency, args.match_timeout, args.max_turns, log=print)
+    summary = summarize(results)
+    print(f"{len(results)} matches in {time.time() - start:.1f}s, endings: {summary['reasons']}")
+    for agent, total in summary["totals"].items():
+        print(f"{agent}: {total['wins']}-{total['losses']}-{total['draws']}")
+    for stub in stubs:
+        stub.stop()
+    if args.out:
+        summary["matches"] = results
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=1)
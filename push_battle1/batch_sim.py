@@ -0,0 +1,125 @@
+import numpy as np
+from PushBattle import PLAYER1, PLAYER2, EMPTY, BOARD_SIZE, NUM_PIECES, _torus
+
+'''
+Lockstep simulator that plays N games of PushBattle at once.
+
+All boards live in a single (N, BOARD_SIZE, BOARD_SIZE) int8 array. Every call to step()
+applies one move to every unfinished game, runs the push mechanic of Game.push_neighbors
+for all of them with table lookups, and checks all boards for 3 in a row with torus rolls.
+Finished games are masked out of later steps.
+'''
+
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+PUSH_DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)]
+LINE_SHIFTS = [(0, -1), (-1, 0), (-1, -1), (-1, 1)]  # np.roll offsets that line up the next square of a row, column and both diagonals
+
+# PUSH_NEIGHBOURS[cell] / PUSH_TARGETS[cell] hold the 1-tile and 2-tile neighbours of cell in each push direction
+PUSH_NEIGHBOURS = np.zeros((NUM_CELLS, len(PUSH_DIRECTIONS)), dtype=np.intp)
+PUSH_TARGETS = np.zeros((NUM_CELLS, len(PUSH_DIRECTIONS)), dtype=np.intp)
+for _r in range(BOARD_SIZE):
+    for _c in range(BOARD_SIZE):
+        for _d, (_dr, _dc) in enumerate(PUSH_DIRECTIONS):
+            _r1, _c1 = _torus(_r + _dr, _c + _dc)
+            _r2, _c2 = _torus(_r1 + _dr, _c1 + _dc)
+            PUSH_NEIGHBOURS[_r * BOARD_SIZE + _c, _d] = _r1 * BOARD_SIZE + _c1
+            PUSH_TARGETS[_r * BOARD_SIZE + _c, _d] = _r2 * BOARD_SIZE + _c2
+
+
+def three_in_row(pieces):
+    """For a (N, BOARD_SIZE, BOARD_SIZE) bool array, returns which boards contain a torus 3 in a row"""
+    found = np.zeros(len(pieces), dtype=bool)
+    for shift in LINE_SHIFTS:
+        once = np.roll(pieces, shift, axis=(1, 2))
+        twice = np.roll(once, shift, axis=(1, 2))
+        found |= (pieces & once & twice).any(axis=(1, 2))
+    return found
+
+
+class BatchGames:
+    def __init__(self, n, rng=None):
+        self.boards = np.zeros((n, BOARD_SIZE, BOARD_SIZE), dtype=np.int8)   # One board per game
+        self.current_player = np.full(n, PLAYER1, dtype=np.int8)              # Player to move in each game
+        self.p1_pieces = np.zeros(n, dtype=np.int8)                           # Pieces placed by Player1 in each game
+        self.p2_pieces = np.zeros(n, dtype=np.int8)                           # Pieces placed by Player2 in each game
+        self.winner = np.zeros(n, dtype=np.int8)                              # EMPTY until the game is won
+        self.active = np.ones(n, dtype=bool)                                  # Games that are still being played
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    # Creates n copies of a Game (or BitboardGame) position
+    @classmethod
+    def from_game(cls, game, n, rng=None):
+        batch = cls(n, rng)
+        batch.boards[:] = np.asarray(game.board, dtype=np.int8)
+        batch.current_player[:] = game.current_player
+        batch.p1_pieces[:] = game.p1_pieces
+        batch.p2_pieces[:] = game.p2_pieces
+        return batch
+
+    def __len__(self):
+        return len(self.boards)
+
+    def random_moves(self):
+        """
+        Draws a uniformly random legal move for every active game.
+        Returns (games, sources, targets): game indices, source cells (-1 for placements) and target cells
+        """
+        games = np.flatnonzero(self.active)
+        flat = self.boards.reshape(len(self.boards), NUM_CELLS)[games]
+        player = self.current_player[games]
+        pieces = np.where(player == PLAYER1, self.p1_pieces[games], self.p2_pieces[games])
+
+        # Random keys on the allowed cells, argmax picks one of them uniformly
+        keys = self.rng.random((len(games), NUM_CELLS))
+        targets = np.where(flat == EMPTY, keys, -1.0).argmax(axis=1)
+        keys = self.rng.random((len(games), NUM_CELLS))
+        sources = np.where(flat == player[:, None], keys, -1.0).argmax(axis=1)
+        sources[pieces < NUM_PIECES] = -1
+        return games, sources, targets
+
+    def step(self, games, sources, targets):
+        """Applies one move to each of the given games, pushes neighbours, checks for wins and passes the turn"""
+        flat = self.boards.reshape(len(self.boards), NUM_CELLS)
+        player = self.current_player[games]
+
+        # Place or move the piece
+        moving = sources >= 0
+        flat[games[moving], sources[moving]] = EMPTY
+        flat[games, targets] = player
+        placing = ~moving
+        self.p1_pieces[games[placing & (player == PLAYER1)]] += 1
+        self.p2_pieces[games[placing & (player == PLAYER2)]] += 1
+
+        # Push mechanic for all 8 directions at once: the neighbour and target cells never overlap
+        rows = np.repeat(games[:, None], len(PUSH_DIRECTIONS), axis=1)
+        neighbours = PUSH_NEIGHBOURS[targets]
+        push_targets = PUSH_TARGETS[targets]
+        neighbour_tiles = flat[rows, neighbours]
+        pushes = (neighbour_tiles != EMPTY) & (flat[rows, push_targets] == EMPTY)
+        flat[rows[pushes], push_targets[pushes]] = neighbour_tiles[pushes]
+        flat[rows[pushes], neighbours[pushes]] = EMPTY
+
+        # Check for winners; if both players have 3 in a row the player that moved wins
+        boards = self.boards[games]
+        player1_wins = three_in_row(boards == PLAYER1)
+        player2_wins = three_in_row(boards == PLAYER2)
+        winner = np.where(player1_wins, PLAYER1, np.where(player2_wins, PLAYER2, EMPTY))
+        winner[player1_wins & player2_wins] = player[player1_wins & player2_wins]
+        self.winner[games] = winner
+        self.active[games] = winner == EMPTY
+
+        self.current_player[games] = -player
+
+    def quick_scores(self, player):
+        """Vectorized FastMCTSAgent.quick_evaluate without the win check: pieces + 5 per horizontal/vertical pair"""
+        own = self.boards == player
+        pairs = (own[:, :, :-1] & own[:, :, 1:]).sum(axis=(1, 2)) + (own[:, :-1, :] & own[:, 1:, :]).sum(axis=(1, 2))
+        return own.sum(axis=(1, 2)) + 5 * pairs
+
+    def rollout(self, max_moves):
+        """Plays random moves in every active game for up to max_moves plies. Returns the winner array"""
+        for _ in range(max_moves):
+            if not self.active.any():
+                break
+            self.step(*self.random_moves())
+        return self.winner
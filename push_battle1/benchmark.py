@@ -0,0 +1,317 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+import numpy as np
+from PushBattle import Game, EMPTY, BOARD_SIZE
+from bitboard import BitboardGame
+from MCTSAgent import MCTSAgent, FastMCTSAgent
+from alphabeta_agent import AlphaBetaAgent, evaluate
+from positions import position
+
+'''
+Benchmarks of the engine and the agents, with JSON baselines.
+
+    python benchmark.py --save baseline.json        # run and store the results
+    python benchmark.py --compare baseline.json     # run and compare against a stored run
+
+Groups (select with --only):
+    perft     move generation node counts from fixed positions, for Game and BitboardGame
+    micro     push_neighbors, check_winner, clone / to_dict / from_dict, evaluate_position,
+              alpha-beta evaluate and BitboardGame apply_move / undo
+    rollout   light_simulation, simulate_game and batch_simulation rollouts per second
+    search    fixed-seed, fixed-iteration (fixed-depth for alpha-beta) searches of each agent
+
+Every benchmark reports "time", seconds per operation (the fastest of REPEATS runs), and those
+with a deterministic outcome a "check": perft node counts, evaluate_position scores, the
+searches' moves and node counts. Game and BitboardGame must agree on every perft count. compare
+flags a benchmark whose time grew by more than the threshold as a regression and a changed
+check as a mismatch; either makes the exit status 1. Times are only comparable between runs on
+the same machine.
+'''
+
+REPEATS = 5                     # Runs per timing, the fastest counts
+MIN_TIME = 1.0                  # Seconds a fast benchmark keeps repeating for, beyond REPEATS runs
+RUN_BUDGET = 3.0                # Seconds after which a slow benchmark stops repeating
+REGRESSION_THRESHOLD = 0.10     # Slowdown flagged by compare
+ROLLOUT_BATCH_TIME = 0.2        # Seconds of rollouts per timed batch
+BATCH_SIZES = (16, 64, 256)     # Rollouts per FastMCTSAgent.batch_simulation call timed
+PUSH_COPIES = 2000              # Fresh positions per push_neighbors timing
+SEED = 0
+GROUPS = ("perft", "micro", "rollout", "search")
+
+PERFT = (("start", 2), ("placement", 2), ("movement", 1), ("movement", 2))     # (position, depth)
+SEARCHES = (("FastMCTSAgent", 2000), ("MCTSAgent", 10), ("AlphaBetaAgent", 3))  # Iterations, depth for alpha-beta
+POSITION_NAMES = ("placement", "movement")    # Positions of the evaluation and rollout benchmarks
+SEARCH_POSITIONS = ("opening", "placement")     # Without forced wins, which the agents would play without searching
+
+
+def perft(game, depth):
+    """Leaf count of the move tree to depth; a move that ends the game is a leaf"""
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in list(game.iter_moves()):
+        record = game.apply_move(move)
+        if depth == 1 or game.check_winner_after(record) != EMPTY:
+            nodes += 1
+        else:
+            game.current_player *= -1
+            nodes += perft(game, depth - 1)
+        game.undo(record)
+    return nodes
+
+def best_time(run, repeats=REPEATS, min_time=MIN_TIME, budget=RUN_BUDGET):
+    """
+    Fastest of repeated timed calls of run(): at least repeats calls and min_time seconds, but no
+    new call once budget seconds have passed. Returns (seconds, result of the last call).
+    """
+    best, result = float("inf"), None
+    start = time.perf_counter()
+    runs = 0
+    while True:
+        run_start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - run_start)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed > budget or (runs >= repeats and elapsed >= min_time):
+            return best, result
+
+def micro(fn):
+    """Seconds per call of fn, timeit style: calls batched to about 0.2 s, fastest of REPEATS batches"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(REPEATS, number)) / number
+
+
+def bench_perft():
+    results = {}
+    for name, depth in PERFT:
+        counts = {}
+        for cls in (Game, BitboardGame):
+            seconds, nodes = best_time(lambda: perft(position(name, cls), depth))
+            counts[cls.__name__] = nodes
+            results[f"perft/{name}/{depth}/{cls.__name__}"] = {
+                "time": seconds / nodes,
+                "nodes_per_second": nodes / seconds,
+                "check": nodes,
+            }
+        if len(set(counts.values())) != 1:
+            raise RuntimeError(f"perft {name} depth {depth} differs between engines: {counts}")
+    return results
+
+def bench_micro():
+    results = {}
+    game = position("movement")
+
+    # Every empty square next to a piece, each pushed on its own fresh copy of the position
+    squares = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)
+               if game.board[r][c] == EMPTY and _has_neighbor(game, r, c)]
+    best = float("inf")
+    for _ in range(REPEATS):
+        copies = [(game.clone(), square) for square, _ in zip(itertools.cycle(squares), range(PUSH_COPIES))]
+        start = time.perf_counter()
+        for copy, (r, c) in copies:
+            copy.push_neighbors(r, c)
+        best = min(best, (time.perf_counter() - start) / PUSH_COPIES)
+    results["micro/push_neighbors"] = {"time": best}
+
+    results["micro/check_winner"] = {"time": micro(game.check_winner), "check": int(game.check_winner())}
+    results["micro/clone"] = {"time": micro(game.clone)}
+    results["micro/to_dict"] = {"time": micro(game.to_dict)}
+    data = game.to_dict()
+    results["micro/from_dict"] = {"time": micro(lambda: Game.from_dict(data))}
+
+    # The alpha-beta leaf evaluation against the make/unmake it would have to ride on to be incremental
+    for name in POSITION_NAMES:
+        board = BitboardGame.from_game(position(name))
+        move = board.random_move(random.Random(SEED))
+        results[f"micro/alphabeta_evaluate/{name}"] = {
+            "time": micro(lambda: evaluate(board, board.current_player)),
+            "check": evaluate(board, board.current_player),
+        }
+        results[f"micro/apply_undo/{name}"] = {"time": micro(lambda: board.undo(board.apply_move(move)))}
+
+    agent = MCTSAgent()
+    for name in POSITION_NAMES:
+        evaluated = position(name)
+        score = agent.evaluate_position(evaluated, evaluated.current_player)
+        results[f"micro/evaluate_position/{name}"] = {
+            "time": micro(lambda: agent.evaluate_position(evaluated, evaluated.current_player)),
+            "check": float(score),
+        }
+    return results
+
+def _has_neighbor(game, r, c):
+    return any(game.board[(r + dr) % BOARD_SIZE][(c + dc) % BOARD_SIZE] != EMPTY
+               for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc)
+
+def bench_rollout():
+    results = {}
+    for agent_cls, method in ((FastMCTSAgent, "light_simulation"), (MCTSAgent, "simulate_game")):
+        for name in POSITION_NAMES:
+            game = position(name)
+            agent = agent_cls(player=game.current_player)
+            if agent.use_bitboard:
+                game = BitboardGame.from_game(game)  # The position type the agent's search rolls out
+            first_move = game.random_move(random.Random(SEED))
+            simulate = getattr(agent, method)
+
+            # Batches of the same seeded rollouts, sized to about ROLLOUT_BATCH_TIME seconds
+            def run(count):
+                random.seed(SEED)
+                for _ in range(count):
+                    simulate(game, first_move)
+            count = 1
+            while True:
+                start = time.perf_counter()
+                run(count)
+                if time.perf_counter() - start >= ROLLOUT_BATCH_TIME:
+                    break
+                count *= 2
+            seconds, _ = best_time(lambda: run(count))
+            results[f"rollout/{method}/{name}"] = {"time": seconds / count, "rollouts_per_second": count / seconds}
+
+    # BatchGames rollouts in lockstep, timed per rollout to compare with light_simulation
+    for name in POSITION_NAMES:
+        game = BitboardGame.from_game(position(name))
+        agent = FastMCTSAgent(player=game.current_player)
+        first_move = game.random_move(random.Random(SEED))
+        for size in BATCH_SIZES:
+            def run():
+                agent.rng = np.random.default_rng(SEED)
+                agent.batch_simulation(game, first_move, size)
+            seconds = micro(run)
+            results[f"rollout/batch_simulation/{name}/{size}"] = {"time": seconds / size, "rollouts_per_second": size / seconds}
+    return results
+
+def make_search_agent(agent_name, amount, player):
+    if agent_name == "AlphaBetaAgent":
+        agent = AlphaBetaAgent(player=player)
+        agent.max_depth = amount
+    else:
+        agent = FastMCTSAgent(player=player) if agent_name == "FastMCTSAgent" else MCTSAgent(player=player)
+        agent.max_iterations = amount
+        agent.rng = np.random.default_rng(SEED)
+    agent.time_limit = 3600.0   # The iteration or depth limit ends the search
+    return agent
+
+def bench_search():
+    results = {}
+    for agent_name, amount in SEARCHES:
+        for name in SEARCH_POSITIONS:
+            def run():
+                random.seed(SEED)
+                np.random.seed(SEED)
+                game = position(name)
+                agent = make_search_agent(agent_name, amount, game.current_player)
+                move = agent.get_best_move(game)
+                return move, agent.search_stats
+            seconds, (move, stats) = best_time(run)
+            check = {"move": [int(x) for x in move]}
+            if agent_name == "AlphaBetaAgent":
+                check["nodes"] = stats.get("nodes")
+            results[f"search/{agent_name}/{name}"] = {"time": seconds, "check": check, "stats": _jsonable(stats)}
+    return results
+
+def _jsonable(value):
+    return json.loads(json.dumps(value, default=lambda item: item.item() if hasattr(item, "item") else str(item)))
+
+
+BENCHMARKS = {"perft": bench_perft, "micro": bench_micro, "rollout": bench_rollout, "search": bench_search}
+
+def run_benchmarks(groups=GROUPS, log=print):
+    """Runs the benchmark groups; returns {"meta": ..., "benchmarks": name -> result}"""
+    benchmarks = {}
+    for group in groups:
+        start = time.time()
+        benchmarks.update(BENCHMARKS[group]())
+        if log is not None:
+            log(f"{group}: {time.time() - start:.1f}s")
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "benchmarks": benchmarks,
+    }
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Rows (name, baseline time, current time, ratio, status) and the number of regressions and mismatches"""
+    rows = []
+    problems = 0
+    old, new = baseline["benchmarks"], current["benchmarks"]
+    for name in sorted(set(old) | set(new)):
+        if name not in new or name not in old:
+            rows.append((name, old.get(name, {}).get("time"), new.get(name, {}).get("time"), None,
+                         "new" if name in new else "not run"))
+            continue
+        ratio = new[name]["time"] / old[name]["time"]
+        if "check" in old[name] and old[name]["check"] != new[name].get("check"):
+            status = "MISMATCH"
+        elif ratio > 1 + threshold:
+            status = "REGRESSION"
+        elif ratio < 1 / (1 + threshold):
+            status = "faster"
+        else:
+            status = "ok"
+        problems += status in ("MISMATCH", "REGRESSION")
+        rows.append((name, old[name]["time"], new[name]["time"], ratio, status))
+    return rows, problems
+
+def format_time(seconds):
+    if seconds is None:
+        return "-"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+def format_results(results):
+    names = results["benchmarks"]
+    width = max(len(name) for name in names) + 2
+    lines = []
+    for name, result in names.items():
+        check = result.get("check")
+        lines.append(f"{name.ljust(width)}{format_time(result['time']):>10}" + (f"  {check}" if check is not None else ""))
+    return "\n".join(lines)
+
+def format_comparison(rows):
+    width = max(len(row[0]) for row in rows) + 2
+    lines = [f"{'benchmark'.ljust(width)}{'baseline':>10}{'current':>10}{'change':>9}  status"]
+    for name, old, new, ratio, status in rows:
+        change = "-" if ratio is None else f"{100 * (ratio - 1):+.1f}%"
+        lines.append(f"{name.ljust(width)}{format_time(old):>10}{format_time(new):>10}{change:>9}  {status}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks the engine and the agents")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS), help="benchmark groups to run")
+    parser.add_argument("--save", default=None, help="JSON file to store the results in, as a baseline")
+    parser.add_argument("--compare", default=None, help="baseline JSON file to compare the results with")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="slowdown flagged as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only)
+    print(format_results(results))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows, problems = compare(baseline, results, args.threshold)
+        print()
+        print(format_comparison(rows))
+        print(f"{problems} regressions or mismatches (threshold {100 * args.threshold:.0f}%)")
+        sys.exit(1 if problems else 0)
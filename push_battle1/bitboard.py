@@ -0,0 +1,447 @@
+import numpy as np
+import random
+from PushBattle import Game, MoveRecord, PLAYER1, PLAYER2, EMPTY, BOARD_SIZE, NUM_PIECES, WIN_LINES, _torus
+from PushBattle import MOVE_OK, OUT_OF_BOUNDS, NO_PIECES_LEFT, NOT_OWN_PIECE, SQUARE_OCCUPIED, MOVE_STATUS_MESSAGES
+from PushBattle import ZOBRIST_PIECES, ZOBRIST_P1_COUNT, ZOBRIST_P2_COUNT, ZOBRIST_SIDE, GAME_STRUCT
+
+'''
+Bitboard backend for PushBattle.
+
+The board is stored as one 64-bit integer mask per player, bit (r * BOARD_SIZE + c)
+being set when that player owns square (r, c). BitboardGame exposes the same API as
+PushBattle.Game (make_move, place_checker, move_checker, check_winner, to_dict, ...),
+so agents and the judge can use either class.
+'''
+
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+FULL_MASK = (1 << NUM_CELLS) - 1
+
+PUSH_DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)]
+
+
+##################
+
+def cell_index(r, c):
+    return r * BOARD_SIZE + c
+
+def cell_bit(r, c):
+    return 1 << (r * BOARD_SIZE + c)
+
+def _column_mask(col):
+    mask = 0
+    for r in range(BOARD_SIZE):
+        mask |= cell_bit(r, col)
+    return mask
+
+COL_FIRST = _column_mask(0)
+COL_LAST = _column_mask(BOARD_SIZE - 1)
+NOT_COL_FIRST = FULL_MASK ^ COL_FIRST
+NOT_COL_LAST = FULL_MASK ^ COL_LAST
+
+# Torus shifts: every bit moves one square in the given direction, wrapping at the edges
+def shift_east(mask):
+    return ((mask & NOT_COL_LAST) << 1) | ((mask & COL_LAST) >> (BOARD_SIZE - 1))
+
+def shift_west(mask):
+    return ((mask & NOT_COL_FIRST) >> 1) | ((mask & COL_FIRST) << (BOARD_SIZE - 1))
+
+def shift_south(mask):
+    return ((mask << BOARD_SIZE) & FULL_MASK) | (mask >> (NUM_CELLS - BOARD_SIZE))
+
+def shift_north(mask):
+    return (mask >> BOARD_SIZE) | ((mask << (NUM_CELLS - BOARD_SIZE)) & FULL_MASK)
+
+def adjacent_pairs(mask):
+    """Number of pairs of squares in the mask next to each other along a row or a column, without wrapping"""
+    return bin(mask & (mask >> 1) & NOT_COL_LAST).count('1') + bin(mask & (mask >> BOARD_SIZE)).count('1')
+
+def has_three_in_row(mask):
+    """True if the mask contains 3 consecutive squares in any torus direction"""
+    for shift in (shift_east, shift_south):
+        once = shift(mask)
+        if mask & once & shift(once):
+            return True
+    south = shift_south(mask)
+    for shift in (shift_east, shift_west):
+        once = shift(south)
+        if mask & once & shift(shift_south(once)):
+            return True
+    return False
+
+# PUSH_TABLE[cell] lists (neighbour_bit, target_bit) for each push direction
+PUSH_TABLE = []
+for _r in range(BOARD_SIZE):
+    for _c in range(BOARD_SIZE):
+        _pairs = []
+        for _dr, _dc in PUSH_DIRECTIONS:
+            _r1, _c1 = _torus(_r + _dr, _c + _dc)
+            _r2, _c2 = _torus(_r1 + _dr, _c1 + _dc)
+            _pairs.append((cell_bit(_r1, _c1), cell_bit(_r2, _c2)))
+        PUSH_TABLE.append(tuple(_pairs))
+PUSH_TABLE = tuple(PUSH_TABLE)
+
+# WIN_MASKS holds every 3-square torus line; WIN_MASKS_BY_CELL the lines through each square
+WIN_MASKS = tuple(sum(cell_bit(r, c) for r, c in line) for line in WIN_LINES)
+WIN_MASKS_BY_CELL = tuple(
+    tuple(mask for mask in WIN_MASKS if mask >> cell & 1) for cell in range(NUM_CELLS)
+)
+
+# Zobrist keys of PushBattle indexed by square bit, so both engines hash a position the same way
+ZOBRIST_BY_BIT = {
+    player: {cell_bit(r, c): ZOBRIST_PIECES[player][r][c] for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)}
+    for player in (PLAYER1, PLAYER2)
+}
+
+def zobrist_masks_hash(p1_mask, p2_mask, p1_pieces, p2_pieces):
+    """Side-independent Zobrist hash (same value as PushBattle.zobrist_board_hash) computed from masks"""
+    h = ZOBRIST_P1_COUNT[p1_pieces] ^ ZOBRIST_P2_COUNT[p2_pieces]
+    for player, mask in ((PLAYER1, p1_mask), (PLAYER2, p2_mask)):
+        keys = ZOBRIST_BY_BIT[player]
+        for cell in iter_bits(mask):
+            h ^= keys[1 << cell]
+    return h
+
+def iter_bits(mask):
+    """Yields the cell index of every set bit"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def mask_to_array(mask):
+    """Converts a 64-bit mask to a flat array of 0/1 per cell"""
+    return np.unpackbits(np.array([mask], dtype='<u8').view(np.uint8), bitorder='little')
+
+def array_to_masks(board):
+    """Converts a board array (values EMPTY/PLAYER1/PLAYER2) to (p1_mask, p2_mask)"""
+    flat = np.asarray(board).reshape(NUM_CELLS)
+    p1 = int(np.packbits(flat == PLAYER1, bitorder='little').view('<u8')[0])
+    p2 = int(np.packbits(flat == PLAYER2, bitorder='little').view('<u8')[0])
+    return p1, p2
+
+
+class BitboardGame:
+    def __init__(self):
+        self.p1_mask = 0                # Squares occupied by Player1
+        self.p2_mask = 0                # Squares occupied by Player2
+        self.current_player = PLAYER1   # Player that has the current move
+        self.turn_count = 0             # Number of turns elapsed in the game
+        self.p1_pieces = 0              # Number of pieces that Player1 has placed on the board
+        self.p2_pieces = 0              # Number of pieces that Player2 has placed on the board
+        self._board = None              # Cached array view of the masks
+        self.board_hash = ZOBRIST_P1_COUNT[0] ^ ZOBRIST_P2_COUNT[0]  # Zobrist hash of the pieces and piece counts
+
+    # Array view of the board, compatible with Game.board. Read-only: writes are not reflected in the masks
+    @property
+    def board(self):
+        if self._board is None:
+            cells = mask_to_array(self.p1_mask).astype(np.int64) - mask_to_array(self.p2_mask)
+            self._board = cells.reshape(BOARD_SIZE, BOARD_SIZE)
+        return self._board
+
+    @board.setter
+    def board(self, board):
+        self.p1_mask, self.p2_mask = array_to_masks(board)
+        self._board = None
+
+    # 64-bit Zobrist hash of the position, equal to Game.zobrist_hash for the same position
+    @property
+    def zobrist_hash(self):
+        if self.current_player == PLAYER2:
+            return self.board_hash ^ ZOBRIST_SIDE
+        return self.board_hash
+
+    def cell(self, r, c):
+        bit = cell_bit(r, c)
+        if self.p1_mask & bit:
+            return PLAYER1
+        if self.p2_mask & bit:
+            return PLAYER2
+        return EMPTY
+
+    def player_mask(self, player):
+        return self.p1_mask if player == PLAYER1 else self.p2_mask
+
+    def occupied(self):
+        return self.p1_mask | self.p2_mask
+
+    def make_move(self, move):
+        if len(move) == 2:
+            r, c = move
+            self.place_checker(r, c)
+        elif len(move) == 4:
+            r0, c0, r1, c1 = move
+            self.move_checker(r0, c0, r1, c1)
+        else:
+            raise ValueError("Invalid move format. Must be a tuple of 2 or 4 integers.")
+
+    # Applies a move in place and returns the MoveRecord needed to undo it (pushed holds bit pairs)
+    def apply_move(self, move):
+        player = self.current_player
+        board_hash = self.board_hash
+        if len(move) == 2:
+            pushed = self.place_checker(move[0], move[1])
+        elif len(move) == 4:
+            pushed = self.move_checker(move[0], move[1], move[2], move[3])
+        else:
+            raise ValueError("Invalid move format. Must be a tuple of 2 or 4 integers.")
+        return MoveRecord(player, move, pushed, board_hash)
+
+    # Restores the exact state from before the apply_move call that returned the record
+    def undo(self, record):
+        p1 = self.p1_mask
+        for neighbour, target in record.pushed:
+            if p1 & target:
+                p1 ^= neighbour | target
+            else:
+                self.p2_mask ^= neighbour | target
+        move = record.move
+        if len(move) == 2:
+            change = cell_bit(move[0], move[1])
+            if record.player == PLAYER1:
+                self.p1_pieces -= 1
+            else:
+                self.p2_pieces -= 1
+        else:
+            change = cell_bit(move[0], move[1]) | cell_bit(move[2], move[3])
+        if record.player == PLAYER1:
+            p1 ^= change
+        else:
+            self.p2_mask ^= change
+        self.p1_mask = p1
+        self.current_player = record.player
+        self.board_hash = record.board_hash
+        self._board = None
+
+    def clone(self):
+        game = BitboardGame.__new__(BitboardGame)
+        game.p1_mask = self.p1_mask
+        game.p2_mask = self.p2_mask
+        game.current_player = self.current_player
+        game.turn_count = self.turn_count
+        game.p1_pieces = self.p1_pieces
+        game.p2_pieces = self.p2_pieces
+        game.board_hash = self.board_hash
+        game._board = None
+        return game
+
+    # Agents call copy.deepcopy on the game; the masks are immutable ints so a shallow clone is enough
+    def __deepcopy__(self, memo):
+        return self.clone()
+
+    # Converts all variables of the game to a dictionary (same layout as Game.to_dict)
+    def to_dict(self):
+        return {
+            "board": self.board.tolist(),
+            "current_player": self.current_player,
+            "turn_count": self.turn_count,
+            "p1_pieces": self.p1_pieces,
+            "p2_pieces": self.p2_pieces,
+            "hash": self.board_hash,
+        }
+
+    # Creates a BitboardGame object given a dictionary of variables from the game
+    @classmethod
+    def from_dict(cls, data):
+        game = cls()
+        game.board = data["board"]
+        game.current_player = data["current_player"]
+        game.turn_count = data["turn_count"]
+        game.p1_pieces = data["p1_pieces"]
+        game.p2_pieces = data["p2_pieces"]
+        if "hash" in data:
+            game.board_hash = data["hash"]
+        else:
+            game.board_hash = zobrist_masks_hash(game.p1_mask, game.p2_mask, game.p1_pieces, game.p2_pieces)
+        return game
+
+    # Packs the game into PushBattle.GAME_STRUCT bytes (same bytes as Game.to_bytes)
+    def to_bytes(self):
+        return GAME_STRUCT.pack(self.p1_mask, self.p2_mask, self.current_player, self.turn_count,
+                                self.p1_pieces, self.p2_pieces)
+
+    # Creates a BitboardGame object from PushBattle.GAME_STRUCT bytes
+    @classmethod
+    def from_bytes(cls, data):
+        game = cls()
+        (game.p1_mask, game.p2_mask, game.current_player, game.turn_count,
+         game.p1_pieces, game.p2_pieces) = GAME_STRUCT.unpack_from(data)
+        game.board_hash = zobrist_masks_hash(game.p1_mask, game.p2_mask, game.p1_pieces, game.p2_pieces)
+        return game
+
+    # Creates a BitboardGame from a PushBattle.Game (or returns a copy of a BitboardGame)
+    @classmethod
+    def from_game(cls, game):
+        if isinstance(game, BitboardGame):
+            return game.clone()
+        bitboard_game = cls()
+        bitboard_game.board = game.board
+        bitboard_game.current_player = game.current_player
+        bitboard_game.turn_count = game.turn_count
+        bitboard_game.p1_pieces = game.p1_pieces
+        bitboard_game.p2_pieces = game.p2_pieces
+        bitboard_game.board_hash = game.board_hash
+        return bitboard_game
+
+    # Converts back to an array based PushBattle.Game
+    def to_game(self):
+        return Game.from_dict(self.to_dict())
+
+    # Displays the board
+    def display_board(self):
+        tile_symbols = {
+            EMPTY: '.',
+            PLAYER2: 'B',
+            PLAYER1: 'W'
+        }
+        for row in self.board:
+            print(' '.join(tile_symbols[tile] for tile in row))
+
+    # Checks if the potential PLACEMENT of the piece is valid, printing why not
+    def is_valid_placement(self, row, col):
+        status = self.placement_status(row, col)
+        if status == NO_PIECES_LEFT:
+            print(f"{'White' if self.current_player == PLAYER1 else 'Black'} has moved all pieces. Must move an existing piece")
+        return status == MOVE_OK
+
+    # Checks if the potential MOVEMENT of the piece is valid, printing why not
+    def is_valid_move(self, r0, c0, r1, c1):
+        status = self.move_status(r0, c0, r1, c1)
+        if status == NOT_OWN_PIECE or status == SQUARE_OCCUPIED:
+            print(MOVE_STATUS_MESSAGES[status])
+        return status == MOVE_OK
+
+    # Reason code for the potential PLACEMENT of the piece (MOVE_OK if valid), without printing
+    def placement_status(self, row, col):
+        if not self.in_placement_phase():
+            return NO_PIECES_LEFT
+        if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
+            return OUT_OF_BOUNDS
+        if self.occupied() & cell_bit(row, col):
+            return SQUARE_OCCUPIED
+        return MOVE_OK
+
+    # Reason code for the potential MOVEMENT of the piece (MOVE_OK if valid), without printing
+    def move_status(self, r0, c0, r1, c1):
+        if not (0 <= r0 < BOARD_SIZE and 0 <= c0 < BOARD_SIZE and
+                0 <= r1 < BOARD_SIZE and 0 <= c1 < BOARD_SIZE):
+            return OUT_OF_BOUNDS
+        if not self.player_mask(self.current_player) & cell_bit(r0, c0):
+            return NOT_OWN_PIECE
+        if self.occupied() & cell_bit(r1, c1):
+            return SQUARE_OCCUPIED
+        return MOVE_OK
+
+    # True if the current player still has pieces to place (placement phase), False if they must move
+    def in_placement_phase(self):
+        pieces = self.p1_pieces if self.current_player == PLAYER1 else self.p2_pieces
+        return pieces < NUM_PIECES
+
+    # Lazily yields every legal move of the current player, in the same order as Game.iter_moves
+    def iter_moves(self):
+        empty = [divmod(cell, BOARD_SIZE) for cell in iter_bits(FULL_MASK ^ self.occupied())]
+        if self.in_placement_phase():
+            yield from empty
+        else:
+            for cell in iter_bits(self.player_mask(self.current_player)):
+                r0, c0 = divmod(cell, BOARD_SIZE)
+                for r1, c1 in empty:
+                    yield (r0, c0, r1, c1)
+
+    # Every legal move of the current player packed with encode_move into an int16 array
+    def legal_moves_array(self):
+        empty = np.flatnonzero(mask_to_array(FULL_MASK ^ self.occupied()))
+        if self.in_placement_phase():
+            return empty.astype(np.int16)
+        own = np.flatnonzero(mask_to_array(self.player_mask(self.current_player)))
+        return (NUM_CELLS + own[:, None] * NUM_CELLS + empty[None, :]).ravel().astype(np.int16)
+
+    # Uniformly random legal move drawn from the masks: the destination by sampling squares until an empty one
+    # comes up (at least 3/4 of the board is empty), the piece to move by picking one of the set bits
+    def random_move(self, rng=random):
+        empty = FULL_MASK ^ self.occupied()
+        while True:
+            target = rng.randrange(NUM_CELLS)
+            if empty >> target & 1:
+                break
+        r1, c1 = divmod(target, BOARD_SIZE)
+        if self.in_placement_phase():
+            return (r1, c1)
+        own = self.player_mask(self.current_player)
+        if not own:
+            return None
+        index = rng.randrange(bin(own).count('1'))
+        for cell in iter_bits(own):
+            if index == 0:
+                r0, c0 = divmod(cell, BOARD_SIZE)
+                return (r0, c0, r1, c1)
+            index -= 1
+
+    # Handles the PLACEMENT of the checker
+    def place_checker(self, r, c):
+        bit = cell_bit(r, c)
+        if self.current_player == PLAYER1:
+            self.p1_mask |= bit
+            self.board_hash ^= ZOBRIST_P1_COUNT[self.p1_pieces] ^ ZOBRIST_P1_COUNT[self.p1_pieces + 1]
+            self.p1_pieces += 1
+        else:
+            self.p2_mask |= bit
+            self.board_hash ^= ZOBRIST_P2_COUNT[self.p2_pieces] ^ ZOBRIST_P2_COUNT[self.p2_pieces + 1]
+            self.p2_pieces += 1
+        self.board_hash ^= ZOBRIST_BY_BIT[self.current_player][bit]
+        return self.push_neighbors(r, c)
+
+    # Handles the MOVEMENT of the checker
+    def move_checker(self, r0, c0, r1, c1):
+        source = cell_bit(r0, c0)
+        target = cell_bit(r1, c1)
+        if self.current_player == PLAYER1:
+            self.p1_mask ^= source | target
+        else:
+            self.p2_mask ^= source | target
+        keys = ZOBRIST_BY_BIT[self.current_player]
+        self.board_hash ^= keys[source] ^ keys[target]
+        return self.push_neighbors(r1, c1)
+
+    # Push mechanic - Pushes all pieces away. Returns the (from, to) bits of every pushed piece
+    def push_neighbors(self, r0, c0):
+        self._board = None
+        p1 = self.p1_mask
+        p2 = self.p2_mask
+        occupied = p1 | p2
+        board_hash = self.board_hash
+        pushed = []
+        # The 8 neighbours and the 8 push targets are disjoint, so the order of the pushes does not matter
+        for neighbour, target in PUSH_TABLE[r0 * BOARD_SIZE + c0]:
+            if occupied & neighbour and not occupied & target:
+                if p1 & neighbour:
+                    p1 ^= neighbour | target
+                    keys = ZOBRIST_BY_BIT[PLAYER1]
+                else:
+                    p2 ^= neighbour | target
+                    keys = ZOBRIST_BY_BIT[PLAYER2]
+                board_hash ^= keys[neighbour] ^ keys[target]
+                pushed.append((neighbour, target))
+        self.p1_mask = p1
+        self.p2_mask = p2
+        self.board_hash = board_hash
+        return pushed
+
+    # checks for a winner - 3 in a row
+    def check_winner(self):
+        player1_wins = has_three_in_row(self.p1_mask)
+        player2_wins = has_three_in_row(self.p2_mask)
+
+        if player1_wins and player2_wins:
+            return self.current_player
+        # If only one player has 3 in a row, they win
+        elif player1_wins:
+            return PLAYER1
+        elif player2_wins:
+            return PLAYER2
+
+        return EMPTY # no one has won the game
+
+    # Same as Game.check_winner_after; the mask test is already cheaper than picking lines
+    def check_winner_after(self, record):
+        return self.check_winner()
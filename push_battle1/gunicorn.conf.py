@@ -0,0 +1,27 @@
+import multiprocessing
+import os
+
+'''
+gunicorn settings for agent_server.py (see its docstring):
+
+    gunicorn --config gunicorn.conf.py agent_server:app
+
+preload_app imports agent_server, with its tables and opening book, once in the master, and
+when_ready runs its warm-up searches there before the workers are forked. gthread workers keep
+the judge's connections alive, so the requests of a game reach the worker that holds its session.
+'''
+
+bind = os.environ.get("PUSHBATTLE_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("PUSHBATTLE_SERVER_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("PUSHBATTLE_SERVER_THREADS", 2))   # Requests a worker serves at once; searches share its CPU
+preload_app = True
+keepalive = 30          # Seconds an idle judge connection stays open, more than a move takes
+timeout = 60            # Seconds before a busy worker is restarted
+graceful_timeout = 10
+
+
+def when_ready(server):
+    """Warms the preloaded agent_server up in the master, so every forked worker starts ready"""
+    import agent_server
+    agent_server.warm_up()
@@ -2,6 +2,10 @@ import numpy as np
 import requests
 import time
 from PushBattle import Game, PLAYER1, PLAYER2, EMPTY, BOARD_SIZE, NUM_PIECES, _torus, chess_notation_to_array, array_to_chess_notation
+from PushBattle import MOVE_OK, MOVE_STATUS_MESSAGES
+from wire import JSON_ENCODING, BINARY_ENCODING, SUPPORTED_ENCODINGS, CONTENT_TYPE, SESSION_HEADER
+from wire import negotiated_encoding, encode_move_request
+from transport import make_transport, engine_time
 
 import random
 
@@ -12,98 +16,143 @@ class Agent:
     def __init__(self, participant, agent_name):
         self.participant = participant
         self.agent_name = agent_name
-        self.latency = None
+        self.latency = None             # Seconds of the last request, as measured by the judge
+        self.engine_time = None         # Part of latency the agent reported spending on the move, None if not reported
+        self.transport_time = None      # latency - engine_time: serialization, network and server overhead
+        self.encoding = JSON_ENCODING   # /move payload encoding negotiated on /start
+        self.session_id = None          # Set if the agent accepted session mode on /start
 
 class Judge:
-    def __init__(self, p1_url, p2_url):
+    # p1_url / p2_url: "http://host:port", "unix:///path/to/socket" or a transport object (see transport.py)
+    # log: called with each line the judge reports about the game (print by default)
+    def __init__(self, p1_url, p2_url, game_cls=Game, log=print):
         self.p1_url = p1_url
         self.p2_url = p2_url
-        self.game = Game()
+        self.p1_transport = make_transport(p1_url)
+        self.p2_transport = make_transport(p2_url)
+        self.game = game_cls()  # Game or bitboard.BitboardGame
         self.p1_agent = None
         self.p2_agent = None
         self.game_str = ""
+        self.last_move = None   # Chess notation of the last move played, sent to agents in session mode
+        self.log = log
 
     def check_latency(self):
         """Check latency for both players and create their agents"""
-        # Check P1
-        try:
-            start_time = time.time()
-            response = requests.get(self.p1_url, timeout=TIMEOUT)
-            end_time = time.time()
-            
-            if response.status_code == 200:
-                data = response.json()
-                self.p1_agent = Agent("Participant1", "Agent1")
-                self.p1_agent.latency = (end_time - start_time)
-            else:
-                return False
-                
-        except (requests.RequestException, requests.Timeout):
-            return False
+        return self.check_player(PLAYER1) and self.check_player(PLAYER2)
 
-        # Check P2
+    def check_player(self, player):
+        """ Checks that one player answers and creates its agent """
+        transport = self.p1_transport if player == PLAYER1 else self.p2_transport
         try:
             start_time = time.time()
-            response = requests.get(self.p2_url, timeout=TIMEOUT)
+            response = transport.get("/", timeout=TIMEOUT)
             end_time = time.time()
             
             if response.status_code == 200:
                 data = response.json()
-                self.p2_agent = Agent("Participant2", "Agent2")
-                self.p2_agent.latency = (end_time - start_time)
+                if player == PLAYER1:
+                    agent = self.p1_agent = Agent("Participant1", "Agent1")
+                else:
+                    agent = self.p2_agent = Agent("Participant2", "Agent2")
+                agent.latency = (end_time - start_time)
+                return True
             else:
                 return False
                 
         except (requests.RequestException, requests.Timeout):
             return False
 
-        return True
-
     def start_game(self):
         """ Start the game for both players """
-        starting_data = {
+        starting_data = self.starting_data()
+        return self.start_player(PLAYER1, starting_data) and self.start_player(PLAYER2, starting_data)
+
+    def starting_data(self):
+        """ /start payload shared by both players """
+        return {
             "game": self.game.to_dict(),
             "board": self.game.board.tolist(),
             "max_latency": TIMEOUT,
+            "encodings": SUPPORTED_ENCODINGS,
+            "sessions": True,
         }
-        # Start p1
-        try:
-            starting_data['first_turn'] = True
-            response = requests.post(f"{self.p1_url}/start", json=starting_data, timeout=TIMEOUT)
-
-        except (requests.RequestException, requests.Timeout):
-            return False
 
-        # Start p2
+    def start_player(self, player, starting_data):
+        """ Sends /start to one player and stores the encoding and session it chose """
+        agent, transport = (self.p1_agent, self.p1_transport) if player == PLAYER1 else (self.p2_agent, self.p2_transport)
         try:
-            starting_data['first_turn'] = False
-            response = requests.post(f"{self.p2_url}/start", json=starting_data, timeout=TIMEOUT)
+            response = transport.post("/start", timeout=TIMEOUT, json=dict(starting_data, first_turn=player == PLAYER1))
+            agent.encoding = negotiated_encoding(response)
+            agent.session_id = self.session_id(response)
             return True
 
         except (requests.RequestException, requests.Timeout):
             return False
 
-    def receive_move(self, attempt_number, p1_random, p2_random):
-        """ Receive moves from each player """
+    def session_id(self, response):
+        """ Session id from an agent's /start reply, None if it did not accept session mode """
+        try:
+            return response.json().get("session_id")
+        except (ValueError, AttributeError):
+            return None
+
+    def move_request(self, agent, attempt_number, random_attempts, snapshot=False):
+        """ Keyword arguments for the /move request: a move delta in session mode, else the full position in the agent's encoding """
+        headers = {}
+        if agent.session_id is not None:
+            headers[SESSION_HEADER] = agent.session_id
+            if not snapshot:
+                delta_data = {
+                    "last_move": self.last_move,
+                    "hash": self.game.zobrist_hash,
+                    "turn_count": self.game.turn_count,
+                    "attempt_number": attempt_number,
+                    "random_attempts": random_attempts,
+                }
+                return {"json": delta_data, "headers": headers}
+        if agent.encoding == BINARY_ENCODING:
+            headers["Content-Type"] = CONTENT_TYPE
+            return {
+                "data": encode_move_request(self.game, attempt_number, random_attempts),
+                "headers": headers,
+            }
         move_data = {
                     "game": self.game.to_dict(),
                     "board": self.game.board.tolist(),
                     "turn_count": self.game.turn_count,
                     "attempt_number": attempt_number,
+                    "random_attempts": random_attempts,
                 }
+        return {"json": move_data, "headers": headers}
+
+    def post_move(self, agent, transport, attempt_number, random_attempts):
+        """ Sends the /move request; resends the full position if a session agent asks for a resync (409) """
+        response = transport.post("/move", timeout=TIMEOUT, **self.move_request(agent, attempt_number, random_attempts))
+        if response.status_code == 409 and agent.session_id is not None:
+            request_args = self.move_request(agent, attempt_number, random_attempts, snapshot=True)
+            response = transport.post("/move", timeout=TIMEOUT, **request_args)
+        return response
+
+    def record_latency(self, agent, seconds, response):
+        """ Stores the request time of a move and splits it into engine and transport time """
+        agent.latency = seconds
+        agent.engine_time = engine_time(response)
+        agent.transport_time = seconds - agent.engine_time if agent.engine_time is not None else None
+
+    def receive_move(self, attempt_number, p1_random, p2_random):
+        """ Receive moves from each player """
         try:
             if self.game.current_player == PLAYER1:
-                move_data["random_attempts"] = p1_random
                 start_time = time.time()
-                response = requests.post(f"{self.p1_url}/move", json=move_data, timeout=TIMEOUT)
+                response = self.post_move(self.p1_agent, self.p1_transport, attempt_number, p1_random)
                 end_time = time.time()
-                self.p1_agent.latency = (end_time-start_time)
+                self.record_latency(self.p1_agent, end_time - start_time, response)
             else:
-                move_data["random_attempts"] = p2_random
                 start_time = time.time()
-                response = requests.post(f"{self.p2_url}/move", json=move_data, timeout=TIMEOUT)
+                response = self.post_move(self.p2_agent, self.p2_transport, attempt_number, p2_random)
                 end_time = time.time()
-                self.p2_agent.latency = (end_time-start_time)
+                self.record_latency(self.p2_agent, end_time - start_time, response)
 
             # receiving the move
             if response.status_code == 200:
@@ -126,16 +175,28 @@ class Judge:
 
     def end_game(self, winner):
         """ End the game for both players """
-        end_data = {
+        end_data = self.end_data(winner)
+        if self.end_player(PLAYER1, end_data) and self.end_player(PLAYER2, end_data):
+            self.log(f"Winner: {'PLAYER1' if winner == PLAYER1 else 'PLAYER2'}")
+        else:
+            return False
+
+    def end_data(self, winner):
+        """ /end payload shared by both players """
+        return {
                     "game": self.game.to_dict(),
                     "board": self.game.board.tolist(),
                     "turn_count": self.game.turn_count,
                     "winner": int(winner)
                 }
+
+    def end_player(self, player, end_data):
+        """ Sends /end to one player, with its session id so a multi-game server can release the session """
+        agent, transport = (self.p1_agent, self.p1_transport) if player == PLAYER1 else (self.p2_agent, self.p2_transport)
+        headers = {SESSION_HEADER: agent.session_id} if agent is not None and agent.session_id is not None else None
         try:
-            response = requests.post(f"{self.p1_url}/end", json=end_data, timeout=TIMEOUT)
-            response = requests.post(f"{self.p2_url}/end", json=end_data, timeout=TIMEOUT)
-            print(f"Winner: {'PLAYER1' if winner == PLAYER1 else 'PLAYER2'}")
+            transport.post("/end", timeout=TIMEOUT, json=end_data, headers=headers)
+            return True
         except (requests.RequestException, requests.Timeout):
             return False
 
@@ -143,42 +204,51 @@ class Judge:
         """ Places the move if valid and returns True or False """
 
         if not isinstance(move, (list, tuple)) or len(move) < 2:
-                print(f"Invalid move format by Player {'P1' if game.current_player == PLAYER1 else 'P2'}")
+                self.log(f"Invalid move format by Player {'P1' if game.current_player == PLAYER1 else 'P2'}")
                 # return False
                 return "forfeit"
 
         if len(move) != 2 and len(move) != 4:
-            print(f"Invalid move format by Player {'P1' if game.current_player == PLAYER1 else 'P2'}")
+            self.log(f"Invalid move format by Player {'P1' if game.current_player == PLAYER1 else 'P2'}")
             # return False
             return "forfeit"
 
         chess_move = array_to_chess_notation(move)
-        print(f"{game.current_player}'s move is: {move} or {chess_move}")
+        self.log(f"{game.current_player}'s move is: {move} or {chess_move}")
 
         try:
             # Convert move elements to integers if they aren't already
             move = [int(x) if isinstance(x, (int, str)) else x for x in move]
 
             if game.turn_count < 17:
-                if game.is_valid_placement(move[0], move[1]):
+                status = game.placement_status(move[0], move[1])
+                if status == MOVE_OK:
                     game.place_checker(move[0], move[1])
                 else:
-                    print(f"Invalid placement by {game.current_player}")
+                    self.log(f"Invalid placement by {game.current_player}: {MOVE_STATUS_MESSAGES[status]}")
                     # return False
                     return "forfeit"
             else:
-                if game.is_valid_move(move[0], move[1], move[2], move[3]):
+                status = game.move_status(move[0], move[1], move[2], move[3])
+                if status == MOVE_OK:
                     game.move_checker(move[0], move[1], move[2], move[3])
                 else:
-                    print(f"Invalid move by {game.current_player}")
+                    self.log(f"Invalid move by {game.current_player}: {MOVE_STATUS_MESSAGES[status]}")
                     # return False
                     return "forfeit"
 
             player = 1 if self.game.current_player == 1 else 2
             self.game_str += f"-{chess_move}"
+            self.last_move = chess_move
             return True
         except (requests.RequestException, requests.Timeout):
             return False
+
+    def close(self):
+        """Closes the connections kept open to both players"""
+        for transport in (self.p1_transport, self.p2_transport):
+            if transport is not None:
+                transport.close()
             
 
 def main():
@@ -186,7 +256,13 @@ def main():
     print("Creating judge...")
 
     judge = Judge("http://127.0.0.1:5008", "http://127.0.0.1:5009")
-    
+    try:
+        play_match(judge)
+    finally:
+        judge.close()
+
+
+def play_match(judge):
     # creating game link
     if not judge.check_latency():
         print("Failed to connect to one or both players")
@@ -254,12 +330,8 @@ def main():
                 current_random_moves = p1_random if judge.game.current_player == PLAYER1 else p2_random
                 
                 if current_random_moves > 0:
-                    random = RandomAgent(player=judge.game.current_player)
-                    move = random.get_best_move(judge.game)
-                    # judge.handle_move(judge.game, move)
-
-                    move = array_to_chess_notation(move)
-                    judge.handle_move(judge.game, move)
+                    move = judge.game.random_move()
+                    judge.handle_move(judge.game, list(move))
                     # tag that it was random
                     judge.game_str += 'r'
 
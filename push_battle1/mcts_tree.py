@@ -0,0 +1,282 @@
+import math
+import numpy as np
+from PushBattle import encode_move, decode_move
+
+'''
+Array-backed search tree for the MCTS agents.
+
+Nodes are stored struct-of-arrays: node i has visits[i], value_sums[i], priors[i], the encoded
+move that leads to it (moves[i]), its parent and the Zobrist key of its position. The children
+of a node are contiguous, first_child[i] .. first_child[i] + num_children[i], so selection over
+them is a single vectorized PUCT computation.
+
+value_sums[i] is scored for the player who played moves[i], so a parent always maximizes the
+mean value of its children. terminal[i] is +1 if moves[i] wins on the spot for that player,
+-1 if it loses on the spot (the push completes an opponent line), 0 otherwise.
+
+With max_nodes set, search stops expanding nodes once the tree holds that many; the arrays then
+stay within max_nodes plus one expansion, and the leaves keep being scored by rollouts.
+'''
+
+ROOT = 0
+STOP_CHECK_INTERVAL = 32    # Iterations between two calls of the stop_check of search
+
+def priors_from_scores(scores, temperature):
+    """Softmax priors from heuristic scores of the children of a node"""
+    scores = np.asarray(scores, dtype=np.float64)
+    weights = np.exp((scores - scores.max()) / temperature)
+    return weights / weights.sum()
+
+
+class MCTSTree:
+    def __init__(self, capacity=1 << 16, max_nodes=None):
+        if max_nodes is not None:
+            capacity = min(capacity, max_nodes)
+        self.capacity = capacity
+        self.max_nodes = max_nodes  # Node count after which search stops expanding (None = unbounded)
+        self.visits = np.zeros(capacity, dtype=np.int64)
+        self.value_sums = np.zeros(capacity, dtype=np.float64)
+        self.priors = np.zeros(capacity, dtype=np.float64)
+        self.moves = np.full(capacity, -1, dtype=np.int16)         # encode_move of the move into the node
+        self.parents = np.full(capacity, -1, dtype=np.int32)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)   # -1 until the node is expanded
+        self.num_children = np.zeros(capacity, dtype=np.int32)
+        self.keys = np.zeros(capacity, dtype=np.uint64)            # Set when the node is expanded
+        self.terminal = np.zeros(capacity, dtype=np.int8)
+        self.size = 0
+
+    def reset(self, key):
+        """Empties the tree and creates a root for the position with the given key"""
+        self.size = 0
+        root = self._allocate(1)
+        self.keys[root] = key
+        return root
+
+    def _allocate(self, n):
+        start = self.size
+        if start + n > self.capacity:
+            capacity = 2 * self.capacity
+            if self.max_nodes is not None:
+                capacity = min(capacity, self.max_nodes)
+            self._grow(max(capacity, start + n))
+        end = start + n
+        self.visits[start:end] = 0
+        self.value_sums[start:end] = 0.0
+        self.priors[start:end] = 0.0
+        self.moves[start:end] = -1
+        self.parents[start:end] = -1
+        self.first_child[start:end] = -1
+        self.num_children[start:end] = 0
+        self.keys[start:end] = 0
+        self.terminal[start:end] = 0
+        self.size = end
+        return start
+
+    def _grow(self, capacity):
+        for name in ("visits", "value_sums", "priors", "moves", "parents", "first_child", "num_children", "keys", "terminal"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def is_expanded(self, node):
+        return self.first_child[node] >= 0
+
+    def is_full(self):
+        """True once the tree has reached max_nodes"""
+        return self.max_nodes is not None and self.size >= self.max_nodes
+
+    def children(self, node):
+        start = int(self.first_child[node])
+        if start < 0:
+            return range(0)
+        return range(start, start + int(self.num_children[node]))
+
+    def expand(self, node, key, moves, priors, terminal):
+        """Adds one child per move. terminal holds +1 / -1 for moves that win / lose on the spot, else 0"""
+        start = self._allocate(len(moves))
+        end = start + len(moves)
+        self.moves[start:end] = [encode_move(move) for move in moves]
+        self.priors[start:end] = priors
+        self.terminal[start:end] = terminal
+        self.parents[start:end] = node
+        self.first_child[node] = start
+        self.num_children[node] = len(moves)
+        self.keys[node] = key
+
+    def select_child(self, node, c_puct):
+        """Child maximizing Q + c_puct * P * sqrt(N) / (1 + n); unvisited children count as Q = 0"""
+        start = int(self.first_child[node])
+        end = start + int(self.num_children[node])
+        visits = self.visits[start:end]
+        q = self.value_sums[start:end] / np.maximum(visits, 1)
+        u = c_puct * self.priors[start:end] * (math.sqrt(self.visits[node] + 1) / (1 + visits))
+        return start + int(np.argmax(q + u))
+
+    def move(self, node):
+        return decode_move(int(self.moves[node]))
+
+    def backup(self, path, value, count=1):
+        """
+        Adds count simulations with total value (scored for the player to move at path[0]) to every
+        node of path, a list of node indices from the root down
+        """
+        path = np.asarray(path, dtype=np.intp)
+        signs = np.where(np.arange(len(path)) % 2 == 1, 1.0, -1.0)
+        self.visits[path] += count
+        self.value_sums[path] += signs * value
+
+    def best_child(self, node):
+        """A child winning on the spot, else the most visited child, ties broken by prior; -1 if the node has none"""
+        children = self.children(node)
+        if not len(children):
+            return -1
+        start, end = children.start, children.stop
+        wins = np.flatnonzero(self.terminal[start:end] == 1)
+        if len(wins):
+            return start + int(wins[0])
+        return start + int(np.lexsort((self.priors[start:end], self.visits[start:end]))[-1])
+
+    def find_child(self, node, key):
+        """Expanded child of node whose position has the given key, -1 if there is none"""
+        for child in self.children(node):
+            if self.first_child[child] >= 0 and int(self.keys[child]) == key:
+                return child
+        return -1
+
+    def seed_children(self, node, move_stats):
+        """
+        Gives the children of a new node the statistics move -> (total_score, visits) of earlier searches,
+        and adds them to the node itself so its mean value stays that of its visits. Its ancestors keep theirs.
+        """
+        for child in self.children(node):
+            stats = move_stats.get(self.move(child))
+            if stats is not None:
+                self.value_sums[child], self.visits[child] = stats
+                self.value_sums[node] -= stats[0]
+                self.visits[node] += stats[1]
+
+    def reuse(self, key, last_child):
+        """
+        Re-roots the tree at the position with key if it is the root (same position again), a child
+        or a grandchild of the root, looking below last_child (our last move) first, else starts a new tree.
+        Returns the number of visits kept.
+        """
+        if self.size:
+            if int(self.keys[ROOT]) == key:
+                return int(self.visits[ROOT])
+            node = self.find_child(ROOT, key)
+            if node >= 0:
+                return self.promote(node)  # The root was the opponent's position, e.g. after pondering
+            candidates = [last_child] if 0 <= last_child < self.size else []
+            candidates.extend(child for child in self.children(ROOT) if child != last_child)
+            for child in candidates:
+                node = self.find_child(child, key)
+                if node >= 0:
+                    return self.promote(node)
+        self.reset(key)
+        return 0
+
+    def move_stats(self, node):
+        """Statistics of the children of node as a dict move -> (total_score, visits), scored for the player to move"""
+        return {
+            self.move(child): (float(self.value_sums[child]), int(self.visits[child]))
+            for child in self.children(node)
+            if self.visits[child] > 0
+        }
+
+    def depth(self):
+        """Depth of the deepest expanded node below the root"""
+        depth = 0
+        frontier = [ROOT]
+        while frontier:
+            frontier = [child for node in frontier for child in self.children(node) if self.first_child[child] >= 0]
+            if frontier:
+                depth += 1
+        return depth
+
+    def promote(self, node):
+        """
+        Makes node the new root and compacts its subtree to the front of the arrays, releasing
+        every other node. Returns the number of visits kept.
+        """
+        order = [node]              # Old indices in their new order, children blocks stay contiguous
+        new_first = {}
+        i = 0
+        while i < len(order):
+            old = order[i]
+            start = int(self.first_child[old])
+            if start >= 0:
+                new_first[old] = len(order)
+                order.extend(range(start, start + int(self.num_children[old])))
+            i += 1
+        order = np.array(order, dtype=np.intp)
+        remap = np.full(self.size, -1, dtype=np.int32)
+        remap[order] = np.arange(len(order), dtype=np.int32)
+
+        for name in ("visits", "value_sums", "priors", "moves", "num_children", "keys", "terminal"):
+            array = getattr(self, name)
+            array[:len(order)] = array[order]
+        parents = self.parents[order]
+        self.parents[:len(order)] = np.where(parents >= 0, remap[np.maximum(parents, 0)], -1)
+        self.parents[ROOT] = -1
+        self.first_child[:len(order)] = [new_first.get(int(old), -1) for old in order]
+        self.size = len(order)
+        return int(self.visits[ROOT])
+
+    def search(self, game, end_time, clock, expansion_moves, move_priors, rollout, c_puct=1.5, expand_visits=4,
+               max_iterations=None, stop=None, stop_check=None, child_stats=None):
+        """
+        Runs select / expand / simulate / backup iterations from the root until clock() reaches end_time,
+        the threading.Event stop is set or stop_check(iterations) returns True (asked every STOP_CHECK_INTERVAL).
+        game is the root position and is restored on return. A node is expanded once it has expand_visits
+        simulations; until then its simulations start from its move.
+
+        expansion_moves(game) -> moves of the player to move
+        move_priors(game, moves) -> (priors, terminal) for those moves, see expand
+        rollout(game, move) -> (total value, simulations) after move, scored for the player to move at the root
+        child_stats(game, moves) -> move_stats of earlier searches to seed a new node's children with (see seed_children)
+        """
+        iterations = 0
+        while clock() < end_time and (max_iterations is None or iterations < max_iterations):
+            if stop is not None and stop.is_set():
+                break
+            if stop_check is not None and iterations % STOP_CHECK_INTERVAL == 0 and iterations and stop_check(iterations):
+                break
+            iterations += 1
+            node = ROOT
+            path = [ROOT]
+            records = []
+            value, count = 0.0, 1
+            while True:
+                if self.num_children[node] == 0:
+                    break  # No legal moves: score as a draw
+                child = self.select_child(node, c_puct)
+                path.append(child)
+                if self.terminal[child]:
+                    # Scored for the player who moved into child, turned into the root player's view
+                    value = float(self.terminal[child]) * (1.0 if len(path) % 2 == 0 else -1.0)
+                    break
+                move = self.move(child)
+                if self.first_child[child] < 0 and (self.visits[child] < expand_visits or self.is_full()):
+                    value, count = rollout(game, move)
+                    break
+                record = game.apply_move(move)
+                game.current_player = -record.player
+                records.append(record)
+                if self.first_child[child] < 0:
+                    moves = expansion_moves(game)
+                    if moves:
+                        priors, terminal = move_priors(game, moves)
+                        self.expand(child, game.zobrist_hash, moves, priors, terminal)
+                        if child_stats is not None:
+                            self.seed_children(child, child_stats(game, moves))
+                    else:
+                        self.first_child[child] = self.size
+                        self.keys[child] = game.zobrist_hash
+                node = child
+            for record in reversed(records):
+                game.undo(record)
+            self.backup(path, value, count)
+        return iterations
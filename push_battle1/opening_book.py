@@ -0,0 +1,166 @@
+import argparse
+import mmap
+import random
+import struct
+import time
+import numpy as np
+from PushBattle import Game, EMPTY, MOVE_OK, encode_move, decode_move
+from symmetry import canonical_hash, transform_move, unique_moves, INVERSE
+from alphabeta_agent import AlphaBetaAgent
+
+'''
+Opening book for the placement phase.
+
+The book maps canonical_hash keys of placement-phase positions (player to move still placing)
+to the move a deep search chose there, stored in the canonical frame so one entry answers every
+symmetric copy of the position. build_book searches every position within a number of plies
+of the start and every placement position of a set of self-play games.
+
+File layout, little-endian: HEADER (magic, entry count n), then the n keys sorted ascending
+(uint64), the n encode_move codes (uint16) and the n search depths (uint8). OpeningBook maps the
+file with mmap and looks keys up with np.searchsorted, so opening it reads nothing up front and
+a lookup costs one canonical_hash and a binary search.
+'''
+
+HEADER = struct.Struct("<8sQ")
+MAGIC = b"PBBOOK1\0"
+DEFAULT_PATH = "opening_book.bin"
+
+
+class OpeningBook:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.file = open(path, "rb")
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+        offset = HEADER.size
+        self.keys = np.frombuffer(self.mmap, dtype='<u8', count=count, offset=offset)
+        offset += 8 * count
+        self.moves = np.frombuffer(self.mmap, dtype='<u2', count=count, offset=offset)
+        offset += 2 * count
+        self.depths = np.frombuffer(self.mmap, dtype='u1', count=count, offset=offset)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def probe(self, key):
+        """Index of the entry for a canonical key, -1 if there is none"""
+        i = int(np.searchsorted(self.keys, np.uint64(key)))
+        if i < len(self.keys) and int(self.keys[i]) == key:
+            return i
+        return -1
+
+    def lookup(self, game):
+        """Book move for game in its own frame, None if the position is not in the book"""
+        if not game.in_placement_phase():
+            return None
+        key, t = canonical_hash(game)
+        i = self.probe(key)
+        if i >= 0:
+            move = transform_move(decode_move(int(self.moves[i])), INVERSE[t])
+            if game.placement_status(*move) == MOVE_OK:
+                self.hits += 1
+                return move
+        self.misses += 1
+        return None
+
+    def close(self):
+        self.keys = self.moves = self.depths = None  # Release the buffers exported by the mmap
+        self.mmap.close()
+        self.file.close()
+
+
+def write_book(path, entries):
+    """Writes entries, a dict canonical key -> (canonical move, depth), as a book file"""
+    keys = np.array(sorted(entries), dtype='<u8')
+    moves = np.array([encode_move(entries[int(key)][0]) for key in keys], dtype='<u2')
+    depths = np.array([min(entries[int(key)][1], 255) for key in keys], dtype='u1')
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys)))
+        f.write(keys.tobytes())
+        f.write(moves.tobytes())
+        f.write(depths.tobytes())
+
+
+def add_position(entries, game, agent):
+    """Searches a placement position not yet in entries and records its move; returns the move in the game's frame"""
+    key, t = canonical_hash(game)
+    if key in entries:
+        return transform_move(entries[key][0], INVERSE[t])
+    move = agent.get_best_move(game)
+    if move is not None:
+        entries[key] = (transform_move(move, t), agent.search_stats.get("depth", 0))
+    return move
+
+def build_book(path, plies=2, games=0, random_plies=4, time_limit=1.0, max_depth=None, seed=0, log=print):
+    """
+    Searches every position up to plies moves from the start, then the placement positions of
+    games self-play games whose first random_plies moves are random, and writes the book.
+    """
+    agent = AlphaBetaAgent()
+    agent.time_limit = time_limit
+    if max_depth is not None:
+        agent.max_depth = max_depth
+        agent.time_limit = float("inf")
+    entries = {}
+    start = time.time()
+
+    # Every position within plies moves, one per symmetry class
+    frontier = [Game()]
+    for ply in range(plies + 1):
+        next_frontier = {}
+        for game in frontier:
+            if not game.in_placement_phase():
+                continue
+            add_position(entries, game, agent)
+            if ply == plies:
+                continue
+            for move in unique_moves(game, list(game.iter_moves())):
+                child = game.clone()
+                child.apply_move(move)
+                if child.check_winner() != EMPTY:
+                    continue
+                child.current_player *= -1
+                next_frontier.setdefault(canonical_hash(child)[0], child)
+        frontier = list(next_frontier.values())
+        log(f"ply {ply}: {len(entries)} positions, {time.time() - start:.0f}s")
+
+    # Self-play from random openings, both sides playing the book move
+    rng = random.Random(seed)
+    for i in range(games):
+        game = Game()
+        while game.in_placement_phase():
+            if game.turn_count < random_plies:
+                move = game.random_move(rng)
+            else:
+                move = add_position(entries, game, agent)
+            if move is None:
+                break
+            game.apply_move(move)
+            if game.check_winner() != EMPTY:
+                break
+            game.current_player *= -1
+            game.turn_count += 1
+        log(f"game {i + 1}/{games}: {len(entries)} positions, {time.time() - start:.0f}s")
+
+    write_book(path, entries)
+    return entries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Builds a placement-phase opening book")
+    parser.add_argument("--out", default=DEFAULT_PATH)
+    parser.add_argument("--plies", type=int, default=2, help="search every position up to this many moves")
+    parser.add_argument("--games", type=int, default=0, help="self-play games to add")
+    parser.add_argument("--random-plies", type=int, default=4, help="random moves at the start of each game")
+    parser.add_argument("--time", type=float, default=1.0, help="search time per position")
+    parser.add_argument("--depth", type=int, default=None, help="fixed search depth instead of --time")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    entries = build_book(args.out, args.plies, args.games, args.random_plies, args.time, args.depth, args.seed)
+    print(f"{len(entries)} positions written to {args.out}")
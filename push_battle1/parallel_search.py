@@ -0,0 +1,174 @@
+import logging
+import os
+import random
+import threading
+import time
+import multiprocessing as mp
+import numpy as np
+from PushBattle import Game
+from mcts_tree import ROOT
+
+'''
+Root-parallel MCTS.
+
+ParallelSearch starts its worker processes once and keeps them (and the agent object each one
+holds, with its search tree and transposition table) for the whole game. Every get_best_move
+sends the position to all workers; each searches it with its own seed and returns its root
+move statistics, which are summed and the most visited move is played. A forced win a worker's
+threat solver proved (search_stats "solver_win") is played as it is: that worker did not search,
+so it has no statistics to merge. A worker whose search raised logs the traceback and reports
+the failure; its index is listed in search_stats "failed" and its result is left out.
+
+Worker i reseeds random and its agent's NumPy generator from seeds[i] and the position's hash
+before every search, so with max_iterations set the result only depends on the seed set.
+With a time limit the iteration counts, and therefore the result, depend on machine load.
+'''
+
+WORKERS_ENV = "PUSHBATTLE_WORKERS"      # Default worker count, falls back to the number of CPUs
+MERGE_MARGIN = 0.05                     # Seconds kept from the time limit to collect and merge the results
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers():
+    return int(os.environ.get(WORKERS_ENV, os.cpu_count() or 1))
+
+def search_seed(seed, key):
+    """Seed of one worker's search of the position with Zobrist key"""
+    return (seed * 0x9E3779B97F4A7C15 ^ key) & 0xFFFFFFFFFFFFFFFF
+
+def _worker(conn, agent_cls, agent_kwargs, seed):
+    agent = agent_cls(**agent_kwargs)
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        if task == "new_game":
+            agent = agent_cls(**agent_kwargs)
+            continue
+        data, time_limit, max_iterations = task
+        game = Game.from_bytes(data)
+        seed_value = search_seed(seed, game.zobrist_hash)
+        random.seed(seed_value)
+        agent.rng = np.random.default_rng(seed_value)
+        agent.time_limit = time_limit
+        agent.max_iterations = max_iterations
+        try:
+            move = agent.get_best_move(game)
+            stats = agent.search_stats
+            # Without a tree search (solver win) the tree still holds an older root
+            move_stats = agent.tree.move_stats(ROOT) if agent.last_child >= 0 else {}
+            conn.send((move, move_stats, stats.get("iterations", 0), bool(stats.get("solver_win")), None))
+        except Exception as e:
+            logger.exception("Error in search worker")
+            conn.send((None, {}, 0, False, repr(e)))
+
+
+class ParallelSearch:
+    def __init__(self, agent_cls, workers=None, seeds=None, **agent_kwargs):
+        workers = workers or default_workers()
+        self.seeds = list(seeds) if seeds is not None else list(range(workers))
+        self.time_limit = 0.95
+        self.max_iterations = None      # Iterations per worker; None searches until the time limit
+        self.time_manager = None        # TimeManager setting time_limit for every move, if any
+        self.search_stats = {}
+        self.lock = threading.Lock()    # One search at a time: all requests share the worker pipes
+        self.connections = []
+        self.processes = []
+        self.busy = []                  # Workers whose last result was not collected before the deadline
+        for seed in self.seeds:
+            parent_conn, child_conn = mp.Pipe()
+            process = mp.Process(target=_worker, args=(child_conn, agent_cls, agent_kwargs, seed), daemon=True)
+            process.start()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+            self.busy.append(False)
+
+    def new_game(self):
+        """Gives every worker a fresh agent, without restarting the processes"""
+        with self.lock:
+            for i, conn in enumerate(self.connections):
+                self._drain(i, 0.0)
+                conn.send("new_game")
+
+    def _drain(self, i, timeout):
+        """Discards a late result of worker i, waiting up to timeout seconds (None = until it arrives); True if the worker is free"""
+        if self.busy[i] and self.connections[i].poll(timeout):
+            self.connections[i].recv()
+            self.busy[i] = False
+        return not self.busy[i]
+
+    def search(self, game):
+        """
+        Runs the search on every free worker. Returns the merged root statistics move -> (total_score, visits)
+        and a move to play without them (a proven win, else any worker's move), None if no worker answered.
+        """
+        end_time = time.time() + self.time_limit
+        data = game.to_bytes()
+        # A worker still finishing the last search is skipped, unless the search is a fixed iteration one
+        drain_timeout = MERGE_MARGIN if self.max_iterations is None else None
+        started = []
+        for i, conn in enumerate(self.connections):
+            if self._drain(i, drain_timeout):
+                worker_time = max(end_time - time.time() - MERGE_MARGIN, 0.0)
+                conn.send((data, worker_time, self.max_iterations))
+                self.busy[i] = True
+                started.append(i)
+
+        move_stats = {}
+        iterations = 0
+        merged = 0
+        failed = []
+        solver_win = None
+        fallback = None
+        for i in started:
+            conn = self.connections[i]
+            # Fixed iteration searches are waited for, timed ones only until the deadline
+            if self.max_iterations is None and not conn.poll(max(end_time - time.time(), 0.0)):
+                continue
+            move, worker_stats, worker_iterations, worker_solver_win, error = conn.recv()
+            self.busy[i] = False
+            if error is not None:
+                logger.warning("Search worker %d failed: %s", i, error)
+                failed.append(i)
+                continue
+            merged += 1
+            iterations += worker_iterations
+            if move is not None:
+                move = tuple(move)
+                fallback = fallback or move
+                if worker_solver_win and solver_win is None:
+                    solver_win = move
+            for move, (score, visits) in worker_stats.items():
+                total_score, total_visits = move_stats.get(move, (0.0, 0))
+                move_stats[move] = (total_score + score, total_visits + visits)
+
+        self.search_stats = {
+            "workers": len(self.connections),
+            "merged": merged,
+            "failed": failed,
+            "iterations": iterations,
+            "root_visits": sum(visits for _, visits in move_stats.values()),
+            "solver_win": solver_win is not None,
+        }
+        return move_stats, solver_win or fallback
+
+    def get_best_move(self, game):
+        """Most visited move over all workers, ties broken by move so the result does not depend on arrival order"""
+        with self.lock:
+            if self.time_manager is not None:
+                self.time_manager.start()
+                self.time_limit = self.time_manager.plan(game) - self.time_manager.start_time
+            move_stats, move = self.search(game)
+        if self.search_stats["solver_win"]:
+            return move
+        if not move_stats:
+            return move if move is not None else game.random_move()
+        return max(sorted(move_stats), key=lambda move: move_stats[move][1])
+
+    def close(self):
+        with self.lock:
+            for conn in self.connections:
+                conn.send(None)
+            for process in self.processes:
+                process.join(timeout=1)
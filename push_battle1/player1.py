@@ -1,14 +1,55 @@
 from flask import Flask, request, jsonify
 from PushBattle import Game, PLAYER1, PLAYER2, EMPTY, BOARD_SIZE, NUM_PIECES, _torus
+from wire import CONTENT_TYPE, SESSION_HEADER, ENGINE_TIME_HEADER, choose_encoding, decode_move_request
+from sessions import AgentSession, SessionStore, ResyncRequired
+from parallel_search import ParallelSearch, default_workers
+from ponder import Ponderer
+from time_manager import TimeManager
+from opening_book import OpeningBook, DEFAULT_PATH
+import os
+import time
 
 # Import This
 # from &lt;AGENT FILENAME&gt; import &lt;AGENT CLASSNAME&gt;
 from random_agent import RandomAgent
 from MCTSAgent import MCTSAgent, FastMCTSAgent
+from alphabeta_agent import AlphaBetaAgent
 
 app = Flask(__name__)
 
 agent = None
+sessions = SessionStore()   # AgentSessions of the games the judge plays with the move-delta protocol, LRU and idle eviction
+pool = None     # Root-parallel search workers (parallel_search.py), started on the first /start and kept after
+ponderer = Ponderer()   # Searches on the opponent's time between our reply and the next /move
+time_manager = TimeManager()    # Search time per move from max_latency, see time_manager.py
+AGENT_ENV = "PUSHBATTLE_AGENT"  # "mcts" (default) or "alphabeta"
+BOOK_ENV = "PUSHBATTLE_BOOK"    # Opening book file (opening_book.py), played without search when a position is in it
+book_path = os.environ.get(BOOK_ENV, os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_PATH))
+book = OpeningBook(book_path) if os.path.exists(book_path) else None
+
+def new_agent():
+    """Agent for a new game: PUSHBATTLE_AGENT selects it, PUSHBATTLE_WORKERS the MCTS search processes (1: in this one)"""
+    global pool
+    if os.environ.get(AGENT_ENV, "mcts") == "alphabeta":
+        return AlphaBetaAgent()
+    if default_workers() > 1:
+        if pool is None:
+            pool = ParallelSearch(FastMCTSAgent)
+        else:
+            pool.new_game()
+        return pool
+    return FastMCTSAgent()
+
+def set_latency(max_latency):
+    """Sizes pondering and the time manager to the new game's max_latency"""
+    ponderer.max_time = max_latency or ponderer.max_time
+    time_manager.max_latency = max_latency or time_manager.max_latency
+
+@app.before_request
+def stop_pondering():
+    """Every judge request (/start, /move, /end) ends the search on the opponent's time first"""
+    if request.method == 'POST':
+        ponderer.stop()
 
 @app.route('/start', methods=['POST'])
 def start_game():
@@ -21,6 +62,8 @@ def start_game():
     board - 2D Array - 2D array of the board
     first_turn - Boolean - True if your agent has the first turn; False if your agent has the second turn
     max_latency - Int - Integer representing how many seconds you have to make a move
+    encodings - List - /move payload encodings the judge supports (see wire.py); the reply names the one to use
+    sessions - Boolean - True if the judge supports sessions (see sessions.py); the reply then carries a session_id
     """
 
     ##### DO NOT MODIFY #####
@@ -34,13 +77,21 @@ def start_game():
 
     ##### MODIFY BELOW #####
 
-    agent = FastMCTSAgent()
+    set_latency(max_latency)
+    agent = new_agent()
+    agent.time_manager = time_manager
 
     ###################
+
+    reply = {
+        "message": "Game started successfully",
+        "encoding": choose_encoding(data.get('encodings')),
+    }
+    if data.get('sessions'):
+        session = sessions.add(AgentSession(agent, game))
+        reply["session_id"] = session.session_id
     
-    return jsonify({
-        "message": "Game started successfully"
-    })
+    return jsonify(reply)
 
 @app.route('/move', methods=['POST'])
 def make_move():
@@ -65,26 +116,64 @@ def make_move():
     c0 - column value of the piece to move
     r1 - row value of the piece to place
     c1 - column value of the piece to place
+
+    If the binary encoding was negotiated on /start, the request body is a wire.py binary payload instead of JSON.
+    In session mode the JSON body may instead carry only last_move and hash (see sessions.py); the reply is
+    409 {"resync": true} when the session cannot reproduce the judge's position, and the judge resends it in full.
     """
-    data = request.get_json()
-    game_data = data.get('game')
-    game = Game.from_dict(game_data)
-    board = data.get('board')
+    request_start = time.time()
+    session_id = request.headers.get(SESSION_HEADER)
+    session = sessions.get(session_id) if session_id else None
+    if request.content_type == CONTENT_TYPE:
+        data = decode_move_request(request.get_data())
+        game = data['game']
+        board = game.board
+    else:
+        data = request.get_json()
+        if 'game' in data:
+            game_data = data.get('game')
+            game = Game.from_dict(game_data)
+            board = data.get('board')
+        else:
+            try:
+                if session is None:
+                    raise ResyncRequired()
+                session.sync(data.get('last_move'), data.get('hash'), data.get('turn_count'))
+            except ResyncRequired:
+                return jsonify({"resync": True}), 409
+            game = session.game
+            board = game.board
     turn_count = data.get('turn_count')
     attempt_number = data.get('attempt_number')
+    if session is not None and game is not session.game:
+        session.reset(game)
+    game_agent = session.agent if session is not None else agent
     
     ##### MODIFY BELOW #####
 
     # Move logic should go here
     # This is where you'd call your minimax/MCTS/neural network/etc
 
-    move = agent.get_best_move(game)
+    search_start = time.time()
+    move = book.lookup(game) if book is not None else None
+    if move is None:
+        move = game_agent.get_best_move(game)
+    search_time = time.time() - search_start
 
     ###################
+
+    ponder_game = game.clone()
+    if session is not None:
+        session.commit_move(move, turn_count)
     
-    return jsonify({
+    response = jsonify({
         "move": move  # Return your chosen move
     })
+    response.headers[ENGINE_TIME_HEADER] = repr(search_time)
+    time_manager.record_overhead(time.time() - request_start - search_time)
+    # Ponder only once the reply has been sent
+    response.call_on_close(lambda: ponderer.start(game_agent, ponder_game, move))
+    return response
 
 # ====================================
 # DO NOT MODIFY BELOW THIS LINE
@@ -0,0 +1,42 @@
+import logging
+import threading
+
+'''
+Pondering: searching on the opponent's time.
+
+After a /move reply has been sent, Ponderer.start runs the agent's ponder method in a
+background thread on the position after our move. The next request calls Ponderer.stop
+first, which sets the stop event and waits for the current search iteration to finish, so
+the agent is never used by two threads at once. Agents without a ponder method are skipped.
+'''
+
+logger = logging.getLogger(__name__)
+
+
+class Ponderer:
+    def __init__(self, max_time=4):
+        self.max_time = max_time    # Longest time to ponder, the opponent's max_latency
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self, agent, game, move):
+        """Starts pondering from game, the position before our move; the caller must not change game afterwards"""
+        self.stop()
+        if move is None or not hasattr(agent, "ponder"):
+            return
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(agent, game, move, self.stop_event), daemon=True)
+        self.thread.start()
+
+    def _run(self, agent, game, move, stop_event):
+        try:
+            agent.ponder(game, move, stop_event, self.max_time)
+        except Exception:
+            logger.exception("Error while pondering")
+
+    def stop(self):
+        """Stops pondering and waits until the agent is free"""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,68 @@
+import numpy as np
+from PushBattle import Game, PLAYER1, PLAYER2, EMPTY
+
+'''
+Fixed positions shared by the benchmarks and the tests.
+
+position(name) builds a fresh Game (or, with cls, a BitboardGame) of one of POSITIONS:
+"start" is the empty board, "opening" and "placement" are quiet placement positions without a
+forced win, "movement" is a movement-phase position in which PLAYER1 wins with (0, 0, 0, 2).
+'''
+
+# Fixed positions: rows from the top (X = PLAYER1, O = PLAYER2), player to move, turn_count
+POSITIONS = {
+    "start": ([
+        "........",
+        "........",
+        "........",
+        "........",
+        "........",
+        "........",
+        "........",
+        "........",
+    ], PLAYER1, 0),
+    "opening": ([
+        "........",
+        "........",
+        "O.......",
+        "......X.",
+        "........",
+        ".......X",
+        "........",
+        "....O...",
+    ], PLAYER1, 4),
+    "placement": ([
+        ".X..O..X",
+        "........",
+        "........",
+        "...X..O.",
+        "X.......",
+        "..O..X..",
+        "O.......",
+        "........",
+    ], PLAYER2, 9),
+    "movement": ([
+        "X.......",
+        "..XOX..O",
+        "..X.O...",
+        "..O...X.",
+        "X.....X.",
+        "........",
+        "X.O.....",
+        "..O.O.O.",
+    ], PLAYER1, 20),
+}
+
+
+def position(name, cls=Game):
+    """A fresh copy of one of POSITIONS"""
+    rows, player, turn_count = POSITIONS[name]
+    board = np.array([[{".": EMPTY, "X": PLAYER1, "O": PLAYER2}[cell] for cell in row] for row in rows])
+    game = Game.from_dict({
+        "board": board.tolist(),
+        "current_player": player,
+        "turn_count": turn_count,
+        "p1_pieces": int((board == PLAYER1).sum()),
+        "p2_pieces": int((board == PLAYER2).sum()),
+    })
+    return game if cls is Game else cls.from_game(game)
@@ -0,0 +1,117 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from PushBattle import chess_notation_to_array
+
+'''
+Stateful agent sessions for the move-delta protocol.
+
+When the judge offers sessions on /start, the agent creates an AgentSession and replies with its
+session_id. Each later /move carries only the opponent's last move (chess notation, as in the
+judge's game_str) and the Zobrist hash of the judge's position. The session replays the move on
+its own Game, checks the hash and keeps its agent (and the agent's search state) between moves.
+If the hash does not match, the agent answers 409 and the judge resends the full position.
+
+A server playing many games at once keeps its sessions in a SessionStore, which drops sessions
+idle for longer than idle_timeout and, when full, the least recently used one.
+'''
+
+class ResyncRequired(Exception):
+    """The session's position no longer matches the judge's; a full snapshot is needed"""
+
+
+class AgentSession:
+    def __init__(self, agent, game, session_id=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.last_used = time.time()
+        self.lock = threading.Lock()    # Held while a request uses the session, so a retried /move waits for the first
+        self.agent = agent      # Agent object kept for the whole game
+        self.game = game        # Position after our last move (opponent to move)
+        self.turn = None        # turn_count of the last /move we answered
+        self.record = None      # MoveRecord of our last move, so a retried turn can be undone
+
+    def sync(self, last_move, state_hash, turn_count):
+        """Replays the opponent's last move on the session game and checks it against the judge's hash"""
+        game = self.game
+        try:
+            if self.record is not None and turn_count == self.turn:
+                # Second attempt of a turn we already answered: take our move back
+                game.undo(self.record)
+            elif last_move:
+                game.make_move(chess_notation_to_array(last_move))
+                game.current_player *= -1
+        except (ValueError, IndexError):
+            raise ResyncRequired()
+        self.record = None
+        game.turn_count = turn_count
+        if game.zobrist_hash != state_hash:
+            raise ResyncRequired()
+
+    def reset(self, game):
+        """Replaces the session game with a full snapshot from the judge"""
+        self.game = game
+        self.record = None
+
+    def commit_move(self, move, turn_count):
+        """Plays our chosen move on the session game"""
+        if move is None:
+            return
+        self.record = self.game.apply_move(move)
+        self.game.current_player *= -1
+        self.turn = turn_count
+
+
+class SessionStore:
+    def __init__(self, max_sessions=32, idle_timeout=300.0, clock=time.time):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout    # Seconds without a request after which a session is dropped
+        self.clock = clock
+        self.sessions = OrderedDict()       # session_id -> AgentSession, least recently used first
+        self.lock = threading.Lock()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def get(self, session_id):
+        """The session with session_id, marked as used; None if there is none"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_used = self.clock()
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def add(self, session):
+        """Stores session, first evicting idle sessions and then, if still full, the least recently used"""
+        with self.lock:
+            session.last_used = self.clock()
+            self.sessions.pop(session.session_id, None)
+            self._evict_idle()
+            while len(self.sessions) >= self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evicted += 1
+            self.sessions[session.session_id] = session
+        return session
+
+    def remove(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        """Drops the sessions idle for longer than idle_timeout; returns how many"""
+        with self.lock:
+            return self._evict_idle()
+
+    def _evict_idle(self):
+        cutoff = self.clock() - self.idle_timeout
+        count = 0
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.last_used > cutoff:
+                break
+            self.sessions.popitem(last=False)
+            count += 1
+        self.evicted += count
+        return count
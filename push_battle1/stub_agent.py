@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from PushBattle import Game
+from wire import ENGINE_TIME_HEADER
+from random_agent import RandomAgent
+
+'''
+Minimal agent server for testing judges without Flask or a real engine.
+
+StubAgentServer speaks the judge protocol (GET /, /start, /move, /end) with JSON payloads and
+no session mode, using only the standard library. Each /move builds the game from the request
+and asks an agent object for its move, so one server can serve many games at once as long as
+the agent keeps no per-game state (RandomAgent by default). delay adds seconds of thinking to
+every move, to exercise timeouts; connections are kept alive like a production server.
+'''
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.reply(200, {"message": "Successfully Connected"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.reply(400, {"error": "invalid JSON"})
+            return
+        server = self.server
+        if self.path == "/start":
+            server.started += 1
+            self.reply(200, {"message": "Game started successfully"})
+        elif self.path == "/end":
+            server.ended += 1
+            self.reply(200, {"message": "Game ended successfully"})
+        elif self.path == "/move" and "game" in data:
+            start = time.time()
+            if server.delay:
+                time.sleep(server.delay)
+            move = server.agent.get_best_move(Game.from_dict(data["game"]))
+            if move is not None:
+                move = [int(x) for x in move]
+            self.reply(200, {"move": move}, {ENGINE_TIME_HEADER: repr(time.time() - start)})
+        else:
+            self.reply(404, {"error": f"unknown request {self.path}"})
+
+    def reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubAgentServer:
+    def __init__(self, agent=None, delay=0.0, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), _StubHandler)
+        self.server.daemon_threads = True
+        self.server.agent = agent if agent is not None else RandomAgent()
+        self.server.delay = delay
+        self.server.started = 0     # /start and /end requests served
+        self.server.ended = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serves requests on a daemon thread; returns self"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
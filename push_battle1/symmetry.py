@@ -0,0 +1,110 @@
+import numpy as np
+from PushBattle import PLAYER1, PLAYER2, BOARD_SIZE, ZOBRIST_SIDE
+from bitboard import zobrist_masks_hash
+
+'''
+Symmetries of the PushBattle board.
+
+The board is a torus and pushes and 3-in-a-row lines look the same in all 8 directions, so
+every translation combined with every rotation/reflection of the square maps positions to
+equivalent positions: 64 translations x 8 dihedral maps = 512 transforms. Transform t sends
+square (r, c) to DIHEDRAL[t // 64](r, c) + (t % 64 // 8, t % 8), all mod BOARD_SIZE.
+'''
+
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+
+# The 8 rotations/reflections of the square as functions of (r, c)
+DIHEDRAL = [
+    lambda r, c: (r, c),
+    lambda r, c: (c, -r),
+    lambda r, c: (-r, -c),
+    lambda r, c: (-c, r),
+    lambda r, c: (r, -c),
+    lambda r, c: (-r, c),
+    lambda r, c: (c, r),
+    lambda r, c: (-c, -r),
+]
+NUM_TRANSFORMS = len(DIHEDRAL) * NUM_CELLS
+
+# CELL_MAP[t, cell] is the square that cell is sent to by transform t; CELL_SOURCE[t] is its inverse permutation
+CELL_MAP = np.zeros((NUM_TRANSFORMS, NUM_CELLS), dtype=np.intp)
+for _d, _dihedral in enumerate(DIHEDRAL):
+    for _tr in range(BOARD_SIZE):
+        for _tc in range(BOARD_SIZE):
+            for _r in range(BOARD_SIZE):
+                for _c in range(BOARD_SIZE):
+                    _r1, _c1 = _dihedral(_r, _c)
+                    _r1 = (_r1 + _tr) % BOARD_SIZE
+                    _c1 = (_c1 + _tc) % BOARD_SIZE
+                    CELL_MAP[_d * NUM_CELLS + _tr * BOARD_SIZE + _tc, _r * BOARD_SIZE + _c] = _r1 * BOARD_SIZE + _c1
+CELL_SOURCE = np.argsort(CELL_MAP, axis=1)
+
+# INVERSE[t] is the transform that undoes t
+_transform_index = {tuple(row): t for t, row in enumerate(CELL_MAP)}
+INVERSE = np.array([_transform_index[tuple(row)] for row in CELL_SOURCE], dtype=np.intp)
+
+
+def transformed_boards(game):
+    """Returns the (NUM_TRANSFORMS, NUM_CELLS) array of the board under every transform"""
+    flat = np.asarray(game.board).reshape(NUM_CELLS)
+    return flat[CELL_SOURCE]
+
+def _masks(boards, player):
+    return np.packbits(boards == player, axis=1, bitorder='little').view('<u8').reshape(len(boards))
+
+def canonical_form(game):
+    """
+    Returns (p1_mask, p2_mask, t): the masks of the smallest transformed board (by p1 mask, then p2 mask)
+    and the transform t that maps the game's board onto it.
+    """
+    boards = transformed_boards(game)
+    p1_masks = _masks(boards, PLAYER1)
+    p2_masks = _masks(boards, PLAYER2)
+    t = int(np.lexsort((p2_masks, p1_masks))[0])
+    return int(p1_masks[t]), int(p2_masks[t]), t
+
+def canonical_hash(game):
+    """
+    Returns (key, t): a 64-bit Zobrist key that is the same for every symmetric copy of the position
+    (board, side to move and piece counts), and the transform t that maps the game onto the canonical form.
+    Moves found for the canonical position map back with transform_move(move, INVERSE[t]).
+    """
+    p1_mask, p2_mask, t = canonical_form(game)
+    key = zobrist_masks_hash(p1_mask, p2_mask, game.p1_pieces, game.p2_pieces)
+    if game.current_player == PLAYER2:
+        key ^= ZOBRIST_SIDE
+    return key, t
+
+def transform_move(move, t):
+    """Maps a placement (r, c) or movement (r0, c0, r1, c1) through transform t"""
+    cell_map = CELL_MAP[t]
+    squares = []
+    for i in range(0, len(move), 2):
+        squares.extend(divmod(int(cell_map[move[i] * BOARD_SIZE + move[i + 1]]), BOARD_SIZE))
+    return tuple(squares)
+
+def stabilizer(game):
+    """Returns the transforms that leave the board unchanged"""
+    flat = np.asarray(game.board).reshape(NUM_CELLS)
+    return np.flatnonzero((transformed_boards(game) == flat).all(axis=1))
+
+def unique_moves(game, moves):
+    """
+    Collapses moves to one representative per symmetry class: two moves are equivalent if a transform
+    that leaves the board unchanged maps one onto the other. Keeps the first move of each class, in order.
+    """
+    if not moves:
+        return moves
+    transforms = stabilizer(game)
+    if len(transforms) == 1:
+        return list(moves)
+    maps = CELL_MAP[transforms]
+    squares = np.array(moves, dtype=np.intp).reshape(len(moves), -1, 2)
+    cells = squares[:, :, 0] * BOARD_SIZE + squares[:, :, 1]
+    # Smallest image code of each move over the stabilizer identifies its class
+    codes = maps[:, cells[:, 0]]
+    for i in range(1, cells.shape[1]):
+        codes = codes * NUM_CELLS + maps[:, cells[:, i]]
+    classes = codes.min(axis=0)
+    _, first = np.unique(classes, return_index=True)
+    return [moves[i] for i in sorted(first)]
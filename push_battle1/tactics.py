@@ -0,0 +1,263 @@
+import time
+from PushBattle import EMPTY, BOARD_SIZE, MOVE_OK
+from bitboard import BitboardGame, FULL_MASK, NUM_CELLS, cell_bit, iter_bits
+from bitboard import shift_east, shift_west, shift_south, shift_north
+
+'''
+Threat-space solver: proves forced wins made of immediate threats.
+
+The attacker (the player to move) only plays threats, moves after which it could win on the
+spot if it moved again; the defender answers with every legal move. A win in N is an attacker
+move that wins on the spot (N = 1), or a threat such that every defender reply either lets
+the attacker win on the spot or leads to a win in N - 1. Pushes are played by apply_move,
+so lines completed or broken by pushes are part of the search.
+
+Restricting the attacker to threats keeps the tree small, and since every defender reply is
+searched a found win is a proof. A search that runs out of nodes or time reports no win.
+
+Immediate wins are only looked for on squares that can complete a line: a new line through
+the target square needs two own pieces within 2 squares of it, and a line through a pushed
+own piece needs an own piece next to the target.
+
+The MCTS agents call start and find_win at the root, playing a found win without searching,
+and mark_wins whenever the tree expands a node, so proven wins become terminal children.
+Both run under the node and time limits below.
+'''
+
+MAX_DEPTH = 3           # Attacker moves of the longest win searched for
+MAX_NODES = 2000        # Moves applied per find_win call
+ROOT_SHARE = 0.1        # Longest share of a move's search time spent solving the root
+NODE_SHARE = 0.1        # Share of a move's search time spent solving expanded tree nodes, in total
+NODE_DEPTH = 2          # Longest win searched for at an expanded node
+NODE_MAX_NODES = 200    # Moves applied per expanded node
+
+
+def _king_mask(r, c, distance):
+    mask = 0
+    for dr in range(-distance, distance + 1):
+        for dc in range(-distance, distance + 1):
+            mask |= cell_bit((r + dr) % BOARD_SIZE, (c + dc) % BOARD_SIZE)
+    return mask
+
+NEAR1 = tuple(_king_mask(cell // BOARD_SIZE, cell % BOARD_SIZE, 1) for cell in range(NUM_CELLS))
+NEAR2 = tuple(_king_mask(cell // BOARD_SIZE, cell % BOARD_SIZE, 2) for cell in range(NUM_CELLS))
+
+
+# (shift, inverse shift) for each direction of WIN_LINES
+LINE_DIRECTIONS = (
+    (shift_east, shift_west),
+    (shift_south, shift_north),
+    (lambda mask: shift_east(shift_south(mask)), lambda mask: shift_west(shift_north(mask))),
+    (lambda mask: shift_west(shift_south(mask)), lambda mask: shift_east(shift_north(mask))),
+)
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+def line_targets(game, player):
+    """Empty squares where a move of player could complete one of its lines"""
+    own = game.player_mask(player)
+    targets = 0
+    for cell in iter_bits(FULL_MASK ^ game.occupied()):
+        if own & NEAR1[cell] or _popcount(own & NEAR2[cell]) >= 2:
+            targets |= 1 << cell
+    return targets
+
+def completion_squares(own, opponent):
+    """Empty squares that complete a line whose other two squares are own"""
+    empty = FULL_MASK ^ (own | opponent)
+    squares = 0
+    for shift, back in LINE_DIRECTIONS:
+        # Bit y of own1 / own2 is own at one / two steps back from y, the squares of the line ending at y
+        own1 = shift(own)
+        own2 = shift(own1)
+        squares |= empty & own1 & own2
+        squares |= back(own & shift(empty) & own2)
+        squares |= back(back(own & own1 & shift(shift(empty))))
+    return squares
+
+def moves_to(game, targets):
+    """Legal moves of the player to move whose destination is in targets"""
+    squares = [divmod(cell, BOARD_SIZE) for cell in iter_bits(targets & (FULL_MASK ^ game.occupied()))]
+    if game.in_placement_phase():
+        return squares
+    sources = [divmod(cell, BOARD_SIZE) for cell in iter_bits(game.player_mask(game.current_player))]
+    return [(r0, c0, r1, c1) for r0, c0 in sources for r1, c1 in squares]
+
+
+class SearchBudgetExceeded(Exception):
+    pass
+
+
+class ThreatSolver:
+    def __init__(self, max_depth=MAX_DEPTH, max_nodes=MAX_NODES):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.nodes = 0              # Moves applied by the current or last call
+        self.node_limit = 0
+        self.deadline = None
+        self.stats = {"calls": 0, "wins": 0, "aborted": 0, "nodes": 0}
+        self.node_time = 0.0        # Time left for solving expanded nodes in the current search
+
+    def start(self, end_time):
+        """Sets the time allowances of a search ending at end_time; returns the deadline for solving its root"""
+        now = time.time()
+        self.node_time = NODE_SHARE * max(end_time - now, 0.0)
+        return now + ROOT_SHARE * max(end_time - now, 0.0)
+
+    def mark_wins(self, game, moves, terminal):
+        """
+        Sets terminal[i] = 1 (see MCTSTree.expand) for a move of moves that starts a forced win, within
+        the node allowance set by start. Moves that win on the spot are expected to be marked already.
+        """
+        if self.node_time <= 0 or any(flag == 1 for flag in terminal):
+            return
+        start = time.time()
+        win = self.find_win(game, moves, NODE_DEPTH, NODE_MAX_NODES, start + self.node_time, min_depth=2)
+        self.node_time -= time.time() - start
+        if win is not None:
+            terminal[moves.index(win)] = 1
+
+    def find_win(self, game, moves=None, max_depth=None, max_nodes=None, deadline=None, min_depth=1):
+        """
+        First move of a forced win in at most max_depth moves for the player to move, or None if none
+        was found within max_nodes applied moves and the time.time() deadline. moves restricts the
+        first move (e.g. to the moves of a search tree node); min_depth 2 skips the search for
+        immediate wins when the caller has already done it.
+        """
+        if not isinstance(game, BitboardGame):
+            game = BitboardGame.from_game(game)
+        self.nodes = 0
+        self.node_limit = self.max_nodes if max_nodes is None else max_nodes
+        self.deadline = deadline
+        self.stats["calls"] += 1
+        try:
+            # Shorter wins first: a deep search can use up the budget before it gets to them
+            win = None
+            for depth in range(min_depth, (self.max_depth if max_depth is None else max_depth) + 1):
+                win = self.attack(game, depth, moves)
+                if win is not None:
+                    break
+        except SearchBudgetExceeded:
+            win = None
+            self.stats["aborted"] += 1
+        self.stats["nodes"] += self.nodes
+        if win is not None:
+            self.stats["wins"] += 1
+        return win
+
+    def _apply(self, game, move):
+        self.nodes += 1
+        if self.nodes > self.node_limit or (self.deadline is not None and time.time() >= self.deadline):
+            raise SearchBudgetExceeded()
+        return game.apply_move(move)
+
+    def winning_move(self, game, moves=None):
+        """A move that wins on the spot for the player to move, or None"""
+        player = game.current_player
+        candidates = moves_to(game, line_targets(game, player))
+        if moves is not None:
+            allowed = set(moves)
+            candidates = [move for move in candidates if move in allowed]
+        for move in candidates:
+            record = self._apply(game, move)
+            winner = game.check_winner()
+            game.undo(record)
+            if winner == player:
+                return move
+        return None
+
+    def wins(self, game, move):
+        """True if move is legal and wins on the spot for the player to move"""
+        status = game.placement_status(*move) if len(move) == 2 else game.move_status(*move)
+        if status != MOVE_OK:
+            return False
+        player = game.current_player
+        record = self._apply(game, move)
+        winner = game.check_winner()
+        game.undo(record)
+        return winner == player
+
+    def quick_win(self, game):
+        """A move that wins on the spot by filling the gap of a line, or None; misses wins made by pushes"""
+        player = game.current_player
+        squares = completion_squares(game.player_mask(player), game.player_mask(-player))
+        for move in moves_to(game, squares):
+            if self.wins(game, move):
+                return move
+        return None
+
+    def attack(self, game, depth, moves=None):
+        """
+        First move of a win in exactly depth moves for the player to move, or None. Wins in fewer moves
+        are left to the calls with a smaller depth.
+        """
+        if depth <= 1:
+            return self.winning_move(game, moves)
+        attacker = game.current_player
+        candidates = moves_to(game, self._threat_targets(game, attacker))
+        if moves is not None:
+            allowed = set(moves)
+            candidates = [move for move in candidates if move in allowed]
+        for move in candidates:
+            record = self._apply(game, move)
+            try:
+                if game.check_winner() != EMPTY:
+                    continue  # A win is found by the depth 1 search, so this is a loss
+                threat = self.quick_win(game)
+                if threat is None:
+                    continue  # Not a threat
+                game.current_player = -attacker
+                if not self.defend(game, depth - 1, threat):
+                    return move
+            finally:
+                game.undo(record)
+        return None
+
+    def defend(self, game, depth, threat):
+        """
+        True if the player to move has a reply after which the opponent has no win in depth moves.
+        threat is a move that would win on the spot for the opponent. After a reply, the opponent's
+        immediate wins are looked for with quick_win only, so one made by a push can be missed; that
+        can only make the solver miss a win, never report a false one.
+        """
+        defender = game.current_player
+        replies = list(game.iter_moves())
+        if not replies:
+            return False
+        # Likely defences first: on the threat square, then next to it (pushing the line apart), then near the attacker
+        threat_cell = threat[-2] * BOARD_SIZE + threat[-1]
+        square = 1 << threat_cell
+        beside = NEAR1[threat_cell]
+        near = self._threat_targets(game, -defender)
+        def order(move):
+            target = 1 << (move[-2] * BOARD_SIZE + move[-1])
+            return (not target & square, not target & beside, not target & near)
+        replies.sort(key=order)
+        for reply in replies:
+            record = self._apply(game, reply)
+            try:
+                winner = game.check_winner()
+                if winner == defender:
+                    return True
+                if winner != EMPTY:
+                    continue
+                game.current_player = -defender
+                # Most replies leave the threat in place, which is cheaper to check than a new search
+                if self.wins(game, threat) or self.quick_win(game) is not None:
+                    continue
+                if all(self.attack(game, d) is None for d in range(2, depth + 1)):
+                    return True
+            finally:
+                game.undo(record)
+        return False
+
+    def _threat_targets(self, game, player):
+        """Empty squares within 2 of a piece of player, where its threats are played"""
+        own = game.player_mask(player)
+        targets = 0
+        for cell in iter_bits(own):
+            targets |= NEAR2[cell]
+        return targets & (FULL_MASK ^ game.occupied())
+
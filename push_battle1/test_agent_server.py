@@ -0,0 +1,76 @@
+from PushBattle import Game, EMPTY, MOVE_OK, array_to_chess_notation
+from wire import SESSION_HEADER
+import agent_server
+
+MAX_LATENCY = 0.5   # Keeps the time managers' searches short
+
+
+def start_data(sessions):
+    game = Game()
+    return {"game": game.to_dict(), "board": game.board.tolist(), "max_latency": MAX_LATENCY, "sessions": sessions}
+
+
+def play(game, reply):
+    """Plays the move of a /move reply on game; returns the MoveRecord"""
+    assert reply.status_code == 200
+    move = tuple(reply.get_json()["move"])
+    status = game.placement_status(*move) if len(move) == 2 else game.move_status(*move)
+    assert status == MOVE_OK
+    record = game.apply_move(move)
+    game.current_player *= -1
+    game.turn_count += 1
+    return record
+
+
+def test_ready_after_warm_up():
+    client = agent_server.app.test_client()
+    agent_server.ready = False
+    assert client.get("/ready").status_code == 503
+    agent_server.warm_up()
+    reply = client.get("/ready")
+    assert reply.status_code == 200 and reply.get_json()["ready"]
+
+
+def test_session_game():
+    client = agent_server.app.test_client()
+    reply = client.post("/start", json=start_data(True))
+    session_id = reply.get_json()["session_id"]
+    headers = {SESSION_HEADER: session_id}
+    assert client.get("/ready").get_json()["sessions"] >= 1
+    session = agent_server.store.get(session_id)
+
+    game = Game()
+    last_move = None
+    for _ in range(3):
+        # Our move, then a random reply for the opponent, sent with the next /move
+        data = {"last_move": last_move, "hash": game.zobrist_hash, "turn_count": game.turn_count}
+        play(game, client.post("/move", json=data, headers=headers))
+        assert session.game.zobrist_hash == game.zobrist_hash
+        move = game.random_move()
+        game.apply_move(move)
+        game.current_player *= -1
+        game.turn_count += 1
+        last_move = array_to_chess_notation(move)
+    assert agent_server.store.get(session_id) is session
+
+    client.post("/end", json={"winner": int(EMPTY)}, headers=headers)
+    assert agent_server.store.get(session_id) is None
+
+
+def test_games_without_sessions_share_an_agent():
+    client = agent_server.app.test_client()
+    reply = client.post("/start", json=start_data(False))
+    assert "session_id" not in reply.get_json()
+    agent = agent_server.default_agent
+    assert agent is not None
+
+    game = Game()
+    for _ in range(2):
+        data = {"game": game.to_dict(), "board": game.board.tolist(), "turn_count": game.turn_count}
+        play(game, client.post("/move", json=data))
+        assert agent_server.default_agent is agent
+    client.post("/end", json={"winner": int(EMPTY)})
+
+    # A new game gets a new agent
+    client.post("/start", json=start_data(False))
+    assert agent_server.default_agent is not agent
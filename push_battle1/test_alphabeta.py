@@ -0,0 +1,88 @@
+import random
+from PushBattle import Game, PLAYER1, PLAYER2, EMPTY, WIN_LINES
+from bitboard import BitboardGame
+from MCTSAgent import MCTSAgent
+from alphabeta_agent import AlphaBetaAgent, evaluate, WIN_SCORE
+from positions import position
+
+mcts = MCTSAgent()
+
+
+def scan_evaluate(game, player):
+    """evaluate from a scan of WIN_LINES and MCTSAgent's term functions"""
+    def terms(side):
+        open_lines = [0, 0, 0, 0]
+        for line in WIN_LINES:
+            cells = [game.board[r][c] for r, c in line]
+            if -side not in cells:
+                open_lines[cells.count(side)] += 1
+        return (100 * open_lines[2] + 2 * open_lines[1] + mcts.count_aligned_pieces(game, side)
+                + mcts.evaluate_center_control(game, side) + mcts.evaluate_protected_pieces(game, side))
+    return terms(player) - terms(-player)
+
+
+def minimax(game, depth):
+    """Plain negamax with evaluate at the leaves, for the player to move"""
+    if depth == 0:
+        return evaluate(game, game.current_player)
+    best = None
+    for move in game.iter_moves():
+        record = game.apply_move(move)
+        winner = game.check_winner()
+        if winner != EMPTY:
+            score = WIN_SCORE if winner == record.player else -WIN_SCORE
+        else:
+            game.current_player = -record.player
+            score = -minimax(game, depth - 1)
+        game.undo(record)
+        best = score if best is None else max(best, score)
+    return 0 if best is None else best
+
+
+def test_evaluate_matches_board_scan():
+    rng = random.Random(0)
+    evaluations = 0
+    for _ in range(300):
+        game = Game()
+        for _ in range(rng.randrange(40)):
+            game.apply_move(game.random_move(rng))
+            if game.check_winner() != EMPTY:
+                break
+            game.current_player *= -1
+            board = BitboardGame.from_game(game)
+            for player in (PLAYER1, PLAYER2):
+                assert evaluate(board, player) == scan_evaluate(game, player)
+                evaluations += 1
+    assert evaluations
+
+
+def test_search_matches_minimax():
+    rng = random.Random(1)
+    searches = 0
+    while searches < 8:
+        game = BitboardGame()
+        for _ in range(rng.randrange(4, 20)):
+            game.apply_move(game.random_move(rng))
+            if game.check_winner() != EMPTY:
+                break
+            game.current_player *= -1
+        if game.check_winner() != EMPTY:
+            continue
+        agent = AlphaBetaAgent()
+        agent.end_time = float("inf")
+        moves = agent.get_possible_moves(game)
+        for depth in (1, 2):
+            _, score = agent.search_root(game, moves, depth, -WIN_SCORE, WIN_SCORE)
+            expected = minimax(game, depth)
+            # Wins are scored by ply in the search, only their sign is compared
+            assert score == expected or (abs(expected) == WIN_SCORE and score * expected > 0), (score, expected)
+            searches += 1
+
+
+def test_plays_winning_move():
+    game = position("movement")
+    agent = AlphaBetaAgent()
+    agent.time_limit = 2.0
+    move = agent.get_best_move(game)
+    game.apply_move(move)
+    assert game.check_winner() == PLAYER1
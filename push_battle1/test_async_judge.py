@@ -0,0 +1,63 @@
+import socket
+from PushBattle import EMPTY, PLAYER1, PLAYER2
+from async_judge import play_matches, summarize
+from stub_agent import StubAgentServer
+
+RESULT_KEYS = {"match", "p1", "p2", "winner", "reason", "turns", "game_str", "random_moves", "time"}
+
+
+def test_stub_matches():
+    with StubAgentServer() as a, StubAgentServer() as b:
+        pairings = [(a.url, b.url), (b.url, a.url)] * 3
+        results = play_matches(pairings, concurrency=4, match_timeout=60)
+        assert [result["match"] for result in results] == list(range(len(pairings)))
+        for result, (p1, p2) in zip(results, pairings):
+            assert set(result) == RESULT_KEYS
+            assert (result["p1"], result["p2"]) == (p1, p2)
+            # Without max_turns a random game ends with a line
+            assert result["reason"] == "line"
+            assert result["winner"] in (PLAYER1, PLAYER2)
+            assert result["turns"] >= 5 and result["game_str"]
+            assert result["random_moves"] == {"p1": 0, "p2": 0}
+        # Every match started and ended both players
+        assert a.server.started == a.server.ended == len(pairings)
+        assert b.server.started == b.server.ended == len(pairings)
+
+    summary = summarize(results)
+    assert summary["reasons"] == {"line": len(pairings)}
+    totals = summary["totals"]
+    assert totals[a.url]["wins"] + totals[b.url]["wins"] == len(pairings)
+    assert totals[a.url]["wins"] == totals[b.url]["losses"]
+
+
+def test_max_turns():
+    with StubAgentServer() as a, StubAgentServer() as b:
+        # Nobody can complete a line in 4 turns
+        results = play_matches([(a.url, b.url)], match_timeout=60, max_turns=4)
+    assert results[0]["reason"] == "max_turns"
+    assert results[0]["winner"] == EMPTY
+    assert results[0]["turns"] == 4
+
+
+def test_match_timeout():
+    with StubAgentServer(delay=0.3) as slow, StubAgentServer() as fast:
+        results = play_matches([(slow.url, fast.url)], match_timeout=1.0)
+        result = results[0]
+        assert result["reason"] == "timeout"
+        assert result["winner"] == EMPTY
+        assert 0 < result["turns"] < 10
+        assert result["time"] < 1.0 + 2 * 0.3 + 1.0
+        # Both players are told the game ended, after the move in flight returned
+        assert slow.server.ended == fast.server.ended == 1
+
+
+def test_unreachable_player():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    with StubAgentServer() as a:
+        results = play_matches([(a.url, f"http://127.0.0.1:{port}")], match_timeout=30)
+        assert results[0]["reason"] == "connect_failed"
+        assert results[0]["winner"] == EMPTY
+        assert a.server.started == 0
+    assert results[0]["turns"] == 0
@@ -0,0 +1,32 @@
+import random
+from PushBattle import Game, PLAYER1, PLAYER2, EMPTY
+from bitboard import BitboardGame
+
+
+def test_direct_board_writes_are_seen():
+    game = Game()
+    game.board[0][0] = game.board[0][1] = game.board[0][2] = PLAYER1
+    assert game.check_winner() == PLAYER1
+
+    game = Game()
+    game.board = game.board.copy()
+    game.board[3][7] = game.board[3][0] = game.board[3][1] = PLAYER2    # Wraps around the torus
+    assert game.check_winner() == PLAYER2
+
+
+def test_check_winner_after_matches_full_scan():
+    rng = random.Random(0)
+    for _ in range(200):
+        game = Game()
+        bitboard = BitboardGame()
+        while True:
+            move = game.random_move(rng)
+            record = game.apply_move(move)
+            bitboard_record = bitboard.apply_move(move)
+            winner = game.check_winner()
+            assert game.check_winner_after(record) == winner
+            assert bitboard.check_winner_after(bitboard_record) == winner
+            if winner != EMPTY:
+                break
+            game.current_player *= -1
+            bitboard.current_player *= -1
@@ -0,0 +1,58 @@
+import random
+from PushBattle import Game, EMPTY, BOARD_SIZE, WIN_LINES
+from bitboard import BitboardGame
+from MCTSAgent import FastMCTSAgent
+from positions import position
+
+
+def movement_positions(count, seed=0):
+    """Seeded random movement-phase positions without a winner"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = Game()
+        for _ in range(16 + rng.randrange(20)):
+            game.apply_move(game.random_move(rng))
+            if game.check_winner() != EMPTY:
+                break
+            game.current_player *= -1
+            game.turn_count += 1
+        else:
+            positions.append(game)
+    return positions
+
+
+def expected_moves(game):
+    """The moves prune_movement keeps, from their definition"""
+    player = game.current_player
+    kept = set()
+    for r0, c0, r1, c1 in game.iter_moves():
+        step = (r0 == r1 and (c1 - c0) % BOARD_SIZE in (1, BOARD_SIZE - 1)) or (c0 == c1 and (r1 - r0) % BOARD_SIZE in (1, BOARD_SIZE - 1))
+        for line in WIN_LINES:
+            others = [square for square in line if square != (r1, c1)]
+            if len(others) == 3:
+                continue
+            owners = [game.board[r][c] for r, c in others]
+            if owners == [-player, -player] or (owners == [player, player] and (r0, c0) not in others):
+                step = True
+        if step:
+            kept.add((r0, c0, r1, c1))
+    return kept
+
+
+def test_pruned_moves_match_definition():
+    agent = FastMCTSAgent()
+    for game in movement_positions(30):
+        moves = agent.get_possible_moves(game)
+        assert len(moves) == len(set(moves))
+        assert set(moves) == expected_moves(game)
+        assert agent.get_possible_moves(BitboardGame.from_game(game)) == moves
+
+
+def test_line_completion_is_searched():
+    # (0, 0) -> (0, 2) completes the column of (1, 2) and (2, 2); it is not a step
+    game = position("movement")
+    agent = FastMCTSAgent()
+    assert (0, 0, 0, 2) in agent.get_possible_moves(game)
+    agent.prune_moves = False
+    assert agent.get_possible_moves(game) == list(game.iter_moves())
@@ -0,0 +1,90 @@
+import random
+from PushBattle import Game, EMPTY, MOVE_OK, decode_move
+from symmetry import NUM_TRANSFORMS, INVERSE, canonical_hash, transform_move, stabilizer
+from opening_book import OpeningBook, build_book, DEFAULT_PATH
+
+
+def play(moves):
+    """The position after the placements in moves, or None if one of them wins"""
+    game = Game()
+    for move in moves:
+        game.apply_move(move)
+        if game.check_winner() != EMPTY:
+            return None
+        game.current_player *= -1
+        game.turn_count += 1
+    return game
+
+
+def book_lines(book, seed, count, random_plies=4):
+    """Move lists of placement positions reached by random_plies random moves and then book moves"""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        game = Game()
+        moves = []
+        while game.in_placement_phase():
+            move = game.random_move(rng) if len(moves) < random_plies else book.lookup(game)
+            if move is None:
+                break
+            lines.append(list(moves))
+            moves.append(move)
+            game = play(moves)
+            if game is None:
+                break
+    return lines
+
+
+def stored_move(book, game):
+    """The book move for game mapped back to the game's frame, without the legality check of lookup"""
+    key, t = canonical_hash(game)
+    i = book.probe(key)
+    if i < 0:
+        return None
+    return transform_move(decode_move(int(book.moves[i])), INVERSE[t])
+
+
+def check_transformed_lookups(book, lines, seed):
+    """Looks up every line under a random transform; returns the number of book hits"""
+    rng = random.Random(seed)
+    hits = 0
+    for moves in lines:
+        t = rng.randrange(NUM_TRANSFORMS)
+        game = play(moves)
+        copy = play([transform_move(move, t) for move in moves])
+        move = stored_move(book, copy)
+        assert (move is None) == (stored_move(book, game) is None)
+        if move is None:
+            continue
+        hits += 1
+        assert copy.placement_status(*move) == MOVE_OK
+        assert book.lookup(copy) == move
+        if len(stabilizer(game)) == 1:
+            # Without symmetries of its own the position has a single book move, seen through t
+            assert move == transform_move(book.lookup(game), t)
+    return hits
+
+
+def test_small_book(tmp_path):
+    path = str(tmp_path / "book.bin")
+    entries = build_book(path, plies=2, games=4, random_plies=2, max_depth=1, seed=0, log=lambda message: None)
+    book = OpeningBook(path)
+    try:
+        assert len(book) == len(entries)
+        for key, (move, _) in entries.items():
+            assert decode_move(int(book.moves[book.probe(key)])) == move
+        lines = book_lines(book, 0, 4, random_plies=2)
+        assert check_transformed_lookups(book, lines, 1) == len(lines)
+    finally:
+        book.close()
+
+
+def test_shipped_book():
+    book = OpeningBook(DEFAULT_PATH)
+    try:
+        assert len(book) == 221
+        lines = [[]] + [[move] for move in Game().iter_moves()] + book_lines(book, 0, 50)
+        hits = check_transformed_lookups(book, lines, 2)
+        assert hits > len(lines) // 2
+    finally:
+        book.close()
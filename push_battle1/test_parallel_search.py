@@ -0,0 +1,61 @@
+from PushBattle import Game, PLAYER1, PLAYER2, EMPTY
+from MCTSAgent import FastMCTSAgent
+from parallel_search import ParallelSearch
+
+
+def forced_win_position():
+    """Placement position where PLAYER1 to move wins by placing on (5, 2)"""
+    game = Game()
+    for r, c in ((5, 0), (5, 1), (1, 1)):
+        game.current_player = PLAYER1
+        game.place_checker(r, c)
+    for r, c in ((2, 5), (6, 6), (0, 4)):
+        game.current_player = PLAYER2
+        game.place_checker(r, c)
+    game.current_player = PLAYER1
+    game.turn_count = 6
+    return game
+
+
+def test_solver_win_is_played():
+    game = forced_win_position()
+    agent = FastMCTSAgent(player=PLAYER1)
+    agent.max_iterations = 50
+    win = agent.get_best_move(game.clone())
+    assert agent.search_stats.get("solver_win")
+
+    pool = ParallelSearch(FastMCTSAgent, workers=2)
+    try:
+        pool.max_iterations = 50
+        pool.time_limit = 5.0
+        move = pool.get_best_move(game.clone())
+        assert pool.search_stats["solver_win"]
+        assert tuple(move) == tuple(win)
+        # A second search of the same position, after the workers' trees hold an older root
+        assert tuple(pool.get_best_move(game.clone())) == tuple(win)
+    finally:
+        pool.close()
+
+    game.place_checker(*move)
+    assert game.check_winner() == PLAYER1
+
+
+class FailingAgent(FastMCTSAgent):
+    """Agent whose search raises, as a bug in a worker would"""
+    def get_best_move(self, game):
+        raise RuntimeError("search failed")
+
+
+def test_failed_worker_is_reported():
+    game = forced_win_position()
+    pool = ParallelSearch(FailingAgent, workers=2)
+    try:
+        pool.max_iterations = 50
+        pool.time_limit = 5.0
+        move = pool.get_best_move(game.clone())
+        assert pool.search_stats["failed"] == [0, 1]
+        assert pool.search_stats["merged"] == 0
+        # Without a result the move is a random legal one
+        assert game.is_valid_placement(*move)
+    finally:
+        pool.close()
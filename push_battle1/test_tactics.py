@@ -0,0 +1,130 @@
+import random
+import time
+from PushBattle import EMPTY
+from bitboard import BitboardGame
+from tactics import ThreatSolver, NODE_DEPTH, NODE_MAX_NODES
+
+
+def random_positions(seed, count, max_moves=30):
+    """Bitboard positions after random play that nobody has won yet"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = BitboardGame()
+        for _ in range(rng.randrange(4, max_moves)):
+            game.apply_move(game.random_move(rng))
+            if game.check_winner() != EMPTY:
+                break
+            game.current_player *= -1
+        if game.check_winner() == EMPTY:
+            positions.append(game)
+    return positions
+
+
+def exhaustive_win(game):
+    """True if some legal move wins on the spot for the player to move"""
+    player = game.current_player
+    for move in list(game.iter_moves()):
+        record = game.apply_move(move)
+        winner = game.check_winner()
+        game.undo(record)
+        if winner == player:
+            return True
+    return False
+
+
+def proven(game, move, depth):
+    """True if move wins against every defence within depth attacker moves, using the solver for follow-ups"""
+    attacker = game.current_player
+    record = game.apply_move(move)
+    try:
+        winner = game.check_winner()
+        if winner != EMPTY:
+            return winner == attacker
+        if depth <= 1:
+            return False
+        game.current_player = -attacker
+        for reply in list(game.iter_moves()):
+            reply_record = game.apply_move(reply)
+            try:
+                winner = game.check_winner()
+                if winner == -attacker:
+                    return False
+                if winner == attacker:
+                    continue
+                game.current_player = attacker
+                if exhaustive_win(game):
+                    continue
+                follow_up = ThreatSolver().find_win(game, max_depth=depth - 1, max_nodes=10 ** 6)
+                if follow_up is None or not proven(game, follow_up, depth - 1):
+                    return False
+            finally:
+                game.undo(reply_record)
+        return True
+    finally:
+        game.undo(record)
+
+
+def test_immediate_wins_match_exhaustive_search():
+    solver = ThreatSolver()
+    for game in random_positions(0, 150):
+        assert (solver.find_win(game, max_depth=1) is not None) == exhaustive_win(game)
+
+
+def test_found_wins_are_proven():
+    solver = ThreatSolver(max_depth=3, max_nodes=20000)
+    wins = 0
+    for game in random_positions(1, 150):
+        win = solver.find_win(game)
+        if win is not None:
+            wins += 1
+            assert proven(game, win, 3), (game.p1_mask, game.p2_mask, win)
+    assert wins
+
+
+def test_attack_and_defend_agree():
+    solver = ThreatSolver(max_nodes=10 ** 6)
+    checked = 0
+    for game in random_positions(2, 100):
+        solver.node_limit = 10 ** 6
+        if exhaustive_win(game):
+            continue
+        move = solver.attack(game, 2)
+        if move is None:
+            continue
+        # The defender has no reply to the threat left by a win in 2
+        attacker = game.current_player
+        record = game.apply_move(move)
+        threat = solver.quick_win(game)
+        assert threat is not None
+        game.current_player = -attacker
+        assert not solver.defend(game, 1, threat)
+        game.current_player = attacker
+        game.undo(record)
+        assert proven(game, move, 2)
+        checked += 1
+    assert checked
+
+
+def test_mark_wins():
+    solver = ThreatSolver(max_nodes=10 ** 6)
+    marked = 0
+    for game in random_positions(3, 300, 40):
+        if exhaustive_win(game):
+            continue
+        moves = list(game.iter_moves())
+        win = solver.find_win(game, moves, NODE_DEPTH, NODE_MAX_NODES, min_depth=2)
+        solver.start(time.time() + 100)
+        terminal = [0] * len(moves)
+        solver.mark_wins(game, moves, terminal)
+        if win is None:
+            assert not any(terminal)
+        else:
+            assert terminal.count(1) == 1 and proven(game, moves[terminal.index(1)], NODE_DEPTH)
+            marked += 1
+        # Nodes with a move already marked are left alone
+        solver.start(time.time() + 100)
+        terminal = [1] + [0] * (len(moves) - 1)
+        solver.mark_wins(game, moves, terminal)
+        assert terminal.count(1) == 1
+    assert marked
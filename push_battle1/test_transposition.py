@@ -0,0 +1,74 @@
+import random
+from bitboard import BitboardGame
+from MCTSAgent import FastMCTSAgent
+from mcts_tree import MCTSTree, ROOT
+from transposition import load_move_stats, child_key, tree_move_stats
+from positions import position
+
+
+def searched_agent():
+    """FastMCTSAgent after a seeded search of the placement position, deep enough to store grandchildren"""
+    random.seed(0)
+    agent = FastMCTSAgent()
+    agent.solver = None
+    agent.time_limit = 60.0
+    agent.max_iterations = 2000
+    agent.get_best_move(position("placement"))
+    return agent
+
+
+def is_stored(agent, node):
+    tree = agent.tree
+    return tree.is_expanded(node) and tree.visits[node] >= agent.tt_min_visits
+
+
+def test_expanded_nodes_are_stored():
+    agent = searched_agent()
+    tree = agent.tree
+    # Transposed nodes share one entry, which holds the statistics of one of them
+    by_key = {}
+    for node in range(1, tree.size):
+        if is_stored(agent, node):
+            by_key.setdefault(int(tree.keys[node]), []).append((float(tree.value_sums[node]), int(tree.visits[node])))
+
+    game = position("placement")
+    checked = 0
+    for child in tree.children(ROOT):
+        record = game.apply_move(tree.move(child))
+        game.current_player = -record.player
+        moves = [tree.move(grandchild) for grandchild in tree.children(child)]
+        stored = tree_move_stats(agent.tt, game, moves)
+        for grandchild in tree.children(child):
+            if is_stored(agent, grandchild):
+                assert stored[tree.move(grandchild)] in by_key[int(tree.keys[grandchild])]
+                checked += 1
+        game.undo(record)
+    assert checked
+
+
+def test_new_nodes_are_warm_started():
+    agent = searched_agent()
+    game = position("placement", BitboardGame)
+    move = agent.tree.move(agent.tree.best_child(ROOT))
+    record = game.apply_move(move)
+    game.current_player = -record.player
+    stored = tree_move_stats(agent.tt, game, agent.get_possible_moves(game))
+    game.undo(record)
+    assert stored
+
+    # A new tree whose root has only the searched best move, seeded with its stored statistics: the first
+    # iteration expands it and seeds its children from the table
+    tree = MCTSTree()
+    tree.reset(game.zobrist_hash)
+    tree.expand(ROOT, game.zobrist_hash, [move], [1.0], [0])
+    tree.seed_children(ROOT, load_move_stats(agent.tt, {move: child_key(game, move)}))
+    child = next(iter(tree.children(ROOT)))
+    assert tree.visits[child] >= agent.expand_visits
+    tree.search(game, float("inf"), lambda: 0.0, agent.get_possible_moves, agent.move_priors, agent.rollout,
+                expand_visits=agent.expand_visits, max_iterations=1, child_stats=agent.tt_move_stats)
+
+    assert tree.is_expanded(child)
+    seeded = {tree.move(grandchild): int(tree.visits[grandchild]) for grandchild in tree.children(child)}
+    for move, (_, visits) in stored.items():
+        # The one simulation of the iteration may have passed through the child
+        assert visits <= seeded[move] <= visits + 1
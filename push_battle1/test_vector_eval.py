@@ -0,0 +1,45 @@
+import random
+import numpy as np
+from PushBattle import Game, PLAYER1, EMPTY
+from MCTSAgent import MCTSAgent
+from vector_eval import evaluate_boards, evaluate_game
+
+
+def random_positions(count, seed=0):
+    """Seeded random positions of both phases, mostly without a winner"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        game = Game()
+        for _ in range(rng.randrange(40)):
+            move = game.random_move(rng)
+            if move is None:
+                break
+            record = game.apply_move(move)
+            if game.check_winner() != EMPTY:
+                if rng.random() < 0.9:
+                    game.undo(record)
+                break
+            game.current_player *= -1
+        yield game
+
+
+def test_matches_evaluate_position():
+    agent = MCTSAgent()
+    boards, players, current_players, pieces, expected = [], [], [], [], []
+    for game in random_positions(2000):
+        for player in (PLAYER1, -PLAYER1):
+            score = agent.evaluate_position(game, player)
+            assert evaluate_game(game, player) == score, (game.board.tolist(), game.current_player, player)
+            boards.append(game.board.copy())
+            players.append(player)
+            current_players.append(game.current_player)
+            pieces.append(game.p1_pieces if player == PLAYER1 else game.p2_pieces)
+            expected.append(score)
+
+    # The same positions as batches, one per scoring player
+    boards, players, expected = np.array(boards), np.array(players), np.array(expected)
+    current_players, pieces = np.array(current_players), np.array(pieces)
+    for player in (PLAYER1, -PLAYER1):
+        batch = players == player
+        scores = evaluate_boards(boards[batch], player, current_players[batch], pieces[batch])
+        assert (scores == expected[batch]).all()
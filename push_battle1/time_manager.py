@@ -0,0 +1,80 @@
+import time
+
+'''
+Per-move time budgets for the search agents.
+
+The judge gives every move max_latency seconds (sent on /start), measured on its side, so
+the budget is max_latency minus the time spent outside the search: request parsing, reply
+serialization and the network. The agent measures the first two for every /move
+(record_overhead) and keeps an exponential moving average; NETWORK_MARGIN covers the rest.
+
+The budget is then scaled by how much the position needs it: full time for movement-phase
+positions and positions where some moves lose on the spot, less during placement, almost
+none when a move wins on the spot or only one move is legal. During the search can_stop
+ends it early once the most visited root move cannot be overtaken in the time left.
+'''
+
+NETWORK_MARGIN = 0.25       # Seconds kept for the network and the judge's own bookkeeping
+OVERHEAD_SMOOTHING = 0.3    # Weight of the newest overhead sample in the moving average
+PLACEMENT_FRACTION = 0.5    # Share of the budget used for quiet placement-phase positions
+DECIDED_TIME = 0.05         # Budget when a move wins on the spot or only one move is legal
+MIN_TIME = 0.05
+ROLLOUT_SLACK = 0.02        # A rollout running past the budget is cut off this long after it
+
+
+class TimeManager:
+    def __init__(self, max_latency=4):
+        self.max_latency = max_latency
+        self.overhead = 0.05        # Moving average of the measured request/reply overhead
+        self.start_time = None
+        self.end_time = None
+
+    def record_overhead(self, seconds):
+        """Adds a measured request handling time spent outside the search"""
+        self.overhead += OVERHEAD_SMOOTHING * (seconds - self.overhead)
+
+    def available(self):
+        """Longest search time the judge's timeout allows"""
+        return max(self.max_latency - self.overhead - NETWORK_MARGIN, MIN_TIME)
+
+    def budget(self, game, terminal=None):
+        """
+        Search time for game. terminal holds the terminal flags of the root moves (see MCTSTree.expand),
+        None if they are not known.
+        """
+        available = self.available()
+        if terminal is not None:
+            if len(terminal) <= 1 or any(flag == 1 for flag in terminal):
+                return min(DECIDED_TIME, available)
+            if any(flag == -1 for flag in terminal):
+                return available
+        if game.in_placement_phase():
+            return max(available * PLACEMENT_FRACTION, MIN_TIME)
+        return available
+
+    def start(self):
+        """Starts the clock for a search, before any work on the position"""
+        self.start_time = time.time()
+        self.end_time = self.start_time + self.available()
+
+    def plan(self, game, terminal=None):
+        """Sets and returns the end time of the search started by start()"""
+        self.end_time = self.start_time + self.budget(game, terminal)
+        return self.end_time
+
+    def rollout_deadline(self):
+        """Hard deadline for a single rollout"""
+        return self.end_time + ROLLOUT_SLACK
+
+    def can_stop(self, tree, node, iterations):
+        """True if no other child of node can overtake the most visited one before end_time at the current rate"""
+        children = tree.children(node)
+        if len(children) < 2:
+            return True
+        visits = sorted(tree.visits[children.start:children.stop])
+        now = time.time()
+        elapsed = now - self.start_time
+        if elapsed <= 0:
+            return False
+        remaining = iterations / elapsed * max(self.end_time - now, 0.0)
+        return visits[-1] - visits[-2] > remaining
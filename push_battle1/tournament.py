@@ -0,0 +1,244 @@
+import argparse
+import contextlib
+import importlib
+import io
+import itertools
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from PushBattle import Game, PLAYER1, PLAYER2, EMPTY
+from judge_engine import Judge, TIMEOUT
+
+'''
+In-process self-play tournaments.
+
+Agents are given as "module:Class" (or a class name of MCTSAgent.py, alphabeta_agent.py or
+random_agent.py) and built directly in worker processes, one pair of fresh agents per game; any
+class with get_best_move(game) works. Every pair of agents plays games_per_pair games, colours
+alternating, spread over a process pool.
+
+A game follows judge_engine.main and Judge.handle_move, which plays every move: two attempts
+per turn, a malformed or illegal move forfeits, a failed attempt (an exception or a reply later
+than move_time) is retried once and then replaced by a random move while the player has
+RANDOM_MOVES left, else the player forfeits. Games still running after max_turns are draws.
+
+The result holds the win/loss/draw table of every pair, per-agent totals and move times, and
+how each game ended.
+'''
+
+RANDOM_MOVES = 5                # Random move fallbacks per player, as in judge_engine.main
+AGENT_MODULES = ("MCTSAgent", "alphabeta_agent", "random_agent")
+TIME_LIMIT_SHARE = 0.9          # Share of move_time given to agents with a time_limit attribute
+
+
+def load_agent_class(spec):
+    """Agent class of "module:Class", or of a class name defined in AGENT_MODULES"""
+    if ":" in spec:
+        module_name, class_name = spec.split(":", 1)
+        return getattr(importlib.import_module(module_name), class_name)
+    for module_name in AGENT_MODULES:
+        module = importlib.import_module(module_name)
+        if hasattr(module, spec):
+            return getattr(module, spec)
+    raise ValueError(f"Unknown agent {spec}")
+
+def make_agent(spec, player, move_time):
+    cls = load_agent_class(spec)
+    try:
+        agent = cls(player=player)
+    except TypeError:
+        agent = cls()
+    if hasattr(agent, "time_limit"):
+        agent.time_limit = move_time * TIME_LIMIT_SHARE
+    return agent
+
+
+class MoveClock:
+    """Move times of one agent in one game"""
+    def __init__(self):
+        self.moves = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.late = 0           # Replies later than move_time
+
+    def add(self, seconds, move_time):
+        self.moves += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if seconds > move_time:
+            self.late += 1
+
+    def to_dict(self):
+        return {"moves": self.moves, "total": self.total, "max": self.max, "late": self.late}
+
+
+def request_move(judge, agent, clock, move_time):
+    """One move attempt, like Judge.receive_move: True if played, False if failed, "forfeit" if invalid"""
+    start = time.time()
+    try:
+        move = agent.get_best_move(judge.game.clone())
+    except Exception:
+        clock.add(time.time() - start, move_time)
+        return False
+    elapsed = time.time() - start
+    clock.add(elapsed, move_time)
+    if elapsed > move_time:
+        return False  # The HTTP judge would have timed out
+    if isinstance(move, tuple):
+        move = list(move)
+    return judge.handle_move(judge.game, move)
+
+def play_game(p1_spec, p2_spec, seed, move_time=TIMEOUT, max_turns=200):
+    """Plays one game between fresh agents and returns its result dict; winner is PLAYER1, PLAYER2 or EMPTY"""
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    agents = {PLAYER1: make_agent(p1_spec, PLAYER1, move_time), PLAYER2: make_agent(p2_spec, PLAYER2, move_time)}
+    clocks = {PLAYER1: MoveClock(), PLAYER2: MoveClock()}
+    random_left = {PLAYER1: RANDOM_MOVES, PLAYER2: RANDOM_MOVES}
+    judge = Judge(None, None)
+    game = judge.game
+    winner, reason = EMPTY, "draw"
+    start = time.time()
+    # Judge.handle_move prints every move
+    with contextlib.redirect_stdout(io.StringIO()):
+        while game.turn_count < max_turns:
+            game.turn_count += 1
+            player = game.current_player
+            result = request_move(judge, agents[player], clocks[player], move_time)
+            if result is False:
+                result = request_move(judge, agents[player], clocks[player], move_time)
+            if result == "forfeit":
+                winner, reason = -player, "forfeit"
+                break
+            if result is False:
+                if random_left[player] == 0:
+                    winner, reason = -player, "no_random_moves"
+                    break
+                move = game.random_move()
+                if move is None:
+                    reason = "no_moves"
+                    break
+                judge.handle_move(game, list(move))
+                random_left[player] -= 1
+            winner = game.check_winner()
+            if winner != EMPTY:
+                reason = "line"
+                break
+            game.current_player *= -1
+    return {
+        "p1": p1_spec,
+        "p2": p2_spec,
+        "seed": seed,
+        "winner": int(winner),
+        "reason": reason,
+        "turns": game.turn_count,
+        "random_moves": {"p1": RANDOM_MOVES - random_left[PLAYER1], "p2": RANDOM_MOVES - random_left[PLAYER2]},
+        "clocks": {"p1": clocks[PLAYER1].to_dict(), "p2": clocks[PLAYER2].to_dict()},
+        "time": time.time() - start,
+    }
+
+def _play_game_task(args):
+    return play_game(*args)
+
+
+def schedule(specs, games_per_pair, seed=0):
+    """(p1, p2, seed) of every game: each pair of agents plays games_per_pair games, alternating colours"""
+    games = []
+    for a, b in itertools.combinations(specs, 2):
+        for i in range(games_per_pair):
+            p1, p2 = (a, b) if i % 2 == 0 else (b, a)
+            games.append((p1, p2, seed + len(games)))
+    return games
+
+def summarize(specs, results):
+    """Pair tables (wins of the row agent against the column agent), per-agent totals and move times"""
+    table = {a: {b: {"wins": 0, "losses": 0, "draws": 0} for b in specs if b != a} for a in specs}
+    totals = {spec: {"games": 0, "wins": 0, "losses": 0, "draws": 0, "moves": 0, "move_time": 0.0,
+                     "max_move_time": 0.0, "late_moves": 0, "random_moves": 0, "forfeits": 0} for spec in specs}
+    reasons = {}
+    for result in results:
+        reasons[result["reason"]] = reasons.get(result["reason"], 0) + 1
+        sides = (("p1", PLAYER1, result["p1"], result["p2"]), ("p2", PLAYER2, result["p2"], result["p1"]))
+        for side, player, spec, opponent in sides:
+            if result["winner"] == player:
+                outcome = "wins"
+            elif result["winner"] == EMPTY:
+                outcome = "draws"
+            else:
+                outcome = "losses"
+                if result["reason"] != "line":
+                    totals[spec]["forfeits"] += 1
+            table[spec][opponent][outcome] += 1
+            total = totals[spec]
+            total["games"] += 1
+            total[outcome] += 1
+            clock = result["clocks"][side]
+            total["moves"] += clock["moves"]
+            total["move_time"] += clock["total"]
+            total["max_move_time"] = max(total["max_move_time"], clock["max"])
+            total["late_moves"] += clock["late"]
+            total["random_moves"] += result["random_moves"][side]
+    for total in totals.values():
+        total["score"] = (total["wins"] + 0.5 * total["draws"]) / total["games"] if total["games"] else 0.0
+        total["mean_move_time"] = total["move_time"] / total["moves"] if total["moves"] else 0.0
+    return {"table": table, "totals": totals, "reasons": reasons}
+
+def run_tournament(specs, games_per_pair, move_time=TIMEOUT, max_turns=200, workers=None, seed=0, log=print):
+    """Plays the whole schedule on a process pool and returns the summary with every game result"""
+    games = schedule(specs, games_per_pair, seed)
+    results = []
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_play_game_task, (p1, p2, game_seed, move_time, max_turns)) for p1, p2, game_seed in games]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if log is not None and len(results) % max(1, len(games) // 20) == 0:
+                log(f"{len(results)}/{len(games)} games, {time.time() - start:.0f}s")
+    results.sort(key=lambda result: result["seed"])
+    summary = summarize(specs, results)
+    summary.update({
+        "settings": {"games_per_pair": games_per_pair, "move_time": move_time, "max_turns": max_turns, "seed": seed},
+        "wall_time": time.time() - start,
+        "games": results,
+    })
+    return summary
+
+def format_summary(summary):
+    """Text tables of a run_tournament summary"""
+    specs = list(summary["totals"])
+    width = max(len(spec) for spec in specs) + 2
+    lines = ["W-L-D of the row agent against the column agent", " " * width + "".join(spec.rjust(width) for spec in specs)]
+    for a in specs:
+        cells = []
+        for b in specs:
+            record = summary["table"][a].get(b)
+            cells.append(("-" if record is None else f"{record['wins']}-{record['losses']}-{record['draws']}").rjust(width))
+        lines.append(a.ljust(width) + "".join(cells))
+    lines.append("")
+    lines.append(f"{'agent'.ljust(width)}{'games':>7}{'score':>8}{'mean move':>11}{'max move':>10}{'late':>6}{'random':>8}{'forfeits':>10}")
+    for spec, total in sorted(summary["totals"].items(), key=lambda item: -item[1]["score"]):
+        lines.append(f"{spec.ljust(width)}{total['games']:>7}{total['score']:>8.3f}{total['mean_move_time']:>10.3f}s"
+                     f"{total['max_move_time']:>9.3f}s{total['late_moves']:>6}{total['random_moves']:>8}{total['forfeits']:>10}")
+    lines.append("")
+    games = len(summary["games"])
+    lines.append(f"{games} games in {summary['wall_time']:.1f}s, endings: {summary['reasons']}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Plays a round-robin tournament between agent classes")
+    parser.add_argument("agents", nargs="+", help="agent classes, as module:Class or a class name")
+    parser.add_argument("--games", type=int, default=10, help="games per pair of agents")
+    parser.add_argument("--time", type=float, default=TIMEOUT, help="seconds per move")
+    parser.add_argument("--max-turns", type=int, default=200, help="turns before a game is a draw")
+    parser.add_argument("--workers", type=int, default=None, help="processes, default one per CPU")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="JSON file for the summary and every game")
+    args = parser.parse_args()
+    summary = run_tournament(args.agents, args.games, args.time, args.max_turns, args.workers, args.seed)
+    print(format_summary(summary))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=1)
@@ -0,0 +1,170 @@
+import http.client
+import json
+import socket
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from PushBattle import Game
+from wire import JSON_ENCODING, ENGINE_TIME_HEADER
+
+'''
+How the judge reaches an agent.
+
+A transport sends the judge's requests to one agent and returns response objects with the
+parts of requests.Response the judge uses (status_code, headers, json()). Failures raise
+requests exceptions, so the judge handles every transport the same way.
+
+    HTTPTransport        HTTP over a requests.Session: one pooled keep-alive connection for the
+                         whole game instead of a new TCP connection per move
+    UnixSocketTransport  HTTP over a Unix domain socket, for agents on the same host (gunicorn
+                         --bind unix:PATH, or werkzeug with host "unix://PATH"), also kept alive
+    DirectTransport      calls an agent object in the judge's process, no serialization of the
+                         reply and no network
+
+make_transport picks one from a URL: "http://host:port", "unix:///path/to/socket". Agents report
+the time spent in get_best_move in the ENGINE_TIME_HEADER of /move replies; the judge subtracts
+it from the request time to get the transport time.
+'''
+
+POOL_SIZE = 4   # Keep-alive connections per agent; the judge sends one request at a time
+
+
+class TransportResponse:
+    """The parts of requests.Response the judge reads"""
+    def __init__(self, status_code, content, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers or {})
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class HTTPTransport:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, path, timeout):
+        return self.session.get(self.url + path, timeout=timeout)
+
+    def post(self, path, timeout, json=None, data=None, headers=None):
+        return self.session.post(self.url + path, json=json, data=data, headers=headers, timeout=timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class UnixSocketTransport:
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.connection = None
+
+    def request(self, method, path, timeout, body=None, headers=None):
+        headers = dict(headers or {})
+        # A kept-alive connection the agent closed fails on first use, so a failed request is retried once
+        for retry in (False, True):
+            if self.connection is None:
+                self.connection = _UnixHTTPConnection(self.socket_path, timeout)
+            self.connection.timeout = timeout
+            if self.connection.sock is not None:
+                self.connection.sock.settimeout(timeout)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                content = response.read()
+                return TransportResponse(response.status, content, response.getheaders())
+            except socket.timeout as e:
+                self.close()
+                raise requests.Timeout(str(e))
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                if retry:
+                    raise requests.ConnectionError(str(e))
+
+    def get(self, path, timeout):
+        return self.request("GET", path, timeout)
+
+    def post(self, path, timeout, json=None, data=None, headers=None):
+        headers = dict(headers or {})
+        if json is not None:
+            data = _json_dumps(json)
+            headers.setdefault("Content-Type", "application/json")
+        return self.request("POST", path, timeout, body=data, headers=headers)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def _json_dumps(value):
+    return json.dumps(value).encode("utf-8")
+
+
+class DirectTransport:
+    """
+    Plays the agent side of the protocol in-process for any object with get_best_move(game):
+    JSON encoding, no sessions. timeout is not enforced, the judge compares the returned times.
+    """
+    def __init__(self, agent):
+        self.agent = agent
+
+    def get(self, path, timeout):
+        return TransportResponse(200, _json_dumps({"message": "Successfully Connected"}))
+
+    def post(self, path, timeout, json=None, data=None, headers=None):
+        if path == "/start":
+            return TransportResponse(200, _json_dumps({"message": "Game started successfully", "encoding": JSON_ENCODING}))
+        if path == "/end":
+            return TransportResponse(200, _json_dumps({"message": "Game ended successfully"}))
+        if path != "/move" or json is None or "game" not in json:
+            return TransportResponse(400, _json_dumps({"error": f"unsupported request {path}"}))
+        game = Game.from_dict(json["game"])
+        start = time.time()
+        try:
+            move = self.agent.get_best_move(game)
+        except Exception as e:
+            return TransportResponse(500, _json_dumps({"error": str(e)}))
+        engine_time = time.time() - start
+        if move is not None:
+            move = [int(x) for x in move]
+        return TransportResponse(200, _json_dumps({"move": move}), {ENGINE_TIME_HEADER: repr(engine_time)})
+
+    def close(self):
+        pass
+
+
+def make_transport(url):
+    """Transport for an agent URL ("http://...", "unix:///path"); transports are passed through, None stays None"""
+    if url is None or not isinstance(url, str):
+        return url
+    if url.startswith("unix://"):
+        return UnixSocketTransport(url[len("unix://"):])
+    return HTTPTransport(url)
+
+def engine_time(response):
+    """Engine time an agent reported in a reply, None if it did not"""
+    try:
+        return float(response.headers.get(ENGINE_TIME_HEADER))
+    except (TypeError, ValueError, AttributeError):
+        return None
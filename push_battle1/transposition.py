@@ -0,0 +1,162 @@
+import numpy as np
+from PushBattle import encode_move, decode_move
+from mcts_tree import ROOT
+
+'''
+Fixed-size transposition table keyed by Game.zobrist_hash.
+
+Each slot stores visit count, value sum, a best-move hint and a depth. Depth is the search
+effort behind the entry: plies searched for alpha-beta, visits for MCTS. MCTS entries hold the
+statistics of a tree node, value_sum scored for the player who moved into the position; the
+MCTS agents store them after each search and warm-start new tree nodes from them. Alpha-beta entries
+keep their score in value_sum and whether it is exact or a bound in bound. A slot is shared by
+every key with the same low bits; a new key only replaces the current one if the current
+entry is from an older search (age) or was searched less deeply.
+'''
+
+EXACT = 0           # bound of an entry: value_sum is the exact score,
+LOWER_BOUND = 1     # at least value_sum (the search failed high),
+UPPER_BOUND = 2     # at most value_sum (the search failed low)
+
+
+class TranspositionTable:
+    def __init__(self, size_bits=16):
+        self.size = 1 << size_bits
+        self.index_mask = self.size - 1
+        self.keys = np.zeros(self.size, dtype=np.uint64)
+        self.used = np.zeros(self.size, dtype=bool)
+        self.visits = np.zeros(self.size, dtype=np.int64)
+        self.value_sums = np.zeros(self.size, dtype=np.float64)
+        self.best_moves = np.full(self.size, -1, dtype=np.int16)    # encode_move of the best move, -1 if unknown
+        self.depths = np.zeros(self.size, dtype=np.int32)
+        self.bounds = np.zeros(self.size, dtype=np.int8)
+        self.ages = np.zeros(self.size, dtype=np.uint16)
+        self.age = 0            # Incremented by new_search, entries from older searches are replaced first
+        self.filled = 0         # Number of used slots
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.rejected = 0       # Stores refused by the replacement policy
+
+    def new_search(self):
+        """Marks the start of a new search; entries stored before become replaceable"""
+        self.age = (self.age + 1) & 0xFFFF
+
+    def clear(self):
+        self.used[:] = False
+        self.filled = 0
+
+    def _slot(self, key):
+        return key & self.index_mask
+
+    def probe(self, key):
+        """Returns the slot holding key, or -1"""
+        self.probes += 1
+        slot = self._slot(key)
+        if self.used[slot] and int(self.keys[slot]) == key:
+            self.hits += 1
+            return slot
+        return -1
+
+    def probe_many(self, keys):
+        """probe of every key of a uint64 array: the slots holding them, -1 for keys not stored"""
+        slots = (keys & np.uint64(self.index_mask)).astype(np.intp)
+        found = self.used[slots] & (self.keys[slots] == keys)
+        self.probes += len(keys)
+        self.hits += int(found.sum())
+        return np.where(found, slots, -1)
+
+    def lookup(self, key):
+        """Returns (visits, value_sum, best_move, depth) for key, or None. best_move is a move tuple or None"""
+        slot = self.probe(key)
+        if slot < 0:
+            return None
+        code = int(self.best_moves[slot])
+        best_move = decode_move(code) if code >= 0 else None
+        return int(self.visits[slot]), float(self.value_sums[slot]), best_move, int(self.depths[slot])
+
+    def store(self, key, visits, value_sum, best_move=None, depth=0, bound=EXACT):
+        """Writes an entry for key if the replacement policy allows it. Returns True if it was written"""
+        slot = self._slot(key)
+        if self.used[slot] and int(self.keys[slot]) != key:
+            if self.ages[slot] == self.age and self.depths[slot] > depth:
+                self.rejected += 1
+                return False
+        elif not self.used[slot]:
+            self.used[slot] = True
+            self.filled += 1
+        self.keys[slot] = key
+        self.visits[slot] = visits
+        self.value_sums[slot] = value_sum
+        self.best_moves[slot] = encode_move(best_move) if best_move is not None else -1
+        self.depths[slot] = depth
+        self.bounds[slot] = bound
+        self.ages[slot] = self.age
+        self.stores += 1
+        return True
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def occupancy(self):
+        return self.filled / self.size
+
+    def stats(self):
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate(),
+            "stores": self.stores,
+            "rejected": self.rejected,
+            "occupancy": self.occupancy(),
+        }
+
+
+def child_key(game, move):
+    """Zobrist hash of the position after move, with the opponent to move"""
+    record = game.apply_move(move)
+    game.current_player = -record.player
+    key = game.zobrist_hash
+    game.undo(record)
+    return key
+
+def load_move_stats(table, child_keys):
+    """Builds a move_stats dict (move -> (total_score, visits)) from the entries stored for each child position"""
+    if not child_keys:
+        return {}
+    moves = list(child_keys)
+    slots = table.probe_many(np.fromiter(child_keys.values(), dtype=np.uint64, count=len(moves)))
+    move_stats = {}
+    for move, slot in zip(moves, slots.tolist()):
+        if slot >= 0 and table.visits[slot] > 0:
+            move_stats[move] = (float(table.value_sums[slot]), int(table.visits[slot]))
+    return move_stats
+
+def tree_move_stats(table, game, moves):
+    """load_move_stats for the children of a tree node being expanded at game, see MCTSTree.search"""
+    return load_move_stats(table, {move: child_key(game, move) for move in moves})
+
+def save_move_stats(table, root_key, child_keys, move_stats, best_move):
+    """Stores the root move statistics of a finished search and the best move hint of the root"""
+    total_score = 0.0
+    total_visits = 0
+    for move, (score, visits) in move_stats.items():
+        table.store(child_keys[move], visits, score, depth=visits)
+        total_score += score
+        total_visits += visits
+    # The root is scored like its children's children: for the player who moved into it
+    table.store(root_key, total_visits, -total_score, best_move, depth=total_visits)
+
+def save_tree_stats(table, tree, min_visits):
+    """Stores every expanded node below the root with at least min_visits visits"""
+    nodes = np.flatnonzero((tree.first_child[:tree.size] >= 0) & (tree.visits[:tree.size] >= min_visits))
+    for node in nodes[nodes != ROOT].tolist():
+        visits = int(tree.visits[node])
+        table.store(int(tree.keys[node]), visits, float(tree.value_sums[node]), depth=visits)
+
+def best_move_hint(table, root_key, moves):
+    """Returns the stored best move of the root position if it is one of moves, else None"""
+    entry = table.lookup(root_key)
+    if entry is not None and entry[2] in moves:
+        return entry[2]
+    return None
@@ -0,0 +1,113 @@
+import numpy as np
+from PushBattle import EMPTY, PLAYER1, BOARD_SIZE, NUM_PIECES
+
+'''
+Whole-board version of MCTSAgent.evaluate_position.
+
+Every heuristic of evaluate_position is written as NumPy operations on a batch of K boards
+(shape (K, 8, 8)): torus neighbours are np.roll of the piece masks, per-square loops become
+mask products and sums. evaluate_boards scores all K boards in one call and returns exactly
+the values evaluate_position returns for them; test_vector_eval.py checks that on random
+positions.
+'''
+
+THREAT_DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))    # Directions of check_threat, would_create_threat and the win lines
+PUSH_SIDES = ((0, 1), (0, -1), (1, 0), (-1, 0))          # Directions of is_protected
+WIN_SCORE = 1000
+
+
+def _at(mask, dr, dc):
+    """mask[k, (r + dr) % 8, (c + dc) % 8] at every square (r, c)"""
+    return np.roll(mask, shift=(-dr, -dc), axis=(1, 2))
+
+def _count(mask):
+    return mask.sum(axis=(1, 2))
+
+def three_in_row(mask):
+    """(K,) True where the mask holds 3 consecutive squares on any torus line"""
+    found = np.zeros(len(mask), dtype=bool)
+    for dr, dc in THREAT_DIRECTIONS:
+        found |= (mask & _at(mask, dr, dc) & _at(mask, 2 * dr, 2 * dc)).any(axis=(1, 2))
+    return found
+
+def winners(boards, current_player):
+    """check_winner of every board: the player with 3 in a row, current_player if both have one, else EMPTY"""
+    p1_wins = three_in_row(boards == PLAYER1)
+    p2_wins = three_in_row(boards == -PLAYER1)
+    current_player = np.broadcast_to(current_player, p1_wins.shape)
+    return np.where(p1_wins & p2_wins, current_player,
+                    np.where(p1_wins, PLAYER1, np.where(p2_wins, -PLAYER1, EMPTY)))
+
+def protected(own, opponent):
+    """is_protected at every square: no opponent piece beside it without an own piece on the other side"""
+    safe = np.ones_like(own)
+    for dr, dc in PUSH_SIDES:
+        safe &= ~(_at(opponent, dr, dc) & ~_at(own, -dr, -dc))
+    return safe
+
+def _closed_pairs(wall, axis):
+    """find_wall_patterns along axis: adjacent wall pairs, leaving out the run that reaches the board edge"""
+    first = [slice(None)] * 3
+    second = [slice(None)] * 3
+    first[axis] = slice(None, -1)
+    second[axis] = slice(1, None)
+    pairs = _count(wall[tuple(first)] & wall[tuple(second)])
+    trailing = np.cumprod(np.flip(wall, axis=axis), axis=axis).sum(axis=axis)
+    return pairs - np.maximum(trailing - 1, 0).sum(axis=1)
+
+def evaluate_boards(boards, player, current_player, player_pieces):
+    """
+    evaluate_position(game, player) for K boards at once.
+    boards: (K, 8, 8) array. current_player and player_pieces (the pieces player has placed) are
+    scalars or (K,) arrays. Returns a (K,) float array.
+    """
+    boards = np.asarray(boards)
+    own = boards == player
+    opponent = boards == -player
+    empty = boards == EMPTY
+    safe = protected(own, opponent)
+
+    # is_position_reachable: free placement, or any own piece when player is to move
+    reachable = (np.asarray(player_pieces) < NUM_PIECES) | ((np.asarray(current_player) == player) & own.any(axis=(1, 2)))
+
+    # evaluate_threats: two in a row with the third square empty, or piece-empty-piece
+    threats = np.zeros(len(boards), dtype=np.int64)
+    for dr, dc in THREAT_DIRECTIONS:
+        threats += 15 * _count(own & _at(own, dr, dc) & _at(empty, 2 * dr, 2 * dc))
+        threats += 10 * _count(own & _at(empty, dr, dc) & _at(own, 2 * dr, 2 * dc))
+    threats *= reachable
+
+    # find_triangle_patterns, without wrapping; protected triangles count twice
+    corner, below, right = own[:, :-1, :-1], own[:, 1:, :-1], own[:, :-1, 1:]
+    triangles = corner & below & right
+    safe_triangles = triangles & safe[:, :-1, :-1] & safe[:, 1:, :-1] & safe[:, :-1, 1:]
+    triangle_count = _count(triangles) + _count(safe_triangles)
+
+    # find_wall_patterns
+    wall = own & safe
+    wall_count = _closed_pairs(wall, 2) + _closed_pairs(wall, 1)
+
+    # find_fork_patterns: empty squares next to own pieces in 2+ directions, again if reachable
+    neighbours = np.zeros(boards.shape, dtype=np.int64)
+    for dr, dc in THREAT_DIRECTIONS:
+        neighbours += _at(own, dr, dc) | _at(own, -dr, -dc)
+    fork_count = _count(empty & (neighbours >= 2)) * (1 + reachable)
+
+    patterns = triangle_count * 20 + wall_count * 15 + fork_count * 25
+
+    aligned = 10 * (_count(own[:, :, :-1] & own[:, :, 1:]) + _count(own[:, :-1, :] & own[:, 1:, :]))
+    center = 5 * _count(own[:, 3:5, 3:5])
+    protected_pieces = 3 * _count(wall)
+
+    scores = (threats * 50 + patterns * 30 + aligned + center + protected_pieces).astype(np.float64)
+    winner = winners(boards, current_player)
+    scores[winner == player] = WIN_SCORE
+    scores[winner == -player] = -WIN_SCORE
+    return scores
+
+def evaluate_game(game, player):
+    """evaluate_position(game, player) of a single Game or BitboardGame"""
+    pieces = game.p1_pieces if player == PLAYER1 else game.p2_pieces
+    board = np.asarray(game.board).reshape(1, BOARD_SIZE, BOARD_SIZE)
+    return float(evaluate_boards(board, player, game.current_player, pieces)[0])
+
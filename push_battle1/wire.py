@@ -0,0 +1,51 @@
+import struct
+from PushBattle import Game, GAME_STRUCT
+
+'''
+Compact binary encoding for judge <-> agent traffic.
+
+The judge offers the encodings it supports in the /start payload ("encodings"); the agent answers
+with the one it picked ("encoding"). Agents that do not answer keep getting the JSON payloads.
+With the binary encoding a /move request body is the GAME_STRUCT bytes of the game followed by
+MOVE_FIELDS (attempt number, random attempts left), sent as CONTENT_TYPE. Replies stay JSON.
+'''
+
+JSON_ENCODING = "json"
+BINARY_ENCODING = "binary-v1"
+SUPPORTED_ENCODINGS = [BINARY_ENCODING, JSON_ENCODING]   # In order of preference
+
+CONTENT_TYPE = "application/x-pushbattle"
+SESSION_HEADER = "X-Session-Id"    # Session id of an agent in session mode (see sessions.py), sent with every /move
+ENGINE_TIME_HEADER = "X-Engine-Time"   # Seconds the agent spent choosing the move, sent with /move replies
+MOVE_FIELDS = struct.Struct("<BB")
+
+
+def choose_encoding(offered):
+    """Agent side of the negotiation: the first supported encoding the judge offered, JSON if none"""
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding in (offered or []):
+            return encoding
+    return JSON_ENCODING
+
+def negotiated_encoding(response):
+    """Judge side of the negotiation: the encoding named in an agent's /start reply, JSON if missing or unknown"""
+    try:
+        encoding = response.json().get("encoding", JSON_ENCODING)
+    except (ValueError, AttributeError):
+        return JSON_ENCODING
+    return encoding if encoding in SUPPORTED_ENCODINGS else JSON_ENCODING
+
+def encode_move_request(game, attempt_number, random_attempts):
+    """Binary body of a /move request"""
+    return game.to_bytes() + MOVE_FIELDS.pack(attempt_number, random_attempts)
+
+def decode_move_request(data, game_cls=Game):
+    """Decodes a binary /move body into the same values the JSON payload carries"""
+    game = game_cls.from_bytes(data)
+    attempt_number, random_attempts = MOVE_FIELDS.unpack_from(data, GAME_STRUCT.size)
+    return {
+        "game": game,
+        "turn_count": game.turn_count,
+        "attempt_number": attempt_number,
+        "random_attempts": random_attempts,
+    }